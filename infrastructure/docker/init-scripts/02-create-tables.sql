@@ -46,6 +46,7 @@ CREATE TABLE IF NOT EXISTS air_quality (
 CREATE INDEX IF NOT EXISTS idx_air_quality_location ON air_quality USING GIST(location);
 CREATE INDEX IF NOT EXISTS idx_air_quality_measurement_date ON air_quality(measurement_date DESC);
 CREATE INDEX IF NOT EXISTS idx_air_quality_is_public ON air_quality(is_public);
+CREATE INDEX IF NOT EXISTS idx_air_quality_station_date ON air_quality(station_id, measurement_date) WHERE aqi IS NOT NULL;
 
 -- Weather table
 CREATE TABLE IF NOT EXISTS weather (
@@ -0,0 +1,50 @@
+--
+-- GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+-- Copyright (C) 2025 DTU-DZ2 Team
+--
+-- This program is free software: you can redistribute it and/or modify
+-- it under the terms of the GNU General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or
+-- (at your option) any later version.
+--
+-- This program is distributed in the hope that it will be useful,
+-- but WITHOUT ANY WARRANTY; without even the implied warranty of
+-- MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+-- GNU General Public License for more details.
+--
+-- You should have received a copy of the GNU General Public License
+-- along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+-- AI task results table for AI Service
+-- Stores status, timings, input fingerprint and result payload of every AI task
+
+CREATE TABLE IF NOT EXISTS ai_task_results (
+    task_id VARCHAR(64) PRIMARY KEY,
+    task_type VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running'
+        CHECK (status IN ('running', 'completed', 'failed')),
+    parameters JSONB,
+    -- SHA-256 of task type + parameters + data snapshot stamps
+    input_fingerprint VARCHAR(64),
+    result JSONB,
+    error TEXT,
+    -- Task whose result was reused (same fingerprint)
+    reused_from VARCHAR(64),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ,
+    duration_ms INTEGER,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Lookup of reusable results by fingerprint
+CREATE INDEX IF NOT EXISTS idx_ai_task_results_fingerprint
+    ON ai_task_results(task_type, input_fingerprint, completed_at DESC)
+    WHERE status = 'completed';
+CREATE INDEX IF NOT EXISTS idx_ai_task_results_created_at ON ai_task_results(created_at DESC);
+
+-- Log success
+DO $$
+BEGIN
+    RAISE NOTICE 'AI task results table created';
+END $$;
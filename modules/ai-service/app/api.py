@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+AI Service HTTP API
+Tra cứu trạng thái / kết quả AI tasks (gateway proxy tới đây)
+"""
+from fastapi import FastAPI, HTTPException, Query, Response
+import logging
+import numpy as np
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.model_registry import model_registry
+from app.jobs.aqi_grid import aqi_grid_service
+from app.utils.task_store import get_task
+
+logger = logging.getLogger(__name__)
+
+api = FastAPI(
+    title=settings.APP_NAME,
+    version=settings.VERSION,
+    docs_url="/docs",
+    openapi_url="/openapi.json"
+)
+
+
+@api.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy", "service": "ai-service"}
+
+
+@api.get("/api/v1/tasks/{task_id}")
+async def get_task_result(task_id: str):
+    """Get status, timings and result payload of an AI task"""
+    try:
+        async with AsyncSessionLocal() as db:
+            task = await get_task(db, task_id)
+    except Exception as e:
+        logger.error(f"Error fetching task {task_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found (it may still be queued)")
+    
+    return task
+
+
+@api.get("/api/v1/models")
+async def list_models():
+    """List registered models with metadata of their latest version"""
+    return {
+        'models': [model_registry.get_metadata(name) for name in model_registry.list_models()]
+    }
+
+
+@api.get("/api/v1/models/{name}")
+async def get_model(name: str):
+    """Get metadata of every stored version of a model"""
+    versions = model_registry.list_versions(name)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Model not found")
+    
+    return {
+        'name': name,
+        'latest_version': model_registry.latest_version(name),
+        'versions': [model_registry.get_metadata(name, version) for version in versions]
+    }
+
+
+def _current_grid():
+    grid = aqi_grid_service.grid
+    if grid is None:
+        raise HTTPException(status_code=503, detail="AQI grid not computed yet")
+    return grid
+
+
+@api.get("/api/v1/aqi-grid")
+async def get_aqi_grid_info():
+    """Metadata of the AQI grid currently served"""
+    grid = _current_grid()
+    metadata = aqi_grid_service.metadata or {}
+    return {
+        'version': metadata.get('version'),
+        'trained_at': metadata.get('trained_at'),
+        'training_window': metadata.get('training_window'),
+        **grid.describe()
+    }
+
+
+@api.get("/api/v1/aqi-grid/point")
+async def get_aqi_at_point(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180)
+):
+    """Interpolated AQI at a point (grid lookup, no database query)"""
+    grid = _current_grid()
+    value = grid.value_at(lat, lon)
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'aqi': None if value is None else round(value, 2),
+        'version': (aqi_grid_service.metadata or {}).get('version')
+    }
+
+
+@api.get("/api/v1/aqi-grid/tiles/{z}/{x}/{y}")
+async def get_aqi_tile(
+    z: int,
+    x: int,
+    y: int,
+    size: int = Query(256, ge=16, le=512),
+    format: str = Query("json", pattern="^(json|f32)$")
+):
+    """
+    XYZ tile of the AQI grid
+    
+    format=f32 returns raw little-endian float32 (size x size, north row first, NaN = no data)
+    """
+    grid = _current_grid()
+    try:
+        tile = grid.tile(z, x, y, size=size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    version = (aqi_grid_service.metadata or {}).get('version')
+    if format == "f32":
+        return Response(
+            content=tile.astype('<f4').tobytes(),
+            media_type="application/octet-stream",
+            headers={'X-Tile-Size': str(size), 'X-Grid-Version': str(version)}
+        )
+    
+    return {
+        'z': z,
+        'x': x,
+        'y': y,
+        'size': size,
+        'bounds': grid.tile_bounds(z, x, y),
+        'version': version,
+        'values': np.where(np.isnan(tile), None, np.round(tile, 1)).tolist()
+    }
@@ -20,16 +20,153 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 Clustering Consumer - Listen for clustering tasks from RabbitMQ
 """
+import copy
 import json
 import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple, Union
+import numpy as np
+import pandas as pd
 from aio_pika import connect_robust, IncomingMessage
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
-from app.models.clustering import EnvironmentClustering
-from app.utils.data_loader import load_combined_data
+from app.core.executor import task_executor, TaskTimeoutError
+from app.core.model_registry import model_registry
+from app.models.clustering import (
+    CLUSTERING_METHODS, DENSITY_METHODS, EnvironmentClustering, GeoDensityClustering, FEATURES
+)
+from app.utils.data_loader import load_combined_frames
+from app.utils.spatial import StationIndex
+from app.utils.task_store import run_with_result_store, task_payload
 
 logger = logging.getLogger(__name__)
 
+QUEUE_NAME = "clustering"
+
+
+def merge_schools_with_aqi(
+    edu_data: Union[List[Dict[str, Any]], pd.DataFrame],
+    env_data: Union[List[Dict[str, Any]], pd.DataFrame]
+) -> List[Dict[str, Any]]:
+    """
+    Use schools data with nearest AQI measurements (BallTree haversine)
+    
+    Works on columns (DataFrames from load_combined_frames, or lists of dicts).
+    Missing values stay NaN: stations without AQI are not matched, and schools
+    without green_score or coordinates are dropped instead of clustered as zeros.
+    """
+    edu_df = pd.DataFrame(edu_data)
+    env_df = pd.DataFrame(env_data)
+    if edu_df.empty or env_df.empty:
+        return []
+    
+    env_df = env_df[_numeric(env_df, 'aqi').notna()]
+    edu_df = edu_df[_numeric(edu_df, 'green_score').notna()]
+    if edu_df.empty or env_df.empty:
+        return []
+    
+    school_lat = _numeric(edu_df, 'latitude').to_numpy()
+    school_lon = _numeric(edu_df, 'longitude').to_numpy()
+    index = StationIndex(_numeric(env_df, 'latitude').to_numpy(), _numeric(env_df, 'longitude').to_numpy())
+    indices, distances = index.query(school_lat, school_lon)
+    
+    matched = indices >= 0
+    merged = pd.DataFrame({
+        'id': edu_df['id'].to_numpy()[matched],
+        'name': edu_df['name'].to_numpy()[matched] if 'name' in edu_df else None,
+        'latitude': school_lat[matched],
+        'longitude': school_lon[matched],
+        'green_score': _numeric(edu_df, 'green_score').to_numpy()[matched],
+        'aqi': _numeric(env_df, 'aqi').to_numpy()[indices[matched]],
+        'distance_km': np.round(distances[matched], 3)
+    })
+    return merged.to_dict('records')
+
+
+def _numeric(df: pd.DataFrame, name: str) -> pd.Series:
+    """Cột số float64, thiếu cột/giá trị -> NaN"""
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors='coerce').astype(np.float64)
+
+
+def run_clustering(
+    merged_data: List[Dict[str, Any]],
+    n_clusters: int,
+    incremental: bool = False
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Fit clustering model or reuse the registered one (runs in the executor process pool)"""
+    name = f"clustering_k{n_clusters}"
+    clustering = None
+    model_version = None
+    
+    if incremental:
+        # Warm start from the latest registered model unless it is due for a scheduled retrain
+        cached = model_registry.load(name)
+        metadata = cached[1] if cached else None
+        reason = model_registry.retrain_reason(metadata, settings.CLUSTERING_RETRAIN_HOURS)
+        if reason is None:
+            clustering = copy.deepcopy(cached[0])
+            clustering.drift_threshold = settings.CLUSTERING_DRIFT_THRESHOLD
+            model_version = metadata['version']
+        else:
+            logger.info(f"Training {name} from scratch ({reason})")
+    
+    if clustering is not None:
+        results = clustering.fit_predict_incremental(merged_data)
+    else:
+        clustering = EnvironmentClustering(
+            n_clusters=n_clusters,
+            drift_threshold=settings.CLUSTERING_DRIFT_THRESHOLD
+        )
+        results = clustering.fit_predict(merged_data)
+    
+    if incremental and clustering.last_update_mode != "cached":
+        metadata = model_registry.save(
+            name,
+            clustering,
+            training_window={'end': datetime.now(timezone.utc)},
+            metrics={
+                'n_points': len(clustering.seen_keys_),
+                'baseline_distance': clustering.baseline_distance_,
+                'cluster_counts': clustering.counts_.tolist()
+            },
+            feature_schema={'features': FEATURES, 'zones': clustering.cluster_labels},
+            params={'n_clusters': n_clusters, 'drift_threshold': clustering.drift_threshold}
+        )
+        model_version = metadata['version']
+    
+    stats = clustering.get_cluster_stats(results)
+    stats['update_mode'] = clustering.last_update_mode
+    stats['model_version'] = model_version
+    return results, stats
+
+
+def density_options(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Tham số DBSCAN/HDBSCAN từ message, mặc định theo settings"""
+    min_aqi = parameters.get('min_aqi', settings.CLUSTERING_HOTSPOT_MIN_AQI)
+    return {
+        'eps_km': float(parameters.get('eps_km', settings.CLUSTERING_EPS_KM)),
+        'min_samples': int(parameters.get('min_samples', settings.CLUSTERING_MIN_SAMPLES)),
+        'min_cluster_size': int(parameters.get('min_cluster_size', settings.CLUSTERING_MIN_CLUSTER_SIZE)),
+        'min_aqi': float(min_aqi) if min_aqi is not None else None
+    }
+
+
+def run_density_clustering(
+    merged_data: List[Dict[str, Any]],
+    method: str,
+    options: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[str, Any]]:
+    """Hot-spot clustering (DBSCAN/HDBSCAN haversine) + GeoJSON hulls (runs in the executor process pool)"""
+    clustering = GeoDensityClustering(method=method, **options)
+    results = clustering.fit_predict(merged_data)
+    hulls = clustering.cluster_hulls(results)
+    stats = clustering.get_cluster_stats(results)
+    stats['parameters'] = options
+    return results, stats, hulls
+
 
 async def process_clustering_task(message: IncomingMessage):
     """
@@ -42,55 +179,71 @@ async def process_clustering_task(message: IncomingMessage):
         try:
             # Parse message
             body = json.loads(message.body.decode())
-            task_id = body.get('task_id')
-            data_type = body.get('data', {}).get('task_type', 'environment')
-            n_clusters = body.get('data', {}).get('parameters', {}).get('n_clusters', 3)
+            payload = task_payload(body)
+            task_id = body.get('task_id') or message.message_id or str(uuid.uuid4())
+            data_type = payload.get('data_type', 'environment')
+            parameters = payload.get('parameters', {})
+            method = parameters.get('method') or settings.CLUSTERING_METHOD
+            n_clusters = parameters.get('n_clusters', 3)
+            incremental = parameters.get('incremental', settings.CLUSTERING_INCREMENTAL)
+            options = density_options(parameters) if method in DENSITY_METHODS else None
             
-            logger.info(f"Processing clustering task {task_id}: type={data_type}, n_clusters={n_clusters}")
+            logger.info(f"Processing clustering task {task_id}: type={data_type}, method={method}, n_clusters={n_clusters}")
             
-            # Load data from database
-            async with AsyncSessionLocal() as db:
-                combined_data = await load_combined_data(db)
+            async def run_task():
+                if method not in CLUSTERING_METHODS:
+                    raise ValueError(f"Unknown clustering method '{method}', expected one of {CLUSTERING_METHODS}")
+                
+                # Load data from database
+                async with AsyncSessionLocal() as db:
+                    combined_data = await load_combined_frames(db)
                 
                 env_data = combined_data['environment']
                 edu_data = combined_data['education']
                 
                 # Merge data for clustering
-                # Use schools data with nearest AQI measurements
-                merged_data = []
-                for school in edu_data:
-                    # Find nearest AQI measurement (simplified)
-                    if env_data:
-                        closest_env = min(env_data, key=lambda e: 
-                            ((e['latitude'] - school['latitude'])**2 + 
-                             (e['longitude'] - school['longitude'])**2)**0.5
-                        )
-                        
-                        merged_data.append({
-                            'id': school['id'],
-                            'name': school['name'],
-                            'latitude': school['latitude'],
-                            'longitude': school['longitude'],
-                            'green_score': school['green_score'],
-                            'aqi': closest_env['aqi']
-                        })
+                merged_data = await task_executor.run_light(
+                    QUEUE_NAME, merge_schools_with_aqi, edu_data, env_data
+                )
                 
                 if not merged_data:
                     logger.warning(f"No data available for clustering task {task_id}")
-                    return
+                    return None
                 
-                # Run clustering
-                clustering = EnvironmentClustering(n_clusters=n_clusters)
-                results = clustering.fit_predict(merged_data)
-                stats = clustering.get_cluster_stats(results)
+                if options is not None:
+                    results, stats, hulls = await task_executor.run_cpu(
+                        QUEUE_NAME, run_density_clustering, merged_data, method, options
+                    )
+                    logger.info(f"{method} results: {stats['n_clusters']} hot-spots, {stats['noise_points']} noise points")
+                    return {'stats': stats, 'results': results, 'hulls': hulls}
                 
-                logger.info(f"Clustering completed for task {task_id}: {stats}")
+                # Run clustering off the event loop
+                results, stats = await task_executor.run_cpu(
+                    QUEUE_NAME, run_clustering, merged_data, n_clusters, incremental
+                )
                 
-                # TODO: Store results in database or publish to another queue
-                # For now, just log the results
                 logger.info(f"Clustering results: {len(results)} points assigned to {n_clusters} zones")
-                logger.info(f"Zone distribution: {stats}")
-                
+                return {'stats': stats, 'results': results}
+            
+            result = await run_with_result_store(
+                task_id,
+                'clustering',
+                {
+                    'data_type': data_type,
+                    'method': method,
+                    'n_clusters': n_clusters,
+                    'incremental': incremental,
+                    **(options or {})
+                },
+                ('air_quality', 'schools'),
+                run_task
+            )
+            
+            if result is not None:
+                logger.info(f"Clustering completed for task {task_id}: {result['stats']}")
+            
+        except TaskTimeoutError as e:
+            logger.error(f"Clustering task timed out: {e}")
         except Exception as e:
             logger.error(f"Error processing clustering task: {e}", exc_info=True)
 
@@ -101,6 +254,10 @@ async def start_clustering_consumer():
         connection = await connect_robust(settings.RABBITMQ_URL)
         channel = await connection.channel()
         
+        # Limit unacked deliveries to the number of tasks we run at once
+        await channel.set_qos(prefetch_count=settings.CLUSTERING_PREFETCH)
+        task_executor.register_queue(QUEUE_NAME, settings.CLUSTERING_PREFETCH)
+        
         # Declare exchange and queue
         exchange = await channel.declare_exchange('ai.tasks', 'direct', durable=True)
         queue = await channel.declare_queue('ai.clustering.queue', durable=True)
@@ -116,4 +273,3 @@ async def start_clustering_consumer():
     except Exception as e:
         logger.error(f"Error starting clustering consumer: {e}", exc_info=True)
         raise
-
@@ -22,14 +22,47 @@ Correlation Consumer - Listen for correlation analysis tasks from RabbitMQ
 """
 import json
 import logging
+import uuid
+from typing import Dict, Any, Optional
+import pandas as pd
 from aio_pika import connect_robust, IncomingMessage
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.executor import task_executor, TaskTimeoutError
 from app.models.correlation import CorrelationAnalysis
-from app.utils.data_loader import load_combined_data
+from app.utils.data_loader import load_combined_frames
+from app.utils.task_store import run_with_result_store, task_payload
 
 logger = logging.getLogger(__name__)
 
+QUEUE_NAME = "correlation"
+
+
+def run_correlation(
+    env_data: pd.DataFrame,
+    edu_data: pd.DataFrame,
+    analysis_type: str,
+    options: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Run correlation analysis (runs in the executor process pool)"""
+    analyzer = CorrelationAnalysis(
+        min_samples=3,  # Reduced for small dataset
+        max_distance_km=settings.CORRELATION_MAX_DISTANCE_KM
+    )
+    if analysis_type == 'matrix':
+        return analyzer.analyze_matrix(env_data, edu_data, **(options or {}))
+    return analyzer.analyze(env_data, edu_data, method=analysis_type)
+
+
+def matrix_options(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Tham số matrix mode từ message, mặc định theo settings"""
+    return {
+        'p_adjust': parameters.get('p_adjust', settings.CORRELATION_P_ADJUST),
+        'n_bootstrap': int(parameters.get('n_bootstrap', settings.CORRELATION_BOOTSTRAP_RESAMPLES)),
+        'confidence_level': float(parameters.get('confidence_level', settings.CORRELATION_CONFIDENCE_LEVEL)),
+        'random_state': parameters.get('random_state')
+    }
+
 
 async def process_correlation_task(message: IncomingMessage):
     """
@@ -42,35 +75,51 @@ async def process_correlation_task(message: IncomingMessage):
         try:
             # Parse message
             body = json.loads(message.body.decode())
-            task_id = body.get('task_id')
-            analysis_type = body.get('data', {}).get('analysis_type', 'pearson')
+            payload = task_payload(body)
+            task_id = body.get('task_id') or message.message_id or str(uuid.uuid4())
+            analysis_type = payload.get('analysis_type', 'pearson')
+            options = matrix_options(payload.get('parameters', {})) if analysis_type == 'matrix' else None
             
             logger.info(f"Processing correlation task {task_id}: method={analysis_type}")
             
-            # Load data
-            async with AsyncSessionLocal() as db:
-                combined_data = await load_combined_data(db)
+            async def run_task():
+                # Load data
+                async with AsyncSessionLocal() as db:
+                    combined_data = await load_combined_frames(db)
                 
                 env_data = combined_data['environment']
                 edu_data = combined_data['education']
                 
                 if len(env_data) < 3 or len(edu_data) < 3:
                     logger.warning(f"Insufficient data for correlation task {task_id}: env={len(env_data)}, edu={len(edu_data)}")
-                    return
-                
-                # Run correlation analysis
-                analyzer = CorrelationAnalysis(min_samples=3)  # Reduced for small dataset
-                results = analyzer.analyze(env_data, edu_data, method=analysis_type)
+                    return None
                 
+                # Run correlation analysis off the event loop
+                return await task_executor.run_cpu(
+                    QUEUE_NAME, run_correlation, env_data, edu_data, analysis_type, options
+                )
+            
+            results = await run_with_result_store(
+                task_id,
+                'correlation',
+                {
+                    'analysis_type': analysis_type,
+                    'max_distance_km': settings.CORRELATION_MAX_DISTANCE_KM,
+                    'options': options
+                },
+                ('air_quality', 'schools'),
+                run_task
+            )
+            
+            if results is not None:
                 logger.info(f"Correlation analysis completed for task {task_id}")
-                logger.info(f"Results: {results}")
                 
                 # Log insights
                 for insight in results.get('insights', []):
                     logger.info(f"Insight: {insight}")
-                
-                # TODO: Store results in database
-                
+            
+        except TaskTimeoutError as e:
+            logger.error(f"Correlation task timed out: {e}")
         except Exception as e:
             logger.error(f"Error processing correlation task: {e}", exc_info=True)
 
@@ -81,6 +130,10 @@ async def start_correlation_consumer():
         connection = await connect_robust(settings.RABBITMQ_URL)
         channel = await connection.channel()
         
+        # Limit unacked deliveries to the number of tasks we run at once
+        await channel.set_qos(prefetch_count=settings.CORRELATION_PREFETCH)
+        task_executor.register_queue(QUEUE_NAME, settings.CORRELATION_PREFETCH)
+        
         # Declare exchange and queue
         exchange = await channel.declare_exchange('ai.tasks', 'direct', durable=True)
         queue = await channel.declare_queue('ai.correlation.queue', durable=True)
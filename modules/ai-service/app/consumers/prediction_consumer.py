@@ -20,16 +20,124 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 Prediction Consumer - Listen for prediction tasks from RabbitMQ
 """
+import copy
 import json
 import logging
+import uuid
+from typing import List, Dict, Any, Callable, Tuple
+import pandas as pd
 from aio_pika import connect_robust, IncomingMessage
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
-from app.models.prediction import AQIPrediction
-from app.utils.data_loader import load_air_quality_data
+from app.core.executor import task_executor, TaskTimeoutError
+from app.core.model_registry import model_registry
+from app.models.prediction import AQIPrediction, BatchAQIPrediction
+from app.utils.data_loader import load_bucketed_history
+from app.utils.timeseries import regularize_buckets
+from app.utils.task_store import run_with_result_store, task_payload
 
 logger = logging.getLogger(__name__)
 
+QUEUE_NAME = "prediction"
+
+
+def bucket_settings() -> Dict[str, Any]:
+    """Cấu hình resample/gap fill áp dụng cho bucketed history"""
+    return {
+        'bucket': settings.PREDICTION_BUCKET,
+        'resample': settings.PREDICTION_RESAMPLE,
+        'gap_fill': settings.PREDICTION_GAP_FILL,
+        'max_gap': settings.PREDICTION_MAX_GAP
+    }
+
+
+def fitted_predictor(
+    name: str,
+    series: pd.DataFrame,
+    new_model: Callable[[], AQIPrediction],
+    fit: Callable[[AQIPrediction, pd.DataFrame], Any],
+    forecast_days: int,
+    preprocessing: Dict[str, Any]
+) -> Tuple[AQIPrediction, Dict[str, Any]]:
+    """
+    Dùng lại model từ registry nếu còn hạn và không drift, ngược lại fit và lưu version mới
+    
+    Returns:
+        (predictor, model info: name, version, mode, retrain reason)
+    """
+    feature_schema = {'features': AQIPrediction.FEATURE_COLS, 'target': 'aqi', **preprocessing}
+    
+    cached = model_registry.load(name)
+    metadata = cached[1] if cached else None
+    reason = model_registry.retrain_reason(metadata, settings.PREDICTION_RETRAIN_HOURS)
+    
+    if reason is None and metadata['feature_schema'] != feature_schema:
+        reason = "schema"
+    
+    if reason is None:
+        # Copy nông: hệ số (mmap read-only) dùng chung, chỉ thay trạng thái cuối
+        predictor = copy.copy(cached[0])
+        predictor.forecast_days = forecast_days
+        drift = predictor.drift_ratio(series)
+        reason = model_registry.retrain_reason(
+            metadata, drift=drift, drift_threshold=settings.PREDICTION_DRIFT_THRESHOLD
+        )
+        if reason is None and not predictor.refresh_state(series):
+            reason = "stations"
+        if reason is None:
+            return predictor, {'name': name, 'version': metadata['version'], 'mode': 'cached', 'drift': round(drift, 3)}
+    
+    logger.info(f"Training {name} ({reason})")
+    predictor = new_model()
+    fit(predictor, series)
+    metadata = model_registry.save(
+        name,
+        predictor,
+        training_window={'start': predictor.trained_from, 'end': predictor.trained_until},
+        metrics={'train_mae': predictor.train_mae_, 'n_samples': len(series)},
+        feature_schema=feature_schema,
+        params={'forecast_days': forecast_days}
+    )
+    return predictor, {'name': name, 'version': metadata['version'], 'mode': 'trained', 'reason': reason}
+
+
+def run_prediction(
+    history: pd.DataFrame,
+    forecast_days: int,
+    preprocessing: Dict[str, Any],
+    location_id: str
+) -> List[Dict[str, Any]]:
+    """Regularize buckets, fit or reuse prediction model and forecast (runs in the executor process pool)"""
+    series = regularize_buckets(history, **preprocessing)
+    predictor, model_info = fitted_predictor(
+        f"prediction_{location_id}",
+        series,
+        lambda: AQIPrediction(forecast_days=forecast_days),
+        AQIPrediction.fit,
+        forecast_days,
+        preprocessing
+    )
+    logger.info(f"Forecasting {location_id} with model {model_info}")
+    return predictor.predict_future()
+
+
+def run_batch_prediction(history: pd.DataFrame, forecast_days: int, preprocessing: Dict[str, Any]) -> Dict[str, Any]:
+    """Regularize buckets, fit or reuse per-station models and forecast all stations (runs in the executor process pool)"""
+    series = regularize_buckets(history, **preprocessing)
+    predictor, model_info = fitted_predictor(
+        "prediction_batch",
+        series,
+        lambda: BatchAQIPrediction(forecast_days=forecast_days),
+        BatchAQIPrediction.fit_batch,
+        forecast_days,
+        preprocessing
+    )
+    return {
+        'stations': predictor.predict_future_batch(),
+        'skipped_stations': predictor.skipped_stations,
+        'model': model_info
+    }
+
 
 async def process_prediction_task(message: IncomingMessage):
     """
@@ -42,31 +150,69 @@ async def process_prediction_task(message: IncomingMessage):
         try:
             # Parse message
             body = json.loads(message.body.decode())
-            task_id = body.get('task_id')
-            prediction_type = body.get('data', {}).get('prediction_type', 'air_quality')
-            location_id = body.get('data', {}).get('location_id')
-            forecast_days = body.get('data', {}).get('forecast_days', 7)
+            payload = task_payload(body)
+            task_id = body.get('task_id') or message.message_id or str(uuid.uuid4())
+            prediction_type = payload.get('prediction_type', 'air_quality')
+            location_id = payload.get('location_id')
+            forecast_days = payload.get('forecast_days') or payload.get('parameters', {}).get('forecast_days', 7)
             
             logger.info(f"Processing prediction task {task_id}: type={prediction_type}, location={location_id}")
             
-            # Load historical data
-            async with AsyncSessionLocal() as db:
-                air_data = await load_air_quality_data(db, location_id=location_id, limit=100)
+            preprocessing = bucket_settings()
+            
+            async def run_task():
+                # Aggregate raw readings into per-station buckets in Postgres
+                async with AsyncSessionLocal() as db:
+                    history = await load_bucketed_history(
+                        db,
+                        bucket=settings.PREDICTION_BUCKET,
+                        aggregate=settings.PREDICTION_BUCKET_AGGREGATE,
+                        lookback_days=settings.PREDICTION_LOOKBACK_DAYS,
+                        location_id=location_id
+                    )
                 
-                if len(air_data) < 10:
-                    logger.warning(f"Insufficient data for prediction task {task_id}: only {len(air_data)} records")
-                    return
+                # No location: forecast every station in one batch
+                if not location_id:
+                    if history.empty:
+                        logger.warning(f"No station data for batch prediction task {task_id}")
+                        return None
+                    
+                    return await task_executor.run_cpu(
+                        QUEUE_NAME, run_batch_prediction, history, forecast_days, preprocessing
+                    )
                 
-                # Run prediction
-                predictor = AQIPrediction(forecast_days=forecast_days)
-                predictor.fit(air_data)
-                predictions = predictor.predict_future()
+                if len(history) < 10:
+                    logger.warning(f"Insufficient data for prediction task {task_id}: only {len(history)} buckets")
+                    return None
                 
+                # Run prediction off the event loop
+                return await task_executor.run_cpu(
+                    QUEUE_NAME, run_prediction, history, forecast_days, preprocessing, location_id
+                )
+            
+            predictions = await run_with_result_store(
+                task_id,
+                'prediction',
+                {
+                    'prediction_type': prediction_type,
+                    'location_id': location_id,
+                    'forecast_days': forecast_days,
+                    'aggregate': settings.PREDICTION_BUCKET_AGGREGATE,
+                    'lookback_days': settings.PREDICTION_LOOKBACK_DAYS,
+                    **preprocessing
+                },
+                ('air_quality',),
+                run_task
+            )
+            
+            if isinstance(predictions, dict):
+                logger.info(f"Batch prediction completed for task {task_id}: {len(predictions['stations'])} stations forecasted")
+            elif predictions is not None:
                 logger.info(f"Prediction completed for task {task_id}: {len(predictions)} days forecasted")
                 logger.info(f"Predictions: {predictions}")
-                
-                # TODO: Store results in database
-                
+            
+        except TaskTimeoutError as e:
+            logger.error(f"Prediction task timed out: {e}")
         except Exception as e:
             logger.error(f"Error processing prediction task: {e}", exc_info=True)
 
@@ -77,6 +223,10 @@ async def start_prediction_consumer():
         connection = await connect_robust(settings.RABBITMQ_URL)
         channel = await connection.channel()
         
+        # Limit unacked deliveries to the number of tasks we run at once
+        await channel.set_qos(prefetch_count=settings.PREDICTION_PREFETCH)
+        task_executor.register_queue(QUEUE_NAME, settings.PREDICTION_PREFETCH)
+        
         # Declare exchange and queue
         exchange = await channel.declare_exchange('ai.tasks', 'direct', durable=True)
         queue = await channel.declare_queue('ai.prediction.queue', durable=True)
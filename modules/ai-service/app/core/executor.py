@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Task Executor - Chạy ML workload ngoài event loop
+Process pool cho các bước fit (CPU-bound), thread pool cho việc nhẹ.
+Mỗi queue có giới hạn số task đang chạy bằng đúng prefetch của channel,
+nên một job clustering lớn không chiếm hết worker của prediction.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskTimeoutError(Exception):
+    """Task vượt quá thời gian cho phép"""
+    pass
+
+
+class TaskExecutor:
+    """Executor layer dùng chung cho các consumers"""
+    
+    def __init__(
+        self,
+        process_workers: int,
+        thread_workers: int,
+        default_timeout: float,
+        start_method: str = "spawn"
+    ):
+        """
+        Args:
+            process_workers: Số process cho ML fits
+            thread_workers: Số thread cho việc nhẹ
+            default_timeout: Timeout mặc định mỗi task (giây)
+            start_method: multiprocessing start method ("spawn" an toàn khi đang có event loop)
+        """
+        self.process_workers = process_workers
+        self.thread_workers = thread_workers
+        self.default_timeout = default_timeout
+        self.start_method = start_method
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+    
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._process_pool
+    
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="ai-light"
+            )
+        return self._thread_pool
+    
+    def register_queue(self, name: str, max_in_flight: int):
+        """
+        Đăng ký giới hạn task đang chạy cho một queue
+        
+        Args:
+            name: Tên queue (vd: "clustering")
+            max_in_flight: Số task tối đa, nên bằng prefetch_count của channel
+        """
+        self._limits[name] = asyncio.Semaphore(max_in_flight)
+        self._in_flight[name] = 0
+        logger.info(f"Executor: queue '{name}' limited to {max_in_flight} in-flight tasks")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Số task đang chạy theo từng queue"""
+        return {
+            "process_workers": self.process_workers,
+            "thread_workers": self.thread_workers,
+            "in_flight": dict(self._in_flight)
+        }
+    
+    async def run_cpu(
+        self,
+        queue: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Chạy hàm CPU-bound (fit/predict) trong process pool
+        
+        fn và các tham số phải pickle được (hàm module-level).
+        """
+        return await self._run(self.process_pool, queue, fn, args, kwargs, timeout)
+    
+    async def run_light(
+        self,
+        queue: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Chạy việc nhẹ (merge, thống kê) trong thread pool"""
+        return await self._run(self.thread_pool, queue, fn, args, kwargs, timeout)
+    
+    async def _run(
+        self,
+        pool: Executor,
+        queue: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        timeout: Optional[float]
+    ) -> Any:
+        limit = self._limits.get(queue)
+        if limit is None:
+            raise ValueError(f"Queue '{queue}' is not registered with the executor")
+        
+        timeout = timeout if timeout is not None else self.default_timeout
+        loop = asyncio.get_running_loop()
+        
+        await limit.acquire()
+        self._in_flight[queue] += 1
+        
+        def release():
+            self._in_flight[queue] -= 1
+            limit.release()
+        
+        try:
+            cf = pool.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(cf), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Task chưa bắt đầu sẽ bị hủy; task đang chạy trong process
+            # không thể ngắt giữa chừng, kết quả của nó sẽ bị bỏ qua
+            cf.cancel()
+            raise TaskTimeoutError(f"{queue} task exceeded {timeout}s")
+        finally:
+            # Giữ slot của queue cho tới khi worker thực sự xong việc,
+            # nếu không task quá hạn vẫn chạy ngoài giới hạn của queue
+            if cf.done():
+                release()
+            else:
+                cf.add_done_callback(partial(self._release_from_worker, loop, release))
+    
+    @staticmethod
+    def _release_from_worker(loop: asyncio.AbstractEventLoop, release: Callable[[], None], _future: Any):
+        """Trả slot về event loop khi future của pool kết thúc (gọi từ worker thread)"""
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # Event loop đã đóng, không còn ai chờ slot
+            pass
+    
+    def shutdown(self, wait: bool = False):
+        """Dừng các pool, hủy các task còn trong hàng đợi"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=wait, cancel_futures=True)
+            self._thread_pool = None
+        logger.info("Task executor shut down")
+
+
+# Global instance
+task_executor = TaskExecutor(
+    process_workers=settings.EXECUTOR_PROCESS_WORKERS,
+    thread_workers=settings.EXECUTOR_THREAD_WORKERS,
+    default_timeout=settings.EXECUTOR_TASK_TIMEOUT,
+    start_method=settings.EXECUTOR_START_METHOD
+)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Model Registry - Lưu và nạp lại model đã fit
+Mỗi model có nhiều version trên đĩa (joblib, không nén để nạp bằng mmap),
+kèm metadata: training window, metrics, feature schema.
+Model đã nạp được giữ trong LRU của từng process, nên các task lặp lại
+không phải fit hay đọc lại artifact.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FILE = "model.joblib"
+METADATA_FILE = "metadata.json"
+LATEST_FILE = "LATEST"
+
+
+def _isoformat(value: Any) -> Optional[str]:
+    """Chuẩn hóa mốc thời gian (datetime / pandas Timestamp / str) thành ISO string"""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class ModelRegistry:
+    """Registry model cục bộ, version hóa theo tên model"""
+    
+    def __init__(
+        self,
+        root_dir: str,
+        cache_size: int = 8,
+        keep_versions: int = 5,
+        mmap_mode: Optional[str] = "r"
+    ):
+        """
+        Args:
+            root_dir: Thư mục gốc chứa artifacts
+            cache_size: Số model tối đa giữ trong LRU của process
+            keep_versions: Số version gần nhất giữ lại trên đĩa mỗi model
+            mmap_mode: Chế độ mmap khi nạp mảng NumPy (None để đọc hết vào RAM)
+        """
+        self.root_dir = root_dir
+        self.cache_size = cache_size
+        self.keep_versions = keep_versions
+        self.mmap_mode = mmap_mode
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    # Layout trên đĩa: <root>/<name>/v0001/{model.joblib, metadata.json}, <root>/<name>/LATEST
+    
+    @staticmethod
+    def _safe_name(name: str) -> str:
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+    
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root_dir, self._safe_name(name))
+    
+    def _version_dir(self, name: str, version: int) -> str:
+        return os.path.join(self._model_dir(name), f"v{version:04d}")
+    
+    def list_models(self) -> List[str]:
+        """Tên các model đã có ít nhất một version"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root_dir)
+            if self.list_versions(entry)
+        )
+    
+    def list_versions(self, name: str) -> List[int]:
+        """Các version đã lưu của model, tăng dần"""
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = []
+        for entry in os.listdir(model_dir):
+            match = re.fullmatch(r'v(\d+)', entry)
+            if match and os.path.exists(os.path.join(model_dir, entry, METADATA_FILE)):
+                versions.append(int(match.group(1)))
+        return sorted(versions)
+    
+    def latest_version(self, name: str) -> Optional[int]:
+        """Version mới nhất (theo file LATEST, fallback version lớn nhất trên đĩa)"""
+        try:
+            with open(os.path.join(self._model_dir(name), LATEST_FILE)) as f:
+                version = int(f.read().strip())
+            if os.path.isdir(self._version_dir(name, version)):
+                return version
+        except (OSError, ValueError):
+            pass
+        versions = self.list_versions(name)
+        return versions[-1] if versions else None
+    
+    def get_metadata(self, name: str, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Đọc metadata của một version (mặc định: mới nhất)"""
+        if version is None:
+            version = self.latest_version(name)
+            if version is None:
+                return None
+        try:
+            with open(os.path.join(self._version_dir(name, version), METADATA_FILE)) as f:
+                return json.load(f)
+        except OSError:
+            return None
+    
+    def save(
+        self,
+        name: str,
+        model: Any,
+        training_window: Optional[Dict[str, Any]] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+        feature_schema: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Lưu model thành version mới và đánh dấu là LATEST
+        
+        Args:
+            name: Tên model (ví dụ "clustering_k3")
+            model: Đối tượng đã fit (picklable)
+            training_window: {'start', 'end'} của dữ liệu train
+            metrics: Chỉ số đánh giá lúc train
+            feature_schema: Features / target model dùng
+            params: Tham số tạo model
+        
+        Returns:
+            Metadata của version vừa lưu
+        """
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        
+        window = training_window or {}
+        metadata = {
+            'name': name,
+            'version': None,
+            'model_class': type(model).__name__,
+            'trained_at': datetime.now(timezone.utc).isoformat(),
+            'training_window': {
+                'start': _isoformat(window.get('start')),
+                'end': _isoformat(window.get('end'))
+            },
+            'metrics': metrics or {},
+            'feature_schema': feature_schema or {},
+            'params': params or {}
+        }
+        
+        # Ghi vào thư mục tạm rồi rename, nhiều worker process có thể lưu cùng lúc
+        tmp_dir = os.path.join(model_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        joblib.dump(model, os.path.join(tmp_dir, ARTIFACT_FILE))
+        
+        version = (self.latest_version(name) or 0) + 1
+        while True:
+            metadata['version'] = version
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            try:
+                os.rename(tmp_dir, self._version_dir(name, version))
+                break
+            except OSError:
+                if not os.path.isdir(self._version_dir(name, version)):
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    raise
+                version += 1
+        
+        latest_tmp = os.path.join(model_dir, f"{LATEST_FILE}.tmp-{os.getpid()}")
+        with open(latest_tmp, 'w') as f:
+            f.write(str(version))
+        os.replace(latest_tmp, os.path.join(model_dir, LATEST_FILE))
+        
+        self._cache_put((name, version), (model, metadata))
+        self._prune(name)
+        
+        logger.info(f"Saved model {name} v{version} ({metadata['model_class']})")
+        return metadata
+    
+    def load(self, name: str, version: Optional[int] = None) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Nạp model (ưu tiên LRU, sau đó joblib mmap từ đĩa)
+        
+        Model trả về dùng chung trong process và các mảng có thể là mmap read-only:
+        copy trước khi thay đổi trạng thái.
+        
+        Returns:
+            (model, metadata) hoặc None nếu chưa có
+        """
+        if version is None:
+            version = self.latest_version(name)
+            if version is None:
+                return None
+        
+        key = (name, version)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return self._cache[key]
+            self._misses += 1
+        
+        metadata = self.get_metadata(name, version)
+        if metadata is None:
+            return None
+        
+        try:
+            model = joblib.load(
+                os.path.join(self._version_dir(name, version), ARTIFACT_FILE),
+                mmap_mode=self.mmap_mode
+            )
+        except Exception as e:
+            logger.error(f"Failed to load model {name} v{version}: {e}")
+            return None
+        
+        self._cache_put(key, (model, metadata))
+        logger.info(f"Loaded model {name} v{version} from registry")
+        return model, metadata
+    
+    def retrain_reason(
+        self,
+        metadata: Optional[Dict[str, Any]],
+        max_age_hours: Optional[float] = None,
+        drift: Optional[float] = None,
+        drift_threshold: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Quyết định có cần train lại không: chỉ theo lịch (tuổi model) hoặc drift
+        
+        Returns:
+            "missing" / "schedule" / "drift", hoặc None nếu dùng lại được model
+        """
+        if metadata is None:
+            return "missing"
+        
+        if max_age_hours:
+            trained_at = datetime.fromisoformat(metadata['trained_at'])
+            age_hours = (datetime.now(timezone.utc) - trained_at).total_seconds() / 3600
+            if age_hours > max_age_hours:
+                return "schedule"
+        
+        if drift is not None and drift_threshold is not None and drift > drift_threshold:
+            return "drift"
+        
+        return None
+    
+    def _cache_put(self, key: Tuple[str, int], value: Tuple[Any, Dict[str, Any]]):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _prune(self, name: str):
+        """Xóa các version cũ, giữ keep_versions bản gần nhất"""
+        if self.keep_versions <= 0:
+            return
+        for version in self.list_versions(name)[:-self.keep_versions]:
+            shutil.rmtree(self._version_dir(name, version), ignore_errors=True)
+            with self._lock:
+                self._cache.pop((name, version), None)
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Thống kê LRU của process hiện tại"""
+        with self._lock:
+            return {
+                'size': len(self._cache),
+                'capacity': self.cache_size,
+                'hits': self._hits,
+                'misses': self._misses
+            }
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Global registry (mỗi worker process có LRU riêng)
+model_registry = ModelRegistry(
+    settings.MODEL_STATE_DIR,
+    cache_size=settings.MODEL_REGISTRY_CACHE_SIZE,
+    keep_versions=settings.MODEL_REGISTRY_KEEP_VERSIONS
+)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+AQI Grid Job - Định kỳ tính lại bề mặt AQI nội suy (IDW)
+Lưới mới được lưu vào model registry và thay thế lưới đang phục vụ trong bộ nhớ
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.executor import task_executor
+from app.core.model_registry import model_registry
+from app.models.interpolation import AQIGrid
+from app.utils.data_loader import load_latest_station_aqi
+
+logger = logging.getLogger(__name__)
+
+QUEUE_NAME = "aqi_grid"
+MODEL_NAME = "aqi_grid"
+
+
+def grid_params() -> Dict[str, Any]:
+    """Tham số lưới từ settings"""
+    return {
+        'min_lat': settings.AQI_GRID_MIN_LAT,
+        'min_lon': settings.AQI_GRID_MIN_LON,
+        'max_lat': settings.AQI_GRID_MAX_LAT,
+        'max_lon': settings.AQI_GRID_MAX_LON,
+        'resolution': settings.AQI_GRID_RESOLUTION,
+        'neighbors': settings.AQI_GRID_NEIGHBORS,
+        'power': settings.AQI_GRID_POWER,
+        'max_distance_km': settings.AQI_GRID_MAX_DISTANCE_KM
+    }
+
+
+def build_grid(stations: pd.DataFrame, params: Dict[str, Any]) -> AQIGrid:
+    """Compute the IDW grid (runs in the executor process pool)"""
+    return AQIGrid(**params).fit(stations['latitude'], stations['longitude'], stations['aqi'])
+
+
+class AQIGridService:
+    """Giữ lưới AQI hiện hành trong bộ nhớ và làm mới định kỳ"""
+    
+    def __init__(self):
+        self.grid: Optional[AQIGrid] = None
+        self.metadata: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def load_latest(self) -> bool:
+        """Nạp lưới mới nhất từ registry (mmap) khi khởi động"""
+        cached = model_registry.load(MODEL_NAME)
+        if cached is None:
+            return False
+        self.grid, self.metadata = cached
+        logger.info(f"Serving AQI grid v{self.metadata['version']} from registry")
+        return True
+    
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        Tính lại lưới từ AQI mới nhất của các trạm
+        
+        Returns:
+            Metadata của version mới, None nếu không có dữ liệu
+        """
+        async with AsyncSessionLocal() as db:
+            stations = await load_latest_station_aqi(db, max_age_hours=settings.AQI_GRID_MAX_AGE_HOURS)
+        
+        if stations.empty:
+            logger.warning("No recent station AQI, keeping current AQI grid")
+            return None
+        
+        params = grid_params()
+        grid = await task_executor.run_cpu(QUEUE_NAME, build_grid, stations, params)
+        
+        description = grid.describe()
+        metadata = await task_executor.run_light(
+            QUEUE_NAME,
+            model_registry.save,
+            MODEL_NAME,
+            grid,
+            {'start': stations['measured_at'].min(), 'end': stations['measured_at'].max()},
+            {'n_stations': grid.n_stations, 'coverage': description['coverage']},
+            {'bounds': description['bounds'], 'resolution': grid.resolution, 'dtype': 'float32'},
+            params
+        )
+        
+        # Đổi tham chiếu: request đang đọc lưới cũ vẫn dùng được lưới cũ
+        self.grid, self.metadata = grid, metadata
+        return metadata
+    
+    async def run_forever(self, interval: float):
+        """Làm mới lưới mỗi interval giây"""
+        while True:
+            try:
+                metadata = await self.refresh()
+                if metadata:
+                    logger.info(f"AQI grid v{metadata['version']} refreshed at {datetime.now(timezone.utc).isoformat()}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing AQI grid: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+    
+    def start(self):
+        """Start the periodic refresh task"""
+        task_executor.register_queue(QUEUE_NAME, 1)
+        self.load_latest()
+        self._task = asyncio.create_task(self.run_forever(settings.AQI_GRID_REFRESH_SECONDS))
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# Global service instance
+aqi_grid_service = AQIGridService()
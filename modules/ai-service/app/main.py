@@ -23,7 +23,12 @@ Starts all RabbitMQ consumers for ML tasks
 """
 import asyncio
 import logging
+import uvicorn
+from app.api import api
 from app.core.config import settings
+from app.core.executor import task_executor
+from app.core.model_registry import model_registry
+from app.jobs.aqi_grid import aqi_grid_service
 from app.consumers.clustering_consumer import start_clustering_consumer
 from app.consumers.prediction_consumer import start_prediction_consumer
 from app.consumers.correlation_consumer import start_correlation_consumer
@@ -42,6 +47,7 @@ async def main():
     logger.info(f"Starting {settings.APP_NAME} v{settings.VERSION}")
     logger.info(f"Database: {settings.DATABASE_URL}")
     logger.info(f"RabbitMQ: {settings.RABBITMQ_URL}")
+    logger.info(f"Model registry: {settings.MODEL_STATE_DIR} ({len(model_registry.list_models())} models)")
     
     try:
         # Start all consumers
@@ -58,14 +64,29 @@ async def main():
         logger.info("  - ai.prediction tasks")
         logger.info("  - ai.correlation tasks")
         
-        # Keep running
-        await asyncio.Future()
+        # Periodically recompute the interpolated AQI surface
+        if settings.AQI_GRID_ENABLED:
+            aqi_grid_service.start()
+            logger.info(f"AQI grid refresh every {settings.AQI_GRID_REFRESH_SECONDS:.0f}s")
+        
+        # Serve task status/result API (keeps running)
+        server = uvicorn.Server(uvicorn.Config(
+            api,
+            host=settings.API_HOST,
+            port=settings.API_PORT,
+            log_level="info" if settings.DEBUG else "warning"
+        ))
+        logger.info(f"Task API listening on {settings.API_HOST}:{settings.API_PORT}")
+        await server.serve()
         
     except KeyboardInterrupt:
         logger.info("Shutting down AI Service...")
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
         raise
+    finally:
+        await aqi_grid_service.stop()
+        task_executor.shutdown()
 
 
 if __name__ == "__main__":
@@ -20,27 +20,44 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 Clustering Model - Phân vùng xanh/vàng/đỏ
 Sử dụng K-Means để phân vùng dựa trên AQI và Green Score
+Hỗ trợ chế độ incremental: giữ centroids giữa các lần chạy (model registry) làm warm start
+khi có điểm mới/thay đổi, fit lại toàn bộ khi drift vượt ngưỡng
+Phát hiện hot-spot theo mật độ (DBSCAN/HDBSCAN, khoảng cách great-circle) kèm hull GeoJSON
 """
 import numpy as np
-from sklearn.cluster import KMeans
+import pandas as pd
+from scipy.spatial import ConvexHull, QhullError
+from sklearn.cluster import DBSCAN, HDBSCAN, KMeans
 from sklearn.preprocessing import StandardScaler
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
+from app.utils.spatial import EARTH_RADIUS_KM, coordinates_from_records
+
 logger = logging.getLogger(__name__)
 
+FEATURES = ['aqi', 'green_score', 'latitude', 'longitude']
+AQI_FEATURE = 0  # Vị trí cột AQI trong feature matrix
+
+CLUSTERING_METHODS = ('kmeans', 'dbscan', 'hdbscan')
+DENSITY_METHODS = ('dbscan', 'hdbscan')
+NOISE_LABEL = -1
+
 
 class EnvironmentClustering:
     """Phân vùng môi trường - giáo dục"""
     
-    def __init__(self, n_clusters: int = 3):
+    def __init__(self, n_clusters: int = 3, drift_threshold: float = 1.5):
         """
         Initialize clustering model
         
         Args:
             n_clusters: Số clusters (mặc định 3: xanh, vàng, đỏ)
+            drift_threshold: Tỉ lệ khoảng cách trung bình tới centroid của điểm mới
+                so với lúc fit; vượt ngưỡng thì fit lại toàn bộ (chế độ incremental)
         """
         self.n_clusters = n_clusters
+        self.drift_threshold = drift_threshold
         self.model = None
         self.scaler = StandardScaler()
         self.cluster_labels = {
@@ -48,34 +65,42 @@ class EnvironmentClustering:
             1: "yellow",   # Vùng trung bình
             2: "red"       # Vùng kém
         }
+        
+        # Trạng thái được lưu giữa các lần chạy
+        # centroids_ ở không gian gốc (chưa scale), sắp xếp theo AQI tăng dần
+        # nên cluster_id 0 luôn là vùng AQI thấp nhất
+        self.centroids_: Optional[np.ndarray] = None
+        self.counts_: Optional[np.ndarray] = None
+        self.baseline_distance_: Optional[float] = None
+        self.seen_keys_: np.ndarray = np.array([], dtype=np.uint64)
+        self.last_update_mode: Optional[str] = None
     
-    def prepare_data(self, data: List[Dict[str, Any]]) -> np.ndarray:
+    def _extract_features(self, data: List[Dict[str, Any]]) -> np.ndarray:
+        """Trích feature matrix (chưa normalize) từ data"""
+        if not data:
+            raise ValueError("No data provided for clustering")
+        
+        features = []
+        for item in data:
+            features.append([item.get(name, 0) for name in FEATURES])
+        
+        return np.array(features, dtype=np.float64)
+    
+    def prepare_data(self, data: List[Dict[str, Any]], fit_scaler: bool = True) -> np.ndarray:
         """
         Chuẩn bị dữ liệu cho clustering
         
         Args:
             data: List of dict với keys: aqi, green_score, latitude, longitude
+            fit_scaler: Fit lại scaler (False = dùng thống kê đã lưu)
         
         Returns:
             numpy array đã normalize
         """
-        if not data:
-            raise ValueError("No data provided for clustering")
-        
-        # Extract features
-        features = []
-        for item in data:
-            features.append([
-                item.get('aqi', 0),
-                item.get('green_score', 0),
-                item.get('latitude', 0),
-                item.get('longitude', 0)
-            ])
-        
-        X = np.array(features)
+        X = self._extract_features(data)
         
         # Normalize
-        X_scaled = self.scaler.fit_transform(X)
+        X_scaled = self.scaler.fit_transform(X) if fit_scaler else self.scaler.transform(X)
         
         logger.info(f"Prepared {len(data)} samples for clustering")
         return X_scaled
@@ -96,10 +121,29 @@ class EnvironmentClustering:
             n_init=10
         )
         self.model.fit(X)
+        self._store_centroids(X, self.model.cluster_centers_, self.model.labels_)
         
         logger.info(f"Clustering model trained with {self.n_clusters} clusters")
         return self
     
+    def _store_centroids(self, X: np.ndarray, centers_scaled: np.ndarray, labels: np.ndarray):
+        """Lưu centroids (không gian gốc, sắp theo AQI), số điểm và khoảng cách baseline"""
+        centroids = self.scaler.inverse_transform(centers_scaled)
+        order = np.argsort(centroids[:, AQI_FEATURE], kind='stable')
+        
+        self.centroids_ = centroids[order]
+        self.counts_ = np.bincount(labels, minlength=self.n_clusters)[order].astype(np.float64)
+        
+        distances = np.linalg.norm(X - centers_scaled[labels], axis=1)
+        self.baseline_distance_ = float(distances.mean()) if len(distances) else 0.0
+    
+    def _nearest_centroid(self, X: np.ndarray) -> tuple:
+        """(labels, distances) tới centroid gần nhất trong không gian đã scale"""
+        centers = self.scaler.transform(self.centroids_)
+        distances = np.linalg.norm(X[:, None, :] - centers[None, :, :], axis=2)
+        labels = distances.argmin(axis=1)
+        return labels, distances[np.arange(len(X)), labels]
+    
     def predict(self, X: np.ndarray) -> np.ndarray:
         """
         Predict cluster labels
@@ -108,16 +152,20 @@ class EnvironmentClustering:
             X: Feature matrix
         
         Returns:
-            Cluster labels
+            Cluster labels (0 = centroid có AQI thấp nhất)
         """
-        if self.model is None:
+        if self.centroids_ is None:
             raise ValueError("Model not trained yet")
         
-        return self.model.predict(X)
+        labels, _ = self._nearest_centroid(X)
+        return labels
     
     def assign_zones(self, data: List[Dict[str, Any]], labels: np.ndarray) -> List[Dict[str, Any]]:
         """
-        Gán nhãn vùng (green/yellow/red) dựa trên AQI trung bình của cluster
+        Gán nhãn vùng (green/yellow/red) dựa trên AQI của cluster
+        
+        Cluster ids đã được sắp theo AQI của centroid, nên mapping
+        green/yellow/red giữ ổn định giữa các lần chạy incremental
         
         Args:
             data: Original data
@@ -131,22 +179,21 @@ class EnvironmentClustering:
         for i in range(self.n_clusters):
             cluster_mask = labels == i
             cluster_data = [data[j] for j in range(len(data)) if cluster_mask[j]]
-            avg_aqi = np.mean([d.get('aqi', 0) for d in cluster_data])
-            cluster_aqi[i] = avg_aqi
+            if cluster_data:
+                cluster_aqi[i] = np.mean([d.get('aqi', 0) for d in cluster_data])
+            else:
+                cluster_aqi[i] = float(self.centroids_[i, AQI_FEATURE])
         
-        # Sắp xếp clusters theo AQI (thấp -> cao)
-        sorted_clusters = sorted(cluster_aqi.items(), key=lambda x: x[1])
-        
-        # Map clusters to zones
+        # Map clusters to zones (cluster ids sắp theo AQI thấp -> cao)
         cluster_to_zone = {}
         if self.n_clusters == 3:
-            cluster_to_zone[sorted_clusters[0][0]] = "green"    # AQI thấp nhất
-            cluster_to_zone[sorted_clusters[1][0]] = "yellow"   # AQI trung bình
-            cluster_to_zone[sorted_clusters[2][0]] = "red"      # AQI cao nhất
+            cluster_to_zone[0] = "green"    # AQI thấp nhất
+            cluster_to_zone[1] = "yellow"   # AQI trung bình
+            cluster_to_zone[2] = "red"      # AQI cao nhất
         else:
             # For other n_clusters, use generic naming
-            for idx, (cluster_id, _) in enumerate(sorted_clusters):
-                cluster_to_zone[cluster_id] = f"zone_{idx}"
+            for idx in range(self.n_clusters):
+                cluster_to_zone[idx] = f"zone_{idx}"
         
         # Gán zone cho từng data point
         results = []
@@ -176,8 +223,88 @@ class EnvironmentClustering:
         labels = self.predict(X)
         results = self.assign_zones(data, labels)
         
+        self.seen_keys_ = self._point_keys(data)
+        self.last_update_mode = "full"
         return results
     
+    @staticmethod
+    def _point_keys(data: List[Dict[str, Any]]) -> np.ndarray:
+        """Hash ổn định (id + features) của từng điểm để nhận biết điểm mới/thay đổi"""
+        df = pd.DataFrame(
+            [[str(item.get('id'))] + [item.get(name, 0) for name in FEATURES] for item in data],
+            columns=['id'] + FEATURES
+        )
+        return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+    
+    def fit_predict_incremental(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Cập nhật model từ centroids đã lưu thay vì fit lại từ đầu
+        
+        - Chưa có trạng thái: fit toàn bộ (KMeans n_init=10)
+        - Có điểm mới/thay đổi: scaler và số điểm mỗi cluster được tính lại trên
+          tập điểm hiện tại (điểm đổi giá trị thay thế dòng cũ, không cộng dồn);
+          centroids được warm start - gán điểm vào centroid gần nhất rồi lấy trung
+          bình (một bước Lloyd), không chạy lại KMeans n_init=10
+        - Drift (khoảng cách trung bình tới centroid của điểm mới/thay đổi so với
+          baseline) vượt drift_threshold: fit lại toàn bộ
+        - Không có điểm mới: dùng nguyên trạng thái (last_update_mode = "cached")
+        
+        Args:
+            data: Toàn bộ điểm hiện tại
+        
+        Returns:
+            Data với cluster assignments
+        """
+        if self.centroids_ is None or len(self.centroids_) != self.n_clusters:
+            logger.info("No clustering state found, running full fit")
+            return self.fit_predict(data)
+        
+        X_raw = self._extract_features(data)
+        keys = self._point_keys(data)
+        changed = ~np.isin(keys, self.seen_keys_)
+        
+        if not changed.any() and len(keys) == len(self.seen_keys_):
+            # Không có điểm mới: chỉ gán zone bằng centroids hiện có
+            labels, _ = self._nearest_centroid(self.scaler.transform(X_raw))
+            self.last_update_mode = "cached"
+            return self.assign_zones(data, labels)
+        
+        if changed.any():
+            # Drift check với scaler/centroids hiện tại
+            _, changed_distances = self._nearest_centroid(self.scaler.transform(X_raw[changed]))
+            baseline = self.baseline_distance_ or 1e-9
+            drift = float(changed_distances.mean()) / baseline
+            
+            if drift > self.drift_threshold:
+                logger.info(f"Clustering drift {drift:.2f} > {self.drift_threshold}, running full fit")
+                return self.fit_predict(data)
+        else:
+            drift = 0.0
+        
+        # Thống kê scaler và số điểm theo tập điểm hiện tại; centroids warm start
+        self.scaler.fit(X_raw)
+        labels, _ = self._nearest_centroid(self.scaler.transform(X_raw))
+        
+        sums = np.zeros_like(self.centroids_)
+        np.add.at(sums, labels, X_raw)
+        counts = np.bincount(labels, minlength=self.n_clusters).astype(np.float64)
+        assigned = counts > 0
+        self.centroids_[assigned] = sums[assigned] / counts[assigned, None]
+        
+        # Giữ thứ tự centroid theo AQI để mapping zone ổn định
+        order = np.argsort(self.centroids_[:, AQI_FEATURE], kind='stable')
+        self.centroids_ = self.centroids_[order]
+        
+        X = self.scaler.transform(X_raw)
+        labels, distances = self._nearest_centroid(X)
+        self.counts_ = np.bincount(labels, minlength=self.n_clusters).astype(np.float64)
+        self.baseline_distance_ = float(distances.mean())
+        self.seen_keys_ = keys
+        self.last_update_mode = "incremental"
+        
+        logger.info(f"Incremental clustering update with {int(changed.sum())} new/changed points (drift {drift:.2f})")
+        return self.assign_zones(data, labels)
+    
     def get_cluster_stats(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Thống kê các clusters
@@ -205,3 +332,225 @@ class EnvironmentClustering:
         
         return stats
 
+
+
+class GeoDensityClustering:
+    """
+    Phân cụm theo mật độ trên tọa độ địa lý (hot-spot detection)
+    
+    - dbscan: sklearn DBSCAN, metric haversine trên BallTree (eps tính bằng km)
+    - hdbscan: sklearn HDBSCAN trên BallTree với vector đơn vị 3D; khoảng cách dây cung
+      đồng biến với khoảng cách great-circle nên cây phân cấp giống haversine
+      nhưng nhanh hơn nhiều
+    
+    Cluster ids được sắp theo AQI trung bình giảm dần (0 = hot-spot nặng nhất), -1 = noise.
+    """
+    
+    def __init__(
+        self,
+        method: str = 'dbscan',
+        eps_km: float = 2.0,
+        min_samples: int = 5,
+        min_cluster_size: int = 10,
+        min_aqi: Optional[float] = None
+    ):
+        """
+        Args:
+            method: 'dbscan' hoặc 'hdbscan'
+            eps_km: Bán kính láng giềng của DBSCAN (km)
+            min_samples: Số điểm tối thiểu trong lân cận để là core point
+            min_cluster_size: Kích thước cluster nhỏ nhất của HDBSCAN
+            min_aqi: Chỉ phân cụm các điểm có AQI >= ngưỡng (None = mọi điểm)
+        """
+        if method not in DENSITY_METHODS:
+            raise ValueError(f"Unknown density method '{method}', expected one of {DENSITY_METHODS}")
+        self.method = method
+        self.eps_km = eps_km
+        self.min_samples = min_samples
+        self.min_cluster_size = min_cluster_size
+        self.min_aqi = min_aqi
+        
+        self.labels_: Optional[np.ndarray] = None
+        self.n_clusters_: int = 0
+    
+    def _fit_labels(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """Nhãn cluster thô (chưa sắp xếp) cho các điểm hợp lệ"""
+        lat_rad, lon_rad = np.radians(lat), np.radians(lon)
+        
+        if self.method == 'dbscan':
+            model = DBSCAN(
+                eps=self.eps_km / EARTH_RADIUS_KM,
+                min_samples=self.min_samples,
+                metric='haversine',
+                algorithm='ball_tree'
+            )
+            return model.fit_predict(np.column_stack([lat_rad, lon_rad]))
+        
+        if len(lat) < max(self.min_cluster_size, 2):
+            return np.full(len(lat), NOISE_LABEL, dtype=np.int64)
+        
+        cos_lat = np.cos(lat_rad)
+        unit = np.column_stack([cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)])
+        model = HDBSCAN(
+            min_cluster_size=self.min_cluster_size,
+            min_samples=self.min_samples,
+            algorithm='ball_tree',
+            copy=False
+        )
+        return model.fit_predict(unit)
+    
+    def fit_predict(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Phân cụm và gán nhãn cho từng điểm
+        
+        Args:
+            data: List of dict có latitude, longitude, aqi
+        
+        Returns:
+            Data với cluster_id (-1 = noise / không xét) và zone (hotspot_<id> / noise)
+        """
+        if not data:
+            raise ValueError("No data provided for clustering")
+        
+        lat, lon = coordinates_from_records(data)
+        aqi = np.array([item.get('aqi') or 0 for item in data], dtype=np.float64)
+        
+        candidates = np.isfinite(lat) & np.isfinite(lon)
+        if self.min_aqi is not None:
+            candidates &= aqi >= self.min_aqi
+        positions = np.flatnonzero(candidates)
+        
+        labels = np.full(len(data), NOISE_LABEL, dtype=np.int64)
+        if len(positions):
+            raw = self._fit_labels(lat[positions], lon[positions])
+            labels[positions] = self._order_by_aqi(raw, aqi[positions])
+        
+        self.labels_ = labels
+        self.n_clusters_ = int(labels.max()) + 1 if len(labels) else 0
+        
+        results = []
+        for item, label in zip(data, labels.tolist()):
+            result = item.copy()
+            result['cluster_id'] = label
+            result['zone'] = f"hotspot_{label}" if label != NOISE_LABEL else "noise"
+            results.append(result)
+        
+        logger.info(
+            f"{self.method.upper()} found {self.n_clusters_} clusters "
+            f"({int((labels == NOISE_LABEL).sum())} noise points of {len(data)})"
+        )
+        return results
+    
+    @staticmethod
+    def _order_by_aqi(raw: np.ndarray, aqi: np.ndarray) -> np.ndarray:
+        """Đánh lại cluster ids theo AQI trung bình giảm dần, giữ -1 cho noise"""
+        clustered = raw != NOISE_LABEL
+        if not clustered.any():
+            return raw
+        
+        n = int(raw.max()) + 1
+        counts = np.bincount(raw[clustered], minlength=n)
+        sums = np.bincount(raw[clustered], weights=aqi[clustered], minlength=n)
+        mean_aqi = np.where(counts > 0, sums / np.maximum(counts, 1), -np.inf)
+        
+        order = np.argsort(-mean_aqi, kind='stable')
+        remap = np.empty(n, dtype=np.int64)
+        remap[order] = np.arange(n)
+        return np.where(clustered, remap[np.where(clustered, raw, 0)], NOISE_LABEL)
+    
+    def cluster_hulls(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Hull của mỗi cluster dưới dạng GeoJSON FeatureCollection
+        
+        Convex hull trên (lon, lat); cluster suy biến (1 điểm / thẳng hàng)
+        trả về Point / LineString.
+        
+        Args:
+            results: Output của fit_predict
+        
+        Returns:
+            GeoJSON FeatureCollection, mỗi feature một cluster
+        """
+        if self.labels_ is None:
+            raise ValueError("Model not fitted yet")
+        
+        lat, lon = coordinates_from_records(results)
+        aqi = np.array([item.get('aqi') or 0 for item in results], dtype=np.float64)
+        green = np.array([item.get('green_score') or 0 for item in results], dtype=np.float64)
+        
+        clustered = np.flatnonzero(self.labels_ != NOISE_LABEL)
+        order = clustered[np.argsort(self.labels_[clustered], kind='stable')]
+        boundaries = np.flatnonzero(np.diff(self.labels_[order])) + 1
+        
+        features = []
+        for members in np.split(order, boundaries) if len(order) else []:
+            cluster_id = int(self.labels_[members[0]])
+            points = np.column_stack([lon[members], lat[members]])
+            features.append({
+                'type': 'Feature',
+                'geometry': self._hull_geometry(points),
+                'properties': {
+                    'cluster_id': cluster_id,
+                    'zone': f"hotspot_{cluster_id}",
+                    'n_points': int(len(members)),
+                    'avg_aqi': round(float(aqi[members].mean()), 2),
+                    'max_aqi': round(float(aqi[members].max()), 2),
+                    'avg_green_score': round(float(green[members].mean()), 2),
+                    'centroid': [round(float(v), 6) for v in points.mean(axis=0)]
+                }
+            })
+        
+        return {'type': 'FeatureCollection', 'features': features}
+    
+    @staticmethod
+    def _hull_geometry(points: np.ndarray) -> Dict[str, Any]:
+        """GeoJSON geometry bao các điểm (lon, lat)"""
+        unique = np.unique(points, axis=0)
+        if len(unique) == 1:
+            return {'type': 'Point', 'coordinates': unique[0].tolist()}
+        
+        if len(unique) >= 3:
+            try:
+                hull = ConvexHull(unique)
+                ring = unique[hull.vertices]
+                ring = np.vstack([ring, ring[:1]])  # GeoJSON ring phải khép kín
+                return {'type': 'Polygon', 'coordinates': [ring.tolist()]}
+            except QhullError:
+                pass  # Thẳng hàng
+        
+        # Đoạn thẳng giữa hai điểm xa nhau nhất theo trục trải rộng nhất
+        axis = int(np.argmax(np.ptp(unique, axis=0)))
+        ends = unique[[unique[:, axis].argmin(), unique[:, axis].argmax()]]
+        return {'type': 'LineString', 'coordinates': ends.tolist()}
+    
+    def get_cluster_stats(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Thống kê các clusters
+        
+        Args:
+            results: Clustering results
+        
+        Returns:
+            Statistics dict
+        """
+        labels = self.labels_
+        clustered = labels != NOISE_LABEL
+        aqi = np.array([item.get('aqi') or 0 for item in results], dtype=np.float64)
+        
+        counts = np.bincount(labels[clustered], minlength=self.n_clusters_)
+        sums = np.bincount(labels[clustered], weights=aqi[clustered], minlength=self.n_clusters_)
+        
+        return {
+            'total_points': len(results),
+            'method': self.method,
+            'n_clusters': self.n_clusters_,
+            'noise_points': int((~clustered).sum()),
+            'clusters': {
+                f"hotspot_{i}": {
+                    'count': int(counts[i]),
+                    'avg_aqi': float(sums[i] / counts[i]) if counts[i] else 0.0,
+                    'percentage': float(counts[i] / len(results) * 100)
+                }
+                for i in range(self.n_clusters_)
+            }
+        }
@@ -20,88 +20,325 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 Correlation Analysis - Phân tích tương quan
 Phân tích mối liên hệ giữa môi trường (AQI) và giáo dục (Green Score)
+Chế độ matrix: Pearson + Spearman cho mọi cặp chỉ số trong một lần tính vector hóa,
+kèm p-value đã hiệu chỉnh đa so sánh và khoảng tin cậy bootstrap
 """
 import numpy as np
 import pandas as pd
 from scipy import stats
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 import logging
+import warnings
+
+from app.utils.spatial import StationIndex
 
 logger = logging.getLogger(__name__)
 
+# Chỉ số được đưa vào correlation matrix
+POLLUTANT_METRICS = ['aqi', 'pm25', 'pm10', 'co', 'no2', 'o3', 'so2']
+SCHOOL_METRICS = ['green_score', 'total_students', 'total_teachers']
+
+P_ADJUST_METHODS = ('fdr_bh', 'holm', 'bonferroni')
+
+# Chỉ số của chế độ pearson/spearman cũ (giá trị thiếu = 0)
+LEGACY_METRICS = ['aqi', 'pm25', 'green_score', 'total_students']
+
+
+def pairwise_correlation(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pearson correlation cho mọi cặp cột, bỏ NaN theo từng cặp (pairwise deletion)
+    
+    Args:
+        X: Ma trận (n_samples, n_variables), NaN là giá trị thiếu
+    
+    Returns:
+        (r, n): ma trận hệ số tương quan và số mẫu dùng cho từng cặp
+    """
+    mask = ~np.isnan(X)
+    M = mask.astype(np.float64)
+    Xz = np.where(mask, X, 0.0)
+    
+    # Sx[i, j] = tổng x_i trên các dòng có cả i và j
+    n = M.T @ M
+    Sx = Xz.T @ M
+    Sxx = (Xz * Xz).T @ M
+    Sxy = Xz.T @ Xz
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = Sxy - Sx * Sx.T / n
+        var_x = Sxx - Sx * Sx / n
+        var_y = Sxx.T - Sx.T * Sx.T / n
+        r = cov / np.sqrt(var_x * var_y)
+    
+    r = np.clip(r, -1.0, 1.0)
+    return r, n
+
+
+def spearman_blocks(X: np.ndarray) -> List[Tuple[List[Tuple[int, int]], np.ndarray, np.ndarray]]:
+    """
+    Gom các cặp cột có cùng tập dòng đầy đủ, rank lại các cột trên đúng tập dòng đó
+    
+    Rank được tính sau khi bỏ dòng thiếu của cặp, nên Pearson trên rank khớp với
+    stats.spearmanr của cặp. Các cặp chung một tập dòng (thường là hầu hết) dùng
+    chung một ma trận rank, không phải rank lại từng cặp.
+    
+    Args:
+        X: Ma trận (n_samples, n_variables), NaN là giá trị thiếu
+    
+    Returns:
+        Danh sách (pairs, columns, ranks): các cặp (i, j) của khối, chỉ số cột
+        và ma trận rank (n_complete, len(columns)) không có NaN
+    """
+    mask = ~np.isnan(X)
+    groups: Dict[bytes, Tuple[np.ndarray, List[Tuple[int, int]]]] = {}
+    n_vars = X.shape[1]
+    for i in range(n_vars):
+        for j in range(i + 1, n_vars):
+            rows = mask[:, i] & mask[:, j]
+            key = np.packbits(rows).tobytes()
+            groups.setdefault(key, (rows, []))[1].append((i, j))
+    
+    blocks = []
+    for rows, pairs in groups.values():
+        columns = np.array(sorted({k for pair in pairs for k in pair}))
+        subset = X[np.ix_(rows, columns)]
+        ranks = stats.rankdata(subset, axis=0) if len(subset) else subset
+        blocks.append((pairs, columns, ranks))
+    return blocks
+
+
+def pairwise_spearman(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spearman correlation cho mọi cặp cột, bỏ NaN theo từng cặp
+    
+    Args:
+        X: Ma trận (n_samples, n_variables), NaN là giá trị thiếu
+    
+    Returns:
+        (r, n): ma trận hệ số tương quan và số mẫu dùng cho từng cặp
+    """
+    n_vars = X.shape[1]
+    r = np.full((n_vars, n_vars), np.nan)
+    n = np.zeros((n_vars, n_vars))
+    
+    # Đường chéo như pairwise_correlation: r = 1, n = số giá trị có mặt
+    counts = (~np.isnan(X)).sum(axis=0)
+    np.fill_diagonal(n, counts)
+    np.fill_diagonal(r, np.where(counts > 1, 1.0, np.nan))
+    
+    for pairs, columns, ranks in spearman_blocks(X):
+        r_block, n_block = pairwise_correlation(ranks)
+        local = {column: k for k, column in enumerate(columns)}
+        for i, j in pairs:
+            r[i, j] = r[j, i] = r_block[local[i], local[j]]
+            n[i, j] = n[j, i] = n_block[local[i], local[j]]
+    return r, n
+
+
+def correlation_pvalues(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """P-value hai phía của hệ số tương quan (kiểm định t với n - 2 bậc tự do)"""
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt(dof / np.maximum(1.0 - r * r, 1e-300))
+        p = 2.0 * stats.t.sf(np.abs(t), dof)
+    return np.where(dof > 0, p, np.nan)
+
+
+def adjust_pvalues(p: np.ndarray, method: str = 'fdr_bh') -> np.ndarray:
+    """
+    Hiệu chỉnh đa so sánh cho một họ p-value (NaN được bỏ qua)
+    
+    Args:
+        p: P-values (1-D)
+        method: 'fdr_bh' (Benjamini-Hochberg), 'holm' hoặc 'bonferroni'
+    
+    Returns:
+        P-values đã hiệu chỉnh, cùng thứ tự đầu vào
+    """
+    if method not in P_ADJUST_METHODS:
+        raise ValueError(f"Unsupported p-value adjustment: {method} (expected one of {P_ADJUST_METHODS})")
+    
+    adjusted = np.full(p.shape, np.nan)
+    valid = ~np.isnan(p)
+    m = int(valid.sum())
+    if m == 0:
+        return adjusted
+    
+    values = p[valid]
+    order = np.argsort(values)
+    ranked = values[order]
+    
+    if method == 'bonferroni':
+        result = np.minimum(values * m, 1.0)
+    else:
+        if method == 'fdr_bh':
+            scaled = ranked * m / np.arange(1, m + 1)
+            monotone = np.minimum.accumulate(scaled[::-1])[::-1]
+        else:
+            scaled = ranked * (m - np.arange(m))
+            monotone = np.maximum.accumulate(scaled)
+        result = np.empty(m)
+        result[order] = np.minimum(monotone, 1.0)
+    
+    adjusted[valid] = result
+    return adjusted
+
+
+def bootstrap_correlation_ci(
+    X: np.ndarray,
+    n_resamples: int = 1000,
+    confidence_level: float = 0.95,
+    batch_size: int = 200,
+    chunk_rows: int = 20_000,
+    random_state: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Khoảng tin cậy bootstrap (percentile) cho mọi cặp cùng lúc
+    
+    Mỗi lần resample được biểu diễn bằng vector trọng số Poisson(1) trên các dòng
+    (Poisson bootstrap), nên các tổng của pairwise_correlation trở thành phép nhân
+    ma trận (n_resamples × n_samples) @ (n_samples × n_variables²), không lặp theo cặp.
+    Trọng số được sinh theo từng khối dòng, bộ nhớ không tăng theo n_samples.
+    
+    Args:
+        X: Ma trận (n_samples, n_variables), NaN là giá trị thiếu
+        n_resamples: Số lần resample
+        confidence_level: Mức tin cậy
+        batch_size: Số resample mỗi lần nhân ma trận
+        chunk_rows: Số dòng mỗi khối
+        random_state: Seed
+    
+    Returns:
+        (lower, upper) cùng shape (n_variables, n_variables)
+    """
+    n_samples, n_vars = X.shape
+    rng = np.random.default_rng(random_state)
+    
+    def outer(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return (a[:, :, None] * b[:, None, :]).reshape(len(a), n_vars * n_vars)
+    
+    samples = np.empty((n_resamples, n_vars, n_vars))
+    for start in range(0, n_resamples, batch_size):
+        b = min(batch_size, n_resamples - start)
+        
+        # n, Sx, Sxx, Sxy của pairwise_correlation, có trọng số
+        sums = np.zeros((4, b, n_vars * n_vars))
+        for row in range(0, n_samples, chunk_rows):
+            chunk = X[row:row + chunk_rows]
+            mask = ~np.isnan(chunk)
+            M = mask.astype(np.float64)
+            Xz = np.where(mask, chunk, 0.0)
+            weights = rng.poisson(1.0, size=(b, len(chunk))).astype(np.float64)
+            for k, term in enumerate((outer(M, M), outer(Xz, M), outer(Xz * Xz, M), outer(Xz, Xz))):
+                sums[k] += weights @ term
+        
+        n, Sx, Sxx, Sxy = (a.reshape(b, n_vars, n_vars) for a in sums)
+        SxT = Sx.transpose(0, 2, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = Sxy - Sx * SxT / n
+            var_x = Sxx - Sx * Sx / n
+            var_y = Sxx.transpose(0, 2, 1) - SxT * SxT / n
+            samples[start:start + b] = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    
+    alpha = (1.0 - confidence_level) / 2.0
+    with warnings.catch_warnings():
+        # Cặp không đủ mẫu cho ra NaN ở mọi resample
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanquantile(samples, [alpha, 1.0 - alpha], axis=0)
+    return lower, upper
+
 
 class CorrelationAnalysis:
     """Phân tích tương quan môi trường - giáo dục"""
     
-    def __init__(self, min_samples: int = 3):
+    def __init__(self, min_samples: int = 3, max_distance_km: Optional[float] = None):
         """
         Initialize correlation analysis
         
         Args:
             min_samples: Số mẫu tối thiểu để phân tích
+            max_distance_km: Khoảng cách tối đa trường - trạm đo (None = không giới hạn)
         """
         self.min_samples = min_samples
+        self.max_distance_km = max_distance_km
     
     def prepare_data(self, 
-                     environment_data: List[Dict[str, Any]], 
-                     education_data: List[Dict[str, Any]]) -> pd.DataFrame:
+                     environment_data: Union[List[Dict[str, Any]], pd.DataFrame], 
+                     education_data: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
         """
         Chuẩn bị dữ liệu cho phân tích tương quan
         Merge environment và education data theo vị trí địa lý
+        (BallTree haversine, một lần query cho toàn bộ trường)
         
         Args:
-            environment_data: AQI data với latitude, longitude
-            education_data: School data với latitude, longitude, green_score
+            environment_data: AQI data với latitude, longitude (list of dict hoặc DataFrame)
+            education_data: School data với latitude, longitude, green_score (list of dict hoặc DataFrame)
         
         Returns:
-            DataFrame đã merge
+            DataFrame đã merge, distance_km là khoảng cách great-circle;
+            giá trị thiếu của các chỉ số được giữ NaN
         """
-        if not environment_data or not education_data:
+        if len(environment_data) == 0 or len(education_data) == 0:
             raise ValueError("Insufficient data for correlation analysis")
         
         # Convert to DataFrames
         env_df = pd.DataFrame(environment_data)
         edu_df = pd.DataFrame(education_data)
         
-        # For simplicity, match by closest location (simplified version)
-        # In production, use proper spatial join
-        merged_data = []
+        # Spatial join: trạm đo gần nhất cho mỗi trường
+        index = StationIndex(
+            self._numeric_column(env_df, 'latitude'),
+            self._numeric_column(env_df, 'longitude')
+        )
+        school_lat = self._numeric_column(edu_df, 'latitude')
+        school_lon = self._numeric_column(edu_df, 'longitude')
+        indices, distances = index.query(
+            school_lat, school_lon, max_distance_km=self.max_distance_km
+        )
         
-        for _, school in edu_df.iterrows():
-            # Find closest environment measurement
-            school_lat = school.get('latitude')
-            school_lon = school.get('longitude')
-            
-            if school_lat is None or school_lon is None:
-                continue
-            
-            # Calculate distances
-            env_df['distance'] = np.sqrt(
-                (env_df['latitude'] - school_lat)**2 + 
-                (env_df['longitude'] - school_lon)**2
-            )
-            
-            # Get closest measurement
-            closest_env = env_df.loc[env_df['distance'].idxmin()]
-            
-            # Combine data
-            merged_data.append({
-                'school_id': school.get('id'),
-                'school_name': school.get('name'),
-                'green_score': school.get('green_score', 0),
-                'total_students': school.get('total_students', 0),
-                'aqi': closest_env.get('aqi', 0),
-                'pm25': closest_env.get('pm25', 0),
-                'latitude': school_lat,
-                'longitude': school_lon,
-                'distance_km': closest_env.get('distance') * 111  # Convert to km (rough)
-            })
-        
-        df = pd.DataFrame(merged_data)
+        matched = indices >= 0
+        env_idx = indices[matched]
+        
+        df = pd.DataFrame({
+            'school_id': self._column(edu_df, 'id')[matched],
+            'school_name': self._column(edu_df, 'name')[matched],
+            'green_score': self._numeric_column(edu_df, 'green_score')[matched],
+            'total_students': self._numeric_column(edu_df, 'total_students')[matched],
+            'aqi': self._numeric_column(env_df, 'aqi')[env_idx],
+            'pm25': self._numeric_column(env_df, 'pm25')[env_idx],
+            'latitude': school_lat[matched],
+            'longitude': school_lon[matched],
+            'distance_km': distances[matched]
+        })
+        
+        # Các chỉ số còn lại cho correlation matrix
+        for name in POLLUTANT_METRICS:
+            if name not in df.columns:
+                df[name] = self._numeric_column(env_df, name)[env_idx]
+        for name in SCHOOL_METRICS:
+            if name not in df.columns:
+                df[name] = self._numeric_column(edu_df, name)[matched]
         
         logger.info(f"Prepared {len(df)} matched records for correlation")
         return df
     
+    @staticmethod
+    def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+        """Lấy cột dưới dạng numpy array, None nếu thiếu cột"""
+        if name not in df.columns:
+            return np.full(len(df), None, dtype=object)
+        return df[name].to_numpy()
+    
+    @staticmethod
+    def _numeric_column(df: pd.DataFrame, name: str, fill: float = np.nan) -> np.ndarray:
+        """Lấy cột số dạng float64, giá trị thiếu được thay bằng fill"""
+        if name not in df.columns:
+            return np.full(len(df), fill, dtype=np.float64)
+        values = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+        if not np.isnan(fill):
+            values = np.where(np.isnan(values), fill, values)
+        return values
+    
     def pearson_correlation(self, x: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
         """
         Tính Pearson correlation coefficient
@@ -137,8 +374,8 @@ class CorrelationAnalysis:
         return correlation, p_value
     
     def analyze(self, 
-                environment_data: List[Dict[str, Any]], 
-                education_data: List[Dict[str, Any]], 
+                environment_data: Union[List[Dict[str, Any]], pd.DataFrame], 
+                education_data: Union[List[Dict[str, Any]], pd.DataFrame], 
                 method: str = 'pearson') -> Dict[str, Any]:
         """
         Phân tích tương quan chính
@@ -156,6 +393,9 @@ class CorrelationAnalysis:
         if len(df) < self.min_samples:
             raise ValueError(f"Insufficient data: need at least {self.min_samples} samples, got {len(df)}")
         
+        # Chế độ cũ: giá trị thiếu được tính là 0
+        df[LEGACY_METRICS] = df[LEGACY_METRICS].fillna(0)
+        
         results = {
             'n_samples': len(df),
             'correlations': {},
@@ -221,6 +461,132 @@ class CorrelationAnalysis:
         logger.info(f"Correlation analysis completed with {len(df)} samples")
         return results
     
+    def analyze_matrix(self,
+                       environment_data: Union[List[Dict[str, Any]], pd.DataFrame],
+                       education_data: Union[List[Dict[str, Any]], pd.DataFrame],
+                       p_adjust: str = 'fdr_bh',
+                       n_bootstrap: int = 1000,
+                       confidence_level: float = 0.95,
+                       alpha: float = 0.05,
+                       random_state: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Correlation matrix: Pearson và Spearman cho mọi cặp chỉ số ô nhiễm / trường học
+        
+        Giá trị thiếu được bỏ theo từng cặp (pairwise deletion). Spearman rank lại
+        từng cặp sau khi bỏ dòng thiếu (Pearson trên rank), bootstrap CI resample
+        trên rank đó (các cặp chung tập dòng đầy đủ được tính cùng một lần).
+        
+        Args:
+            environment_data: Environment measurements
+            education_data: School data
+            p_adjust: Hiệu chỉnh đa so sánh ('fdr_bh', 'holm', 'bonferroni')
+            n_bootstrap: Số lần resample cho CI (0 = bỏ qua)
+            confidence_level: Mức tin cậy của CI
+            alpha: Ngưỡng ý nghĩa trên p-value đã hiệu chỉnh
+            random_state: Seed cho bootstrap
+        
+        Returns:
+            Ma trận hệ số / p-value và danh sách các cặp sắp theo p-value đã hiệu chỉnh
+        """
+        df = self.prepare_data(environment_data, education_data)
+        
+        if len(df) < self.min_samples:
+            raise ValueError(f"Insufficient data: need at least {self.min_samples} samples, got {len(df)}")
+        
+        # Bỏ chỉ số không đủ mẫu hoặc không biến thiên
+        candidates = df[POLLUTANT_METRICS + SCHOOL_METRICS]
+        usable = (candidates.notna().sum() >= self.min_samples) & (candidates.nunique() > 1)
+        variables = [name for name in candidates.columns if usable[name]]
+        dropped = [name for name in candidates.columns if not usable[name]]
+        if len(variables) < 2:
+            raise ValueError("Need at least 2 metrics with variance for a correlation matrix")
+        
+        X = candidates[variables].to_numpy(dtype=np.float64)
+        
+        # Họ kiểm định: mọi cặp khác nhau (tam giác trên)
+        iu = np.triu_indices(len(variables), k=1)
+        
+        matrices = {}
+        pairs = {}
+        for method in ('pearson', 'spearman'):
+            if method == 'pearson':
+                r, n = pairwise_correlation(X)
+            else:
+                r, n = pairwise_spearman(X)
+            p = correlation_pvalues(r, n)
+            
+            p_adj = np.full_like(p, np.nan)
+            p_adj[iu] = adjust_pvalues(p[iu], p_adjust)
+            p_adj.T[iu] = p_adj[iu]
+            
+            lower = np.full_like(r, np.nan)
+            upper = np.full_like(r, np.nan)
+            if n_bootstrap > 0 and method == 'pearson':
+                lower, upper = bootstrap_correlation_ci(
+                    X, n_resamples=n_bootstrap, confidence_level=confidence_level,
+                    random_state=random_state
+                )
+            elif n_bootstrap > 0:
+                for block_pairs, columns, ranks in spearman_blocks(X):
+                    low, up = bootstrap_correlation_ci(
+                        ranks, n_resamples=n_bootstrap,
+                        confidence_level=confidence_level, random_state=random_state
+                    )
+                    local = {column: k for k, column in enumerate(columns)}
+                    for i, j in block_pairs:
+                        lower[i, j] = lower[j, i] = low[local[i], local[j]]
+                        upper[i, j] = upper[j, i] = up[local[i], local[j]]
+            
+            matrices[method] = {
+                'r': self._matrix_to_list(r),
+                'p_value': self._matrix_to_list(p),
+                'p_adjusted': self._matrix_to_list(p_adj),
+                'n': n.astype(int).tolist()
+            }
+            pairs[method] = (r, p, p_adj, lower, upper, n)
+        
+        pair_results = []
+        for i, j in zip(*iu):
+            entry = {'x': variables[i], 'y': variables[j], 'n': int(pairs['pearson'][5][i, j])}
+            for method, (r, p, p_adj, lower, upper, _) in pairs.items():
+                entry[method] = {
+                    'correlation': self._round(r[i, j]),
+                    'p_value': self._round(p[i, j]),
+                    'p_adjusted': self._round(p_adj[i, j]),
+                    'ci': [self._round(lower[i, j]), self._round(upper[i, j])],
+                    'significant': bool(p_adj[i, j] < alpha)
+                }
+            pair_results.append(entry)
+        
+        pair_results.sort(key=lambda e: (
+            np.inf if e['pearson']['p_adjusted'] is None else e['pearson']['p_adjusted']
+        ))
+        
+        logger.info(
+            f"Correlation matrix completed: {len(variables)} metrics, "
+            f"{len(pair_results)} pairs, {len(df)} samples"
+        )
+        return {
+            'mode': 'matrix',
+            'n_samples': len(df),
+            'variables': variables,
+            'dropped_variables': dropped,
+            'p_adjust': p_adjust,
+            'alpha': alpha,
+            'bootstrap': {'n_resamples': n_bootstrap, 'confidence_level': confidence_level},
+            'matrices': matrices,
+            'pairs': pair_results
+        }
+    
+    @staticmethod
+    def _round(value: float, digits: int = 4) -> Optional[float]:
+        """Làm tròn, NaN -> None (JSON)"""
+        return None if np.isnan(value) else round(float(value), digits)
+    
+    @classmethod
+    def _matrix_to_list(cls, matrix: np.ndarray) -> List[List[Optional[float]]]:
+        return [[cls._round(value) for value in row] for row in matrix]
+    
     def _interpret_correlation(self, corr: float, p_value: float) -> str:
         """Diễn giải correlation coefficient"""
         if p_value >= 0.05:
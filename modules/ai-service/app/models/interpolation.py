@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+AQI Interpolation - Bề mặt AQI nội suy IDW trên lưới đều
+Lưới float32 tính sẵn từ các trạm đo (KD-tree, k trạm gần nhất),
+tra cứu điểm O(1) bằng chỉ số ô và cắt tile trực tiếp từ bộ nhớ
+"""
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import Any, Dict, Optional, Sequence, Tuple
+import logging
+
+from app.utils.spatial import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Giới hạn vĩ độ của Web Mercator
+MERCATOR_MAX_LAT = 85.05112878
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Tọa độ (độ) -> vector đơn vị 3D; khoảng cách Euclid (chord) đơn điệu theo great-circle"""
+    lat_r = np.radians(lat)
+    lon_r = np.radians(lon)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)])
+
+
+def _chord_to_km(chord: np.ndarray) -> np.ndarray:
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+def _km_to_chord(km: float) -> float:
+    return 2.0 * np.sin(km / (2.0 * EARTH_RADIUS_KM))
+
+
+class AQIGrid:
+    """Lưới AQI nội suy inverse-distance-weighted"""
+    
+    def __init__(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        resolution: float = 0.01,
+        neighbors: int = 8,
+        power: float = 2.0,
+        max_distance_km: Optional[float] = 50.0
+    ):
+        """
+        Args:
+            min_lat, min_lon, max_lat, max_lon: Vùng phủ (độ)
+            resolution: Kích thước ô (độ)
+            neighbors: Số trạm gần nhất dùng cho mỗi ô
+            power: Số mũ IDW
+            max_distance_km: Bỏ trạm xa hơn ngưỡng; ô không có trạm nào = NaN
+        """
+        if max_lat <= min_lat or max_lon <= min_lon:
+            raise ValueError("Invalid grid bounds")
+        if resolution <= 0:
+            raise ValueError("Grid resolution must be positive")
+        
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.resolution = resolution
+        self.neighbors = neighbors
+        self.power = power
+        self.max_distance_km = max_distance_km
+        
+        self.n_lat = int(round((max_lat - min_lat) / resolution)) + 1
+        self.n_lon = int(round((max_lon - min_lon) / resolution)) + 1
+        self.max_lat = min_lat + (self.n_lat - 1) * resolution
+        self.max_lon = min_lon + (self.n_lon - 1) * resolution
+        
+        # values[i, j] = AQI tại (min_lat + i * resolution, min_lon + j * resolution)
+        self.values: Optional[np.ndarray] = None
+        self.n_stations = 0
+    
+    @property
+    def latitudes(self) -> np.ndarray:
+        return self.min_lat + np.arange(self.n_lat) * self.resolution
+    
+    @property
+    def longitudes(self) -> np.ndarray:
+        return self.min_lon + np.arange(self.n_lon) * self.resolution
+    
+    def fit(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        aqi: Sequence[float],
+        chunk_rows: int = 256
+    ) -> 'AQIGrid':
+        """
+        Tính toàn bộ lưới từ giá trị AQI của các trạm
+        
+        Args:
+            latitudes, longitudes: Tọa độ trạm (độ)
+            aqi: AQI tại trạm
+            chunk_rows: Số hàng lưới mỗi lần query KD-tree (giới hạn bộ nhớ)
+        
+        Returns:
+            self
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        values = np.asarray(aqi, dtype=np.float64)
+        valid = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(values))
+        lat, lon, values = lat[valid], lon[valid], values[valid]
+        if len(values) == 0:
+            raise ValueError("No station with coordinates and AQI to interpolate")
+        
+        tree = cKDTree(_unit_vectors(lat, lon))
+        k = min(self.neighbors, len(values))
+        upper = _km_to_chord(self.max_distance_km) if self.max_distance_km else np.inf
+        
+        grid = np.empty((self.n_lat, self.n_lon), dtype=np.float32)
+        grid_lon = self.longitudes
+        for start in range(0, self.n_lat, chunk_rows):
+            rows = self.latitudes[start:start + chunk_rows]
+            cell_lat = np.repeat(rows, self.n_lon)
+            cell_lon = np.tile(grid_lon, len(rows))
+            
+            chord, idx = tree.query(_unit_vectors(cell_lat, cell_lon), k=k, distance_upper_bound=upper)
+            chord = chord.reshape(len(cell_lat), k)
+            idx = idx.reshape(len(cell_lat), k)
+            
+            found = np.isfinite(chord)
+            distance = _chord_to_km(np.where(found, chord, 0.0))
+            station_aqi = values[np.where(found, idx, 0)]
+            
+            with np.errstate(divide='ignore'):
+                weights = np.where(found, 1.0 / np.power(distance, self.power), 0.0)
+            
+            # Ô trùng vị trí trạm: lấy đúng giá trị trạm
+            exact = found & (distance == 0.0)
+            has_exact = exact.any(axis=1)
+            weights[has_exact] = exact[has_exact].astype(np.float64)
+            
+            total = weights.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                estimate = (weights * station_aqi).sum(axis=1) / total
+            estimate[total == 0] = np.nan
+            
+            grid[start:start + len(rows)] = estimate.reshape(len(rows), self.n_lon)
+        
+        self.values = grid
+        self.n_stations = len(values)
+        logger.info(
+            f"AQI grid computed: {self.n_lat}x{self.n_lon} cells from {self.n_stations} stations "
+            f"({np.isfinite(grid).mean() * 100:.1f}% covered)"
+        )
+        return self
+    
+    def _cell_position(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vị trí (thực) trong lưới theo hàng/cột"""
+        return (lat - self.min_lat) / self.resolution, (lon - self.min_lon) / self.resolution
+    
+    def values_at(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+        """
+        AQI tại nhiều điểm (bilinear giữa 4 ô lân cận, O(1) mỗi điểm)
+        
+        Returns:
+            float32 array, NaN ngoài vùng phủ
+        """
+        if self.values is None:
+            raise ValueError("AQI grid not computed yet")
+        
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        row, col = self._cell_position(lat, lon)
+        inside = (row >= 0) & (row <= self.n_lat - 1) & (col >= 0) & (col <= self.n_lon - 1)
+        
+        r0 = np.clip(np.floor(row), 0, self.n_lat - 2).astype(np.int64)
+        c0 = np.clip(np.floor(col), 0, self.n_lon - 2).astype(np.int64)
+        fr = np.clip(row - r0, 0.0, 1.0)
+        fc = np.clip(col - c0, 0.0, 1.0)
+        
+        v00 = self.values[r0, c0]
+        v01 = self.values[r0, c0 + 1]
+        v10 = self.values[r0 + 1, c0]
+        v11 = self.values[r0 + 1, c0 + 1]
+        result = (
+            v00 * (1 - fr) * (1 - fc) + v01 * (1 - fr) * fc
+            + v10 * fr * (1 - fc) + v11 * fr * fc
+        )
+        
+        # Một trong 4 ô không có dữ liệu: dùng ô gần nhất
+        nearest = self.values[
+            np.clip(np.rint(row), 0, self.n_lat - 1).astype(np.int64),
+            np.clip(np.rint(col), 0, self.n_lon - 1).astype(np.int64)
+        ]
+        result = np.where(np.isnan(result), nearest, result)
+        return np.where(inside, result, np.nan).astype(np.float32)
+    
+    def value_at(self, lat: float, lon: float) -> Optional[float]:
+        """AQI tại một điểm (cùng phép tính với values_at, không tạo mảng), None nếu ngoài vùng phủ"""
+        if self.values is None:
+            raise ValueError("AQI grid not computed yet")
+        
+        row = (lat - self.min_lat) / self.resolution
+        col = (lon - self.min_lon) / self.resolution
+        if not (0 <= row <= self.n_lat - 1 and 0 <= col <= self.n_lon - 1):
+            return None
+        
+        r0 = min(int(row), self.n_lat - 2)
+        c0 = min(int(col), self.n_lon - 2)
+        fr = row - r0
+        fc = col - c0
+        cells = self.values[r0:r0 + 2, c0:c0 + 2].tolist()
+        value = (
+            cells[0][0] * (1 - fr) * (1 - fc) + cells[0][1] * (1 - fr) * fc
+            + cells[1][0] * fr * (1 - fc) + cells[1][1] * fr * fc
+        )
+        if math.isnan(value):
+            value = float(self.values[int(round(row)), int(round(col))])
+        return None if math.isnan(value) else value
+    
+    @staticmethod
+    def tile_bounds(z: int, x: int, y: int) -> Dict[str, float]:
+        """Biên (độ) của tile XYZ (Web Mercator)"""
+        n = 2 ** z
+        
+        def lat_of(row: float) -> float:
+            return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n)))))
+        
+        return {
+            'min_lat': lat_of(y + 1),
+            'max_lat': lat_of(y),
+            'min_lon': x / n * 360.0 - 180.0,
+            'max_lon': (x + 1) / n * 360.0 - 180.0
+        }
+    
+    def tile(self, z: int, x: int, y: int, size: int = 256) -> np.ndarray:
+        """
+        Tile XYZ (Web Mercator) cắt từ lưới, lấy ô gần nhất cho mỗi pixel
+        
+        Returns:
+            float32 array (size, size), hàng 0 ở phía bắc; NaN ngoài vùng phủ
+        """
+        if self.values is None:
+            raise ValueError("AQI grid not computed yet")
+        n = 2 ** z
+        if not (0 <= x < n and 0 <= y < n):
+            raise ValueError(f"Tile {z}/{x}/{y} out of range")
+        
+        # Tâm pixel; vĩ độ theo Mercator nên tính riêng từng hàng
+        offsets = (np.arange(size) + 0.5) / size
+        pixel_lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+        pixel_lon = (x + offsets) / n * 360.0 - 180.0
+        
+        row, col = self._cell_position(pixel_lat, pixel_lon)
+        row = np.rint(row).astype(np.int64)
+        col = np.rint(col).astype(np.int64)
+        row_ok = (row >= 0) & (row < self.n_lat)
+        col_ok = (col >= 0) & (col < self.n_lon)
+        
+        tile = self.values[np.clip(row, 0, self.n_lat - 1)[:, None], np.clip(col, 0, self.n_lon - 1)[None, :]]
+        return np.where(row_ok[:, None] & col_ok[None, :], tile, np.float32(np.nan)).astype(np.float32)
+    
+    def describe(self) -> Dict[str, Any]:
+        """Metadata của lưới"""
+        covered = float(np.isfinite(self.values).mean()) if self.values is not None else 0.0
+        return {
+            'bounds': {
+                'min_lat': self.min_lat,
+                'min_lon': self.min_lon,
+                'max_lat': round(self.max_lat, 6),
+                'max_lon': round(self.max_lon, 6)
+            },
+            'resolution': self.resolution,
+            'shape': [self.n_lat, self.n_lon],
+            'neighbors': self.neighbors,
+            'power': self.power,
+            'max_distance_km': self.max_distance_km,
+            'n_stations': self.n_stations,
+            'coverage': round(covered, 4),
+            'dtype': 'float32'
+        }
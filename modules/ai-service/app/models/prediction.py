@@ -24,7 +24,7 @@ Sử dụng Linear Regression và Moving Average để dự báo AQI
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timedelta
 import logging
 
@@ -34,6 +34,8 @@ logger = logging.getLogger(__name__)
 class AQIPrediction:
     """Dự báo chất lượng không khí (AQI)"""
     
+    FEATURE_COLS = ['day_num', 'hour', 'day_of_week', 'aqi_ma_3', 'aqi_ma_7']
+    
     def __init__(self, forecast_days: int = 7):
         """
         Initialize prediction model
@@ -45,17 +47,17 @@ class AQIPrediction:
         self.model = LinearRegression()
         self.is_fitted = False
     
-    def prepare_time_series(self, data: List[Dict[str, Any]]) -> pd.DataFrame:
+    def prepare_time_series(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
         """
         Chuẩn bị time series data
         
         Args:
-            data: List of dict với keys: measured_at, aqi, location_id
+            data: List of dict hoặc DataFrame với cột: measured_at, aqi, location_id
         
         Returns:
             DataFrame với time series
         """
-        if not data:
+        if data is None or len(data) == 0:
             raise ValueError("No data provided for prediction")
         
         # Convert to DataFrame
@@ -73,18 +75,19 @@ class AQIPrediction:
         logger.info(f"Prepared time series with {len(df)} records")
         return df
     
-    def create_features(self, df: pd.DataFrame) -> tuple:
+    def create_features(self, df: pd.DataFrame, origin: Optional[pd.Timestamp] = None) -> tuple:
         """
         Tạo features cho model
         
         Args:
             df: Time series DataFrame
+            origin: Mốc tính day_num (mặc định: điểm đầu tiên của df)
         
         Returns:
             (X, y) features and target
         """
         # Tạo features: day number, hour, day of week
-        df['day_num'] = (df.index - df.index[0]).days
+        df['day_num'] = (df.index - (df.index[0] if origin is None else origin)).days
         df['hour'] = df.index.hour
         df['day_of_week'] = df.index.dayofweek
         
@@ -93,13 +96,12 @@ class AQIPrediction:
         df['aqi_ma_7'] = df['aqi'].rolling(window=7, min_periods=1).mean()
         
         # Features
-        feature_cols = ['day_num', 'hour', 'day_of_week', 'aqi_ma_3', 'aqi_ma_7']
-        X = df[feature_cols].values
+        X = df[self.FEATURE_COLS].values
         y = df['aqi'].values
         
         return X, y
     
-    def fit(self, data: List[Dict[str, Any]]) -> 'AQIPrediction':
+    def fit(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> 'AQIPrediction':
         """
         Train prediction model
         
@@ -114,14 +116,56 @@ class AQIPrediction:
         
         self.model.fit(X, y)
         self.is_fitted = True
+        self.trained_from = df.index[0]
+        self.trained_until = df.index[-1]
+        self.train_mae_ = float(np.mean(np.abs(self.model.predict(X) - y)))
+        self._store_state(df)
+        
+        logger.info(f"Prediction model trained on {len(data)} samples")
+        return self
+    
+    def _store_state(self, df: pd.DataFrame):
+        """Lưu trạng thái cuối của chuỗi cho dự báo đệ quy"""
         self.last_date = df.index[-1]
         self.last_aqi = df['aqi'].iloc[-1]
         
         # Store recent history for MA calculation
         self.recent_aqi = df['aqi'].tail(7).tolist()
+    
+    def refresh_state(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> bool:
+        """
+        Cập nhật trạng thái cuối từ dữ liệu mới mà không fit lại (dùng với model từ registry)
         
-        logger.info(f"Prediction model trained on {len(data)} samples")
-        return self
+        Returns:
+            True nếu cập nhật được
+        """
+        if not self.is_fitted:
+            return False
+        self._store_state(self.prepare_time_series(data))
+        return True
+    
+    def drift_ratio(self, data: Union[List[Dict[str, Any]], pd.DataFrame], min_samples: int = 3) -> float:
+        """
+        MAE của model trên các điểm mới hơn training window, chia cho MAE lúc train
+        
+        Args:
+            data: Chuỗi hiện tại (bao gồm cả giai đoạn đã train)
+            min_samples: Số điểm mới tối thiểu để đánh giá
+        
+        Returns:
+            Tỉ lệ drift (0.0 nếu chưa đủ điểm mới)
+        """
+        if not self.is_fitted:
+            raise ValueError("Model not trained yet")
+        
+        df = self.prepare_time_series(data)
+        X, y = self.create_features(df, origin=self.trained_from)
+        recent = (df.index > self.trained_until)
+        if recent.sum() < min_samples:
+            return 0.0
+        
+        mae = float(np.mean(np.abs(self.model.predict(X[recent]) - y[recent])))
+        return mae / max(self.train_mae_, 1e-6)
     
     def predict_future(self, base_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
@@ -145,8 +189,8 @@ class AQIPrediction:
         for day in range(1, self.forecast_days + 1):
             forecast_date = base_date + timedelta(days=day)
             
-            # Calculate features
-            day_num = (forecast_date - self.last_date).days + self.last_date.day
+            # Calculate features (day_num tính từ mốc lúc train, như create_features)
+            day_num = (forecast_date - self.trained_from).days
             hour = 12  # Noon prediction
             day_of_week = forecast_date.weekday()
             aqi_ma_3 = np.mean(current_aqi_history[-3:]) if len(current_aqi_history) >= 3 else self.last_aqi
@@ -228,3 +272,246 @@ class AQIPrediction:
         
         return predictions
 
+
+
+class BatchAQIPrediction(AQIPrediction):
+    """
+    Dự báo AQI cho nhiều trạm trong một lần
+    
+    Features được tính theo nhóm trạm bằng pandas/NumPy vector hóa,
+    mỗi trạm có một mô hình hồi quy tuyến tính riêng, giải cùng lúc
+    bằng normal equations theo batch (np.add.reduceat + pinv).
+    """
+    
+    HISTORY_WINDOW = 7
+    
+    def __init__(self, forecast_days: int = 7, min_samples: int = 10):
+        """
+        Initialize batch prediction model
+        
+        Args:
+            forecast_days: Số ngày dự báo (mặc định 7)
+            min_samples: Số mẫu tối thiểu mỗi trạm để fit mô hình
+        """
+        super().__init__(forecast_days=forecast_days)
+        self.min_samples = min_samples
+        self.stations: np.ndarray = np.array([], dtype=object)
+        self.skipped_stations: List[str] = []
+        self.coef_: Optional[np.ndarray] = None
+    
+    def prepare_batch_frame(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Chuẩn bị DataFrame sắp theo (station_id, measured_at)
+        
+        Args:
+            data: List of dict hoặc DataFrame với cột: station_id, measured_at, aqi
+        
+        Returns:
+            DataFrame đã lọc các trạm đủ mẫu
+        """
+        if data is None or len(data) == 0:
+            raise ValueError("No data provided for prediction")
+        
+        df = pd.DataFrame(data, columns=['station_id', 'measured_at', 'aqi'])
+        df['measured_at'] = pd.to_datetime(df['measured_at'], utc=True)
+        df['aqi'] = pd.to_numeric(df['aqi'], errors='coerce')
+        df = df.dropna(subset=['station_id', 'measured_at', 'aqi'])
+        
+        counts = df.groupby('station_id')['aqi'].transform('size')
+        self.skipped_stations = sorted(df.loc[counts < self.min_samples, 'station_id'].astype(str).unique())
+        df = df[counts >= self.min_samples]
+        
+        df = df.sort_values(['station_id', 'measured_at'], kind='stable').reset_index(drop=True)
+        
+        logger.info(
+            f"Prepared batch time series: {len(df)} records, "
+            f"{df['station_id'].nunique()} stations, {len(self.skipped_stations)} skipped"
+        )
+        return df
+    
+    @staticmethod
+    def _grouped_rolling_mean(values: pd.Series, groups: pd.Series, position: np.ndarray, window: int) -> np.ndarray:
+        """Rolling mean theo nhóm (min_periods=1) bằng cumsum, không lặp từng nhóm"""
+        csum = values.groupby(groups, sort=False).cumsum()
+        shifted = csum.groupby(groups, sort=False).shift(window).fillna(0.0)
+        return ((csum - shifted) / np.minimum(position + 1, window)).to_numpy()
+    
+    def create_batch_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Tạo features cho tất cả trạm (cùng định nghĩa với create_features)"""
+        groups = df['station_id']
+        grouped = df.groupby('station_id', sort=False)
+        position = grouped.cumcount().to_numpy()
+        
+        first_seen = grouped['measured_at'].transform('min')
+        df['day_num'] = (df['measured_at'] - first_seen).dt.days
+        df['hour'] = df['measured_at'].dt.hour
+        df['day_of_week'] = df['measured_at'].dt.dayofweek
+        df['aqi_ma_3'] = self._grouped_rolling_mean(df['aqi'], groups, position, 3)
+        df['aqi_ma_7'] = self._grouped_rolling_mean(df['aqi'], groups, position, 7)
+        return df
+    
+    def fit_batch(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> 'BatchAQIPrediction':
+        """
+        Fit mô hình cho tất cả trạm trong một pass
+        
+        Args:
+            data: Historical AQI data của nhiều trạm
+        
+        Returns:
+            self
+        """
+        df = self.prepare_batch_frame(data)
+        if df.empty:
+            raise ValueError(f"No station has at least {self.min_samples} samples")
+        
+        df = self.create_batch_features(df)
+        
+        # Design matrix với intercept
+        X = np.column_stack([np.ones(len(df)), df[self.FEATURE_COLS].to_numpy(dtype=np.float64)])
+        y = df['aqi'].to_numpy(dtype=np.float64)
+        
+        # Các trạm nằm liên tiếp (đã sort) -> reduceat theo điểm bắt đầu mỗi trạm
+        codes, self.stations = pd.factorize(df['station_id'], sort=False)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        
+        XtX = np.add.reduceat(X[:, :, None] * X[:, None, :], starts, axis=0)
+        Xty = np.add.reduceat(X * y[:, None], starts, axis=0)
+        self.coef_ = np.einsum('sij,sj->si', np.linalg.pinv(XtX), Xty)
+        
+        residuals = np.einsum('ni,ni->n', X, self.coef_[codes]) - y
+        self.train_mae_ = float(np.mean(np.abs(residuals)))
+        self.trained_from = df['measured_at'].min()
+        self.trained_until = df['measured_at'].max()
+        self.first_seen = df['measured_at'].to_numpy()[starts]
+        
+        self._store_batch_state(df, codes, starts)
+        self.is_fitted = True
+        logger.info(f"Batch prediction models trained for {len(self.stations)} stations on {len(df)} samples")
+        return self
+    
+    def _features_for_fitted(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> tuple:
+        """
+        Features của dữ liệu mới theo các trạm đã fit
+        
+        day_num tính từ mốc lúc train của từng trạm để khớp với hệ số đã học.
+        
+        Returns:
+            (df, codes) với codes là vị trí trong self.stations (-1 nếu trạm chưa có model)
+        """
+        df = self.create_batch_features(self.prepare_batch_frame(data))
+        codes = pd.Index(self.stations).get_indexer(df['station_id'])
+        known = codes >= 0
+        origin = pd.DatetimeIndex(self.first_seen[np.where(known, codes, 0)])
+        day_num = (pd.DatetimeIndex(df['measured_at']) - origin).days.to_numpy()
+        df['day_num'] = np.where(known, day_num, df['day_num'])
+        return df, codes
+    
+    def _store_batch_state(self, df: pd.DataFrame, codes: np.ndarray, starts: np.ndarray):
+        """Lưu trạng thái cuối của mỗi trạm (df sắp theo trạm, cùng thứ tự self.stations)"""
+        y = df['aqi'].to_numpy(dtype=np.float64)
+        ends = np.r_[starts[1:], len(df)] - 1
+        self.last_dates = df['measured_at'].to_numpy()[ends]
+        self.last_day_num = df['day_num'].to_numpy(dtype=np.float64)[ends]
+        self.last_aqi_batch = y[ends]
+        
+        reverse_position = df.groupby('station_id', sort=False).cumcount(ascending=False).to_numpy()
+        recent = reverse_position < self.HISTORY_WINDOW
+        self.history = np.full((len(self.stations), self.HISTORY_WINDOW), np.nan)
+        self.history[codes[recent], self.HISTORY_WINDOW - 1 - reverse_position[recent]] = y[recent]
+    
+    def refresh_state(self, data: Union[List[Dict[str, Any]], pd.DataFrame]) -> bool:
+        """
+        Cập nhật trạng thái cuối của mỗi trạm từ dữ liệu mới mà không fit lại
+        
+        Returns:
+            False nếu tập trạm khác lúc train (cần fit lại)
+        """
+        if not self.is_fitted:
+            return False
+        
+        df, codes = self._features_for_fitted(data)
+        if len(df) == 0 or (codes < 0).any():
+            return False
+        
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        if not np.array_equal(codes[starts], np.arange(len(self.stations))):
+            return False
+        
+        self._store_batch_state(df, codes, starts)
+        return True
+    
+    def drift_ratio(self, data: Union[List[Dict[str, Any]], pd.DataFrame], min_samples: int = 3) -> float:
+        """
+        MAE trên các điểm mới hơn training window (mọi trạm), chia cho MAE lúc train
+        
+        Returns:
+            Tỉ lệ drift (0.0 nếu chưa đủ điểm mới)
+        """
+        if not self.is_fitted or self.coef_ is None:
+            raise ValueError("Model not trained yet")
+        
+        df, codes = self._features_for_fitted(data)
+        recent = (df['measured_at'] > self.trained_until).to_numpy() & (codes >= 0)
+        if recent.sum() < min_samples:
+            return 0.0
+        
+        X = np.column_stack([np.ones(int(recent.sum())), df.loc[recent, self.FEATURE_COLS].to_numpy(dtype=np.float64)])
+        residuals = np.einsum('ni,ni->n', X, self.coef_[codes[recent]]) - df.loc[recent, 'aqi'].to_numpy()
+        return float(np.mean(np.abs(residuals))) / max(self.train_mae_, 1e-6)
+    
+    def predict_future_batch(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Dự báo AQI cho tất cả trạm, các ngày tới
+        
+        Returns:
+            Dict {station_id: list of predictions}
+        """
+        if not self.is_fitted or self.coef_ is None:
+            raise ValueError("Model not trained yet")
+        
+        n_stations = len(self.stations)
+        history = self.history.copy()
+        last_dates = pd.DatetimeIndex(self.last_dates)
+        
+        predicted = np.empty((n_stations, self.forecast_days))
+        dates = []
+        for day in range(1, self.forecast_days + 1):
+            forecast_dates = last_dates + pd.Timedelta(days=day)
+            dates.append(forecast_dates.strftime('%Y-%m-%d'))
+            
+            ma_3 = np.nanmean(history[:, -3:], axis=1)
+            ma_7 = np.nanmean(history, axis=1)
+            ma_3 = np.where(np.isnan(ma_3), self.last_aqi_batch, ma_3)
+            ma_7 = np.where(np.isnan(ma_7), self.last_aqi_batch, ma_7)
+            
+            # last_day_num + day == (forecast_date - first_seen).days, như predict_future
+            X = np.column_stack([
+                np.ones(n_stations),
+                self.last_day_num + day,
+                np.full(n_stations, 12.0),  # Noon prediction
+                forecast_dates.dayofweek.to_numpy(dtype=np.float64),
+                ma_3,
+                ma_7
+            ])
+            
+            # Ensure AQI is in valid range
+            aqi = np.clip(np.einsum('si,si->s', X, self.coef_), 0, 500)
+            predicted[:, day - 1] = aqi
+            
+            # Update history for next prediction
+            history = np.column_stack([history[:, 1:], aqi])
+        
+        forecasts = {}
+        for s, station_id in enumerate(self.stations):
+            forecasts[str(station_id)] = [
+                {
+                    'date': dates[d][s],
+                    'predicted_aqi': round(float(predicted[s, d]), 2),
+                    'confidence': self._calculate_confidence(d + 1),
+                    'category': self._aqi_category(predicted[s, d])
+                }
+                for d in range(self.forecast_days)
+            ]
+        
+        logger.info(f"Generated {self.forecast_days}-day forecasts for {n_stations} stations")
+        return forecasts
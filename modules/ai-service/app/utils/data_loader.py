@@ -22,11 +22,55 @@ Data Loader - Load data from database for ML models
 """
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Số dòng mỗi lần đọc từ server-side cursor
+DEFAULT_CHUNK_SIZE = 50_000
+
+AIR_QUALITY_SCHEMA = {
+    'id': 'str',
+    'station_id': 'str',
+    'latitude': 'float',
+    'longitude': 'float',
+    'aqi': 'float',
+    'pm25': 'float',
+    'pm10': 'float',
+    'co': 'float',
+    'no2': 'float',
+    'o3': 'float',
+    'so2': 'float',
+    'station_name': 'str',
+    'measured_at': 'datetime'
+}
+
+EMPTY_DTYPES = {
+    'float': 'float64',
+    'datetime': 'datetime64[ns, UTC]',
+    'str': object
+}
+
+SCHOOLS_SCHEMA = {
+    'id': 'str',
+    'name': 'str',
+    'code': 'str',
+    'latitude': 'float',
+    'longitude': 'float',
+    'green_score': 'float',
+    'total_students': 'float',
+    'total_teachers': 'float',
+    'type': 'str'
+}
+
+
+def _optional(value: Any, cast: Callable[[Any], Any]) -> Any:
+    """Ép kiểu giá trị của một dòng, NULL giữ là None (không thay bằng 0)"""
+    return cast(value) if value is not None else None
+
 
 async def load_air_quality_data(
     db: AsyncSession,
@@ -42,7 +86,7 @@ async def load_air_quality_data(
         limit: Max records to load
     
     Returns:
-        List of air quality records
+        List of air quality records (NULL readings -> None)
     """
     query = """
         SELECT 
@@ -56,27 +100,29 @@ async def load_air_quality_data(
         WHERE aqi IS NOT NULL
     """
     
+    params = {'limit': limit}
     if location_id:
-        query += f" AND station_id = '{location_id}'"
+        query += " AND station_id = :location_id"
+        params['location_id'] = location_id
     
-    query += f" ORDER BY measurement_date DESC LIMIT {limit}"
+    query += " ORDER BY measurement_date DESC LIMIT :limit"
     
-    result = await db.execute(text(query))
+    result = await db.execute(text(query), params)
     rows = result.fetchall()
     
     data = []
     for row in rows:
         data.append({
             'id': str(row[0]),
-            'latitude': float(row[1]) if row[1] else 0,
-            'longitude': float(row[2]) if row[2] else 0,
-            'aqi': float(row[3]) if row[3] else 0,
-            'pm25': float(row[4]) if row[4] else 0,
-            'pm10': float(row[5]) if row[5] else 0,
-            'co': float(row[6]) if row[6] else 0,
-            'no2': float(row[7]) if row[7] else 0,
-            'o3': float(row[8]) if row[8] else 0,
-            'so2': float(row[9]) if row[9] else 0,
+            'latitude': _optional(row[1], float),
+            'longitude': _optional(row[2], float),
+            'aqi': _optional(row[3], float),
+            'pm25': _optional(row[4], float),
+            'pm10': _optional(row[5], float),
+            'co': _optional(row[6], float),
+            'no2': _optional(row[7], float),
+            'o3': _optional(row[8], float),
+            'so2': _optional(row[9], float),
             'station_name': row[10],
             'measured_at': row[11]
         })
@@ -97,7 +143,7 @@ async def load_schools_data(
         limit: Max records to load
     
     Returns:
-        List of school records
+        List of school records (NULL values -> None)
     """
     query = """
         SELECT 
@@ -125,11 +171,11 @@ async def load_schools_data(
             'id': str(row[0]),
             'name': row[1],
             'code': row[2],
-            'latitude': float(row[3]) if row[3] else 0,
-            'longitude': float(row[4]) if row[4] else 0,
-            'green_score': float(row[5]) if row[5] else 0,
-            'total_students': int(row[6]) if row[6] else 0,
-            'total_teachers': int(row[7]) if row[7] else 0,
+            'latitude': _optional(row[3], float),
+            'longitude': _optional(row[4], float),
+            'green_score': _optional(row[5], float),
+            'total_students': _optional(row[6], int),
+            'total_teachers': _optional(row[7], int),
             'type': row[8]
         })
     
@@ -155,3 +201,294 @@ async def load_combined_data(db: AsyncSession) -> Dict[str, List[Dict[str, Any]]
         'education': education_data
     }
 
+
+
+# ================================
+# Columnar loaders (NumPy / pandas)
+# ================================
+
+def _column_array(values: tuple, kind: str) -> np.ndarray:
+    """Chuyển một cột của chunk thành mảng typed, NULL -> NaN / NaT / None"""
+    if kind == 'float':
+        # None -> NaN khi ép kiểu float64
+        return np.array(values, dtype=np.float64)
+    if kind == 'datetime':
+        # Lưu dạng datetime64 UTC (naive), gắn lại timezone khi ghép DataFrame
+        return pd.to_datetime(pd.Series(values, dtype=object), utc=True).to_numpy(dtype='datetime64[ns]')
+    return np.array([str(v) if v is not None else None for v in values], dtype=object)
+
+
+async def stream_frame(
+    db: AsyncSession,
+    query: str,
+    params: Dict[str, Any],
+    schema: Dict[str, str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Đọc kết quả query theo chunk từ server-side cursor thẳng vào mảng NumPy
+    
+    Args:
+        db: Database session
+        query: SQL, thứ tự cột phải khớp với schema
+        params: Bound parameters
+        schema: {column: 'float' | 'datetime' | 'str'}
+        chunk_size: Số dòng mỗi chunk
+    
+    Returns:
+        DataFrame với cột typed (float64, datetime64[ns, UTC], object)
+    """
+    columns = list(schema)
+    chunks: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+    n_rows = 0
+    
+    result = await db.stream(
+        text(query).execution_options(yield_per=chunk_size),
+        params
+    )
+    async for partition in result.partitions(chunk_size):
+        # Chuyển chunk sang dạng cột rồi bỏ các tuple Python
+        for name, values in zip(columns, zip(*partition)):
+            chunks[name].append(_column_array(values, schema[name]))
+        n_rows += len(partition)
+    
+    if n_rows == 0:
+        return pd.DataFrame({
+            name: pd.Series(dtype=EMPTY_DTYPES[kind]) for name, kind in schema.items()
+        })
+    
+    df = pd.DataFrame({name: np.concatenate(parts) for name, parts in chunks.items()})
+    for name, kind in schema.items():
+        if kind == 'datetime':
+            df[name] = df[name].dt.tz_localize('UTC')
+    return df
+
+
+async def load_air_quality_frame(
+    db: AsyncSession,
+    location_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Load air quality data as a typed DataFrame (NULL -> NaN)
+    
+    Args:
+        db: Database session
+        location_id: Optional station filter
+        limit: Max records to load (None = all)
+        chunk_size: Rows per server-side cursor fetch
+    
+    Returns:
+        DataFrame with AIR_QUALITY_SCHEMA columns
+    """
+    query = """
+        SELECT 
+            id::text,
+            station_id,
+            ST_Y(location::geometry) as latitude,
+            ST_X(location::geometry) as longitude,
+            aqi::float8, pm25::float8, pm10::float8, co::float8,
+            no2::float8, o3::float8, so2::float8,
+            station_name,
+            measurement_date as measured_at
+        FROM air_quality
+        WHERE aqi IS NOT NULL
+    """
+    params: Dict[str, Any] = {}
+    if location_id:
+        query += " AND station_id = :location_id"
+        params['location_id'] = location_id
+    
+    query += " ORDER BY measurement_date DESC"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+    
+    df = await stream_frame(db, query, params, AIR_QUALITY_SCHEMA, chunk_size)
+    
+    logger.info(f"Loaded {len(df)} air quality records (columnar)")
+    return df
+
+
+async def load_schools_frame(
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Load schools data as a typed DataFrame (NULL -> NaN)
+    
+    Args:
+        db: Database session
+        limit: Max records to load (None = all)
+        chunk_size: Rows per server-side cursor fetch
+    
+    Returns:
+        DataFrame with SCHOOLS_SCHEMA columns
+    """
+    query = """
+        SELECT 
+            id::text,
+            name,
+            code,
+            ST_Y(location::geometry) as latitude,
+            ST_X(location::geometry) as longitude,
+            green_score::float8,
+            total_students::float8,
+            total_teachers::float8,
+            type
+        FROM schools
+        WHERE green_score IS NOT NULL
+        ORDER BY green_score DESC
+    """
+    params: Dict[str, Any] = {}
+    if limit is not None:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+    
+    df = await stream_frame(db, query, params, SCHOOLS_SCHEMA, chunk_size)
+    
+    logger.info(f"Loaded {len(df)} school records (columnar)")
+    return df
+
+
+# date_trunc units và hàm gộp được phép (chèn thẳng vào SQL nên phải whitelist)
+TIME_BUCKETS = ('hour', 'day')
+BUCKET_AGGREGATES = {
+    'median': "percentile_cont(0.5) WITHIN GROUP (ORDER BY aqi)",
+    'mean': "AVG(aqi)"
+}
+
+BUCKETED_HISTORY_SCHEMA = {
+    'station_id': 'str',
+    'station_name': 'str',
+    'measured_at': 'datetime',
+    'aqi': 'float',
+    'samples': 'float'
+}
+
+
+async def load_bucketed_history(
+    db: AsyncSession,
+    bucket: str = 'day',
+    aggregate: str = 'median',
+    lookback_days: int = 180,
+    location_id: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Load AQI history aggregated per station into hourly/daily buckets
+    
+    Việc gộp chạy trong Postgres (date_trunc + percentile_cont), nên số dòng
+    trả về chỉ phụ thuộc số bucket chứ không phụ thuộc tần suất đo.
+    
+    Args:
+        db: Database session
+        bucket: date_trunc unit ('hour' or 'day')
+        aggregate: 'median' (percentile_cont) or 'mean'
+        lookback_days: Number of days of history to aggregate
+        location_id: Optional station filter
+        chunk_size: Rows per server-side cursor fetch
+    
+    Returns:
+        DataFrame with station_id, station_name, measured_at (bucket start), aqi, samples
+    """
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Unsupported time bucket: {bucket} (expected one of {TIME_BUCKETS})")
+    if aggregate not in BUCKET_AGGREGATES:
+        raise ValueError(f"Unsupported bucket aggregate: {aggregate} (expected one of {tuple(BUCKET_AGGREGATES)})")
+    
+    query = f"""
+        SELECT
+            station_id,
+            MAX(station_name) as station_name,
+            date_trunc('{bucket}', measurement_date) as measured_at,
+            {BUCKET_AGGREGATES[aggregate]}::float8 as aqi,
+            COUNT(*)::float8 as samples
+        FROM air_quality
+        WHERE aqi IS NOT NULL
+          AND station_id IS NOT NULL
+          AND measurement_date >= NOW() - make_interval(days => :lookback_days)
+    """
+    
+    params = {'lookback_days': lookback_days}
+    if location_id:
+        query += " AND station_id = :location_id"
+        params['location_id'] = location_id
+    
+    query += f"""
+        GROUP BY station_id, date_trunc('{bucket}', measurement_date)
+        ORDER BY station_id, measured_at
+    """
+    
+    df = await stream_frame(db, query, params, BUCKETED_HISTORY_SCHEMA, chunk_size)
+    
+    logger.info(
+        f"Loaded {len(df)} {bucket} buckets ({aggregate}) for "
+        f"{df['station_id'].nunique()} stations over {lookback_days} days"
+    )
+    return df
+
+
+async def load_latest_station_aqi(
+    db: AsyncSession,
+    max_age_hours: float = 24.0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Load the most recent AQI reading of every station with coordinates
+    
+    Args:
+        db: Database session
+        max_age_hours: Ignore stations without a reading in this window
+        chunk_size: Rows per server-side cursor fetch
+    
+    Returns:
+        DataFrame with station_id, station_name, latitude, longitude, aqi, measured_at
+    """
+    query = """
+        SELECT DISTINCT ON (station_id)
+            station_id,
+            station_name,
+            ST_Y(location::geometry)::float8 as latitude,
+            ST_X(location::geometry)::float8 as longitude,
+            aqi::float8 as aqi,
+            measurement_date as measured_at
+        FROM air_quality
+        WHERE aqi IS NOT NULL
+          AND station_id IS NOT NULL
+          AND location IS NOT NULL
+          AND measurement_date >= NOW() - (:max_age_hours * INTERVAL '1 hour')
+        ORDER BY station_id, measurement_date DESC
+    """
+    schema = {
+        'station_id': 'str',
+        'station_name': 'str',
+        'latitude': 'float',
+        'longitude': 'float',
+        'aqi': 'float',
+        'measured_at': 'datetime'
+    }
+    
+    df = await stream_frame(db, query, {'max_age_hours': max_age_hours}, schema, chunk_size)
+    
+    logger.info(f"Loaded latest AQI of {len(df)} stations (last {max_age_hours}h)")
+    return df
+
+
+async def load_combined_frames(db: AsyncSession, limit: int = 1000) -> Dict[str, pd.DataFrame]:
+    """
+    Load both environment and education data as DataFrames
+    
+    Args:
+        db: Database session
+        limit: Max records per table
+    
+    Returns:
+        Dict with 'environment' and 'education' keys
+    """
+    return {
+        'environment': await load_air_quality_frame(db, limit=limit),
+        'education': await load_schools_frame(db, limit=limit)
+    }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Spatial Utilities - Ghép nối không gian cho ML models
+Tìm trạm đo gần nhất bằng BallTree (metric haversine) thay vì vòng lặp O(n × m)
+"""
+import numpy as np
+from sklearn.neighbors import BallTree
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bán kính trung bình của Trái Đất (km)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: np.ndarray, lon1: np.ndarray,
+                 lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Khoảng cách great-circle (km) giữa các cặp điểm, tính vector hóa
+    
+    Args:
+        lat1, lon1: Tọa độ điểm thứ nhất (độ)
+        lat2, lon2: Tọa độ điểm thứ hai (độ), broadcast được với điểm thứ nhất
+    
+    Returns:
+        Khoảng cách theo km
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def coordinates_from_records(
+    records: Sequence[Dict[str, Any]],
+    lat_key: str = 'latitude',
+    lon_key: str = 'longitude'
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trích xuất tọa độ từ list of dict thành 2 mảng float64
+    
+    Tọa độ thiếu (None) được chuyển thành NaN để bị loại khi query.
+    """
+    lat = np.array(
+        [r.get(lat_key) if r.get(lat_key) is not None else np.nan for r in records],
+        dtype=np.float64
+    )
+    lon = np.array(
+        [r.get(lon_key) if r.get(lon_key) is not None else np.nan for r in records],
+        dtype=np.float64
+    )
+    return lat, lon
+
+
+class StationIndex:
+    """Spatial index các trạm đo (BallTree, metric haversine)"""
+    
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]):
+        """
+        Build index từ tọa độ trạm đo
+        
+        Args:
+            latitudes: Vĩ độ các trạm (độ)
+            longitudes: Kinh độ các trạm (độ)
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        if lat.shape != lon.shape:
+            raise ValueError("latitudes and longitudes must have the same shape")
+        
+        # Bỏ các trạm không có tọa độ hợp lệ, giữ lại vị trí gốc
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.positions = np.flatnonzero(valid)
+        if len(self.positions) == 0:
+            raise ValueError("No stations with valid coordinates")
+        
+        coords = np.radians(np.column_stack([lat[valid], lon[valid]]))
+        self.tree = BallTree(coords, metric='haversine')
+        
+        logger.info(f"Built station index with {len(self.positions)} stations")
+    
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]],
+                     lat_key: str = 'latitude',
+                     lon_key: str = 'longitude') -> 'StationIndex':
+        """Build index từ list of dict (định dạng của data_loader)"""
+        lat, lon = coordinates_from_records(records, lat_key, lon_key)
+        return cls(lat, lon)
+    
+    def __len__(self) -> int:
+        return len(self.positions)
+    
+    def query(self, latitudes: Sequence[float], longitudes: Sequence[float],
+              max_distance_km: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tìm trạm gần nhất cho mỗi điểm trong một lần query
+        
+        Args:
+            latitudes: Vĩ độ các điểm cần ghép (độ)
+            longitudes: Kinh độ các điểm cần ghép (độ)
+            max_distance_km: Bỏ qua trạm xa hơn ngưỡng này (None = không giới hạn)
+        
+        Returns:
+            (indices, distances_km) - indices là vị trí trạm trong dữ liệu gốc,
+            -1 và NaN nếu điểm không có tọa độ hoặc không có trạm trong ngưỡng
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        
+        indices = np.full(lat.shape, -1, dtype=np.int64)
+        distances = np.full(lat.shape, np.nan, dtype=np.float64)
+        
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        if not valid.any():
+            return indices, distances
+        
+        points = np.radians(np.column_stack([lat[valid], lon[valid]]))
+        dist, idx = self.tree.query(points, k=1)
+        
+        nearest = self.positions[idx[:, 0]]
+        dist_km = dist[:, 0] * EARTH_RADIUS_KM
+        
+        if max_distance_km is not None:
+            within = dist_km <= max_distance_km
+            nearest = np.where(within, nearest, -1)
+            dist_km = np.where(within, dist_km, np.nan)
+        
+        indices[valid] = nearest
+        distances[valid] = dist_km
+        return indices, distances
+
+
+def nearest_station_join(
+    targets: List[Dict[str, Any]],
+    stations: List[Dict[str, Any]],
+    max_distance_km: Optional[float] = None
+) -> List[Tuple[Dict[str, Any], Dict[str, Any], float]]:
+    """
+    Ghép mỗi điểm (vd: trường học) với trạm đo gần nhất
+    
+    Args:
+        targets: Các điểm cần ghép, có latitude/longitude
+        stations: Các trạm đo, có latitude/longitude
+        max_distance_km: Khoảng cách tối đa cho phép (None = không giới hạn)
+    
+    Returns:
+        List of (target, station, distance_km) cho các điểm ghép được
+    """
+    if not targets or not stations:
+        return []
+    
+    index = StationIndex.from_records(stations)
+    lat, lon = coordinates_from_records(targets)
+    indices, distances = index.query(lat, lon, max_distance_km=max_distance_km)
+    
+    matched = np.flatnonzero(indices >= 0)
+    return [
+        (targets[i], stations[indices[i]], float(distances[i]))
+        for i in matched
+    ]
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Task Store - Lưu trạng thái và kết quả AI tasks (bảng ai_task_results)
+Tái sử dụng kết quả khi task mới có cùng fingerprint (tham số + snapshot dữ liệu)
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+import hashlib
+import json
+import logging
+import math
+import time
+
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# Chỉ cho phép snapshot các bảng đã biết (tên bảng không thể bind parameter)
+SNAPSHOT_TABLES = {"air_quality", "schools"}
+
+
+def _json_default(value: Any) -> Any:
+    """Chuyển numpy scalar (np.float64, np.bool_) về kiểu Python khi serialize"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _finite(value: Any) -> Any:
+    """
+    Thay NaN/Infinity bằng None (JSONB của Postgres không nhận NaN)
+    
+    Đi qua dict/list/tuple, numpy scalar và numpy array.
+    """
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if hasattr(value, 'tolist'):
+        # numpy scalar -> Python scalar, numpy array -> list
+        return _finite(value.tolist())
+    return value
+
+
+def _dump_json(value: Any) -> str:
+    """Serialize cho cột JSONB: NaN/Infinity thành null"""
+    return json.dumps(_finite(value), default=_json_default, allow_nan=False)
+
+
+def task_payload(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Lấy payload của task từ message
+    
+    Gateway publish payload ở top-level, environment-service bọc trong 'data'.
+    """
+    data = body.get('data')
+    return data if isinstance(data, dict) else body
+
+
+async def load_data_snapshot(db: AsyncSession, tables: Iterable[str]) -> Dict[str, Any]:
+    """
+    Đọc "phiên bản" dữ liệu hiện tại: số dòng và thời điểm cập nhật mới nhất
+    
+    Args:
+        db: Database session
+        tables: Các bảng dữ liệu đầu vào của task
+    
+    Returns:
+        Dict {table: [count, max_updated]}
+    """
+    snapshot = {}
+    for table in sorted(tables):
+        if table not in SNAPSHOT_TABLES:
+            raise ValueError(f"Unknown snapshot table: {table}")
+        result = await db.execute(text(
+            f"SELECT COUNT(*), MAX(COALESCE(updated_at, created_at)) FROM {table}"
+        ))
+        count, max_updated = result.fetchone()
+        snapshot[table] = [int(count), max_updated.isoformat() if max_updated else None]
+    return snapshot
+
+
+def task_fingerprint(task_type: str, parameters: Dict[str, Any], snapshot: Dict[str, Any]) -> str:
+    """SHA-256 của loại task + tham số + snapshot dữ liệu"""
+    canonical = json.dumps(
+        {"task_type": task_type, "parameters": parameters, "snapshot": snapshot},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def find_reusable_result(db: AsyncSession, task_type: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Tìm kết quả đã hoàn thành gần nhất có cùng fingerprint"""
+    result = await db.execute(text("""
+        SELECT task_id, result
+        FROM ai_task_results
+        WHERE task_type = :task_type
+          AND input_fingerprint = :fingerprint
+          AND status = 'completed'
+        ORDER BY completed_at DESC
+        LIMIT 1
+    """), {"task_type": task_type, "fingerprint": fingerprint})
+    row = result.fetchone()
+    if not row:
+        return None
+    return {"task_id": row[0], "result": row[1]}
+
+
+async def start_task(
+    db: AsyncSession,
+    task_id: str,
+    task_type: str,
+    parameters: Dict[str, Any],
+    fingerprint: str
+):
+    """Ghi nhận task bắt đầu chạy"""
+    await db.execute(text("""
+        INSERT INTO ai_task_results (task_id, task_type, status, parameters, input_fingerprint, started_at)
+        VALUES (:task_id, :task_type, 'running', CAST(:parameters AS JSONB), :fingerprint, NOW())
+        ON CONFLICT (task_id) DO UPDATE SET
+            status = 'running',
+            parameters = EXCLUDED.parameters,
+            input_fingerprint = EXCLUDED.input_fingerprint,
+            result = NULL,
+            error = NULL,
+            started_at = NOW(),
+            completed_at = NULL,
+            updated_at = NOW()
+    """), {
+        "task_id": task_id,
+        "task_type": task_type,
+        "parameters": _dump_json(parameters),
+        "fingerprint": fingerprint
+    })
+    await db.commit()
+
+
+async def finish_task(
+    db: AsyncSession,
+    task_id: str,
+    status: str,
+    duration_ms: int,
+    result: Optional[Any] = None,
+    error: Optional[str] = None,
+    reused_from: Optional[str] = None
+):
+    """Ghi nhận kết quả (completed) hoặc lỗi (failed) của task"""
+    await db.execute(text("""
+        UPDATE ai_task_results SET
+            status = :status,
+            result = CAST(:result AS JSONB),
+            error = :error,
+            reused_from = :reused_from,
+            completed_at = NOW(),
+            duration_ms = :duration_ms,
+            updated_at = NOW()
+        WHERE task_id = :task_id
+    """), {
+        "task_id": task_id,
+        "status": status,
+        "result": _dump_json(result) if result is not None else None,
+        "error": error,
+        "reused_from": reused_from,
+        "duration_ms": duration_ms
+    })
+    await db.commit()
+
+
+async def get_task(db: AsyncSession, task_id: str) -> Optional[Dict[str, Any]]:
+    """Đọc trạng thái và kết quả của task"""
+    result = await db.execute(text("""
+        SELECT task_id, task_type, status, parameters, input_fingerprint,
+               result, error, reused_from, started_at, completed_at, duration_ms
+        FROM ai_task_results
+        WHERE task_id = :task_id
+    """), {"task_id": task_id})
+    row = result.fetchone()
+    if not row:
+        return None
+    
+    return {
+        "task_id": row[0],
+        "task_type": row[1],
+        "status": row[2],
+        "parameters": row[3],
+        "input_fingerprint": row[4],
+        "result": row[5],
+        "error": row[6],
+        "reused_from": row[7],
+        "started_at": row[8].isoformat() if row[8] else None,
+        "completed_at": row[9].isoformat() if row[9] else None,
+        "duration_ms": row[10]
+    }
+
+
+async def run_with_result_store(
+    task_id: str,
+    task_type: str,
+    parameters: Dict[str, Any],
+    tables: Iterable[str],
+    handler: Callable[[], Awaitable[Optional[Any]]]
+) -> Optional[Any]:
+    """
+    Chạy task với lưu kết quả và tái sử dụng theo fingerprint
+    
+    Args:
+        task_id: ID của task (từ message)
+        task_type: clustering / prediction / correlation
+        parameters: Tham số ảnh hưởng tới kết quả
+        tables: Các bảng dữ liệu đầu vào (để tính snapshot)
+        handler: Coroutine thực thi task, trả về None nếu không đủ dữ liệu
+    
+    Returns:
+        Kết quả của task (mới tính hoặc tái sử dụng)
+    """
+    started = time.perf_counter()
+    
+    async with AsyncSessionLocal() as db:
+        snapshot = await load_data_snapshot(db, tables)
+        fingerprint = task_fingerprint(task_type, parameters, snapshot)
+        
+        await start_task(db, task_id, task_type, parameters, fingerprint)
+        
+        reusable = await find_reusable_result(db, task_type, fingerprint)
+        if reusable:
+            await finish_task(
+                db, task_id, STATUS_COMPLETED,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                result=reusable["result"],
+                reused_from=reusable["task_id"]
+            )
+            logger.info(f"Task {task_id}: reused result of task {reusable['task_id']}")
+            return reusable["result"]
+    
+    try:
+        result = await handler()
+    except Exception as e:
+        async with AsyncSessionLocal() as db:
+            await finish_task(
+                db, task_id, STATUS_FAILED,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                error=str(e) or type(e).__name__
+            )
+        raise
+    
+    async with AsyncSessionLocal() as db:
+        if result is None:
+            await finish_task(
+                db, task_id, STATUS_FAILED,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                error="Insufficient data"
+            )
+        else:
+            await finish_task(
+                db, task_id, STATUS_COMPLETED,
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                result=result
+            )
+    
+    return result
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Time Series Utilities - Chuẩn hóa chuỗi AQI theo bucket cho ML models
+Resample về tần suất cố định và lấp các khoảng trống ngắn giữa các bucket
+"""
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Phương pháp lấp khoảng trống được hỗ trợ
+GAP_FILL_METHODS = ('interpolate', 'ffill', 'none')
+
+# Tần suất tương ứng với các bucket date_trunc
+BUCKET_FREQUENCIES = {'hour': 'h', 'day': 'D'}
+
+
+def _fixed_step(freq: str) -> pd.Timedelta:
+    """Bước thời gian cố định của freq (chỉ hỗ trợ tần suất dạng Tick: h, D, 3h, 7D...)"""
+    try:
+        return pd.Timedelta(to_offset(freq).nanos)
+    except ValueError:
+        raise ValueError(f"Resample frequency must be a fixed interval (e.g. 'h', 'D'), got: {freq}")
+
+
+def resample_buckets(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Gộp các bucket về tần suất thô hơn (ví dụ hourly -> daily)
+    
+    AQI được lấy trung bình có trọng số theo số mẫu của mỗi bucket.
+    
+    Args:
+        df: DataFrame với station_id, measured_at, aqi, samples (sắp theo trạm, thời gian)
+        freq: Pandas frequency string
+    
+    Returns:
+        DataFrame cùng cột, mỗi trạm một dòng cho mỗi khoảng freq
+    """
+    step = _fixed_step(freq)
+    
+    frame = df.assign(
+        measured_at=df['measured_at'].dt.floor(step),
+        weighted=df['aqi'] * df['samples']
+    )
+    grouped = frame.groupby(['station_id', 'measured_at'], sort=True)
+    result = grouped.agg(
+        station_name=('station_name', 'first'),
+        weighted=('weighted', 'sum'),
+        samples=('samples', 'sum')
+    ).reset_index()
+    result['aqi'] = result['weighted'] / result['samples']
+    
+    return result.drop(columns='weighted')
+
+
+def fill_gaps(df: pd.DataFrame, freq: str, method: str = 'interpolate', max_gap: int = 3) -> pd.DataFrame:
+    """
+    Đưa mỗi trạm về lưới thời gian đều và lấp khoảng trống ngắn
+    
+    Khoảng trống dài hơn max_gap bucket được giữ nguyên (bị loại khỏi kết quả)
+    thay vì nội suy một phần.
+    
+    Args:
+        df: DataFrame với station_id, measured_at, aqi (sắp theo trạm, thời gian)
+        freq: Pandas frequency string của lưới
+        method: 'interpolate' (tuyến tính), 'ffill' hoặc 'none'
+        max_gap: Số bucket trống liên tiếp tối đa được lấp
+    
+    Returns:
+        DataFrame thêm cột filled (True với bucket được lấp)
+    """
+    if method not in GAP_FILL_METHODS:
+        raise ValueError(f"Unsupported gap fill method: {method} (expected one of {GAP_FILL_METHODS})")
+    
+    if df.empty or method == 'none' or max_gap <= 0:
+        return df.assign(filled=False)
+    
+    step = _fixed_step(freq)
+    
+    # Lưới đều [min, max] cho từng trạm, dựng vector hóa thay vì date_range từng trạm
+    bounds = df.groupby('station_id', sort=True)['measured_at'].agg(['min', 'max'])
+    periods = ((bounds['max'] - bounds['min']) // step).to_numpy(dtype=np.int64) + 1
+    offsets = np.arange(periods.sum()) - np.repeat(np.cumsum(periods) - periods, periods)
+    grid = pd.MultiIndex.from_arrays(
+        [
+            np.repeat(bounds.index.to_numpy(), periods),
+            pd.DatetimeIndex(bounds['min']).repeat(periods) + pd.to_timedelta(offsets * step.value, unit='ns')
+        ],
+        names=['station_id', 'measured_at']
+    )
+    
+    frame = df.set_index(['station_id', 'measured_at']).reindex(grid).reset_index()
+    missing = frame['aqi'].isna().to_numpy()
+    
+    # Độ dài mỗi đoạn trống; đầu/cuối mỗi trạm luôn có dữ liệu nên các đoạn không vắt qua trạm
+    run_id = np.cumsum(~missing)
+    gap_len = pd.Series(missing).groupby(run_id).transform('sum').to_numpy()
+    fillable = missing & (gap_len <= max_gap)
+    
+    if method == 'interpolate':
+        candidate = frame['aqi'].interpolate(method='linear', limit_area='inside')
+    else:
+        candidate = frame['aqi'].ffill()
+    
+    frame['aqi'] = np.where(fillable, candidate, frame['aqi'])
+    frame['filled'] = fillable
+    if 'samples' in frame:
+        frame['samples'] = frame['samples'].fillna(0.0)
+    if 'station_name' in frame:
+        frame['station_name'] = frame.groupby('station_id', sort=False)['station_name'].ffill()
+    
+    frame = frame[~missing | fillable].reset_index(drop=True)
+    
+    logger.info(f"Filled {int(fillable.sum())} gaps of at most {max_gap} buckets ({method}, freq={freq})")
+    return frame
+
+
+def regularize_buckets(
+    df: pd.DataFrame,
+    bucket: str = 'day',
+    resample: Optional[str] = None,
+    gap_fill: str = 'interpolate',
+    max_gap: int = 3
+) -> pd.DataFrame:
+    """
+    Chuẩn hóa chuỗi bucket từ load_bucketed_history trước khi train
+    
+    Args:
+        df: Bucketed history (station_id, station_name, measured_at, aqi, samples)
+        bucket: date_trunc unit đã dùng trong SQL ('hour' or 'day')
+        resample: Optional pandas frequency để gộp tiếp (ví dụ 'D' từ hourly buckets)
+        gap_fill: Phương pháp lấp khoảng trống ('interpolate', 'ffill', 'none')
+        max_gap: Số bucket trống liên tiếp tối đa được lấp
+    
+    Returns:
+        DataFrame sắp theo (station_id, measured_at) trên lưới đều
+    """
+    if df.empty:
+        return df.assign(filled=pd.Series(dtype=bool))
+    
+    freq = resample or BUCKET_FREQUENCIES[bucket]
+    if resample:
+        df = resample_buckets(df, resample)
+    
+    return fill_gaps(df, freq, method=gap_fill, max_gap=max_gap)
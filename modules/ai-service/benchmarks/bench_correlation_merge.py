@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Benchmark: CorrelationAnalysis.prepare_data (spatial join trường ↔ trạm đo)
+
+Chạy từ thư mục ai-service:
+    python -m benchmarks.bench_correlation_merge
+    python -m benchmarks.bench_correlation_merge --sizes 1000 10000 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.models.correlation import CorrelationAnalysis
+from app.utils.spatial import haversine_km
+from benchmarks.synthetic import LAT_RANGE, LON_RANGE
+
+
+def make_points(n: int, rng: np.random.Generator, with_values: bool):
+    """Sinh n điểm ngẫu nhiên trong khung tọa độ Việt Nam"""
+    lat = rng.uniform(*LAT_RANGE, n)
+    lon = rng.uniform(*LON_RANGE, n)
+    if with_values:
+        aqi = rng.uniform(10, 300, n)
+        return [
+            {'latitude': lat[i], 'longitude': lon[i], 'aqi': aqi[i], 'pm25': aqi[i] / 3}
+            for i in range(n)
+        ]
+    score = rng.uniform(0, 100, n)
+    return [
+        {'id': str(i), 'name': f"School {i}", 'latitude': lat[i], 'longitude': lon[i],
+         'green_score': score[i], 'total_students': 500}
+        for i in range(n)
+    ]
+
+
+def run(sizes, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    analyzer = CorrelationAnalysis()
+    
+    print(f"{'schools':>10} {'readings':>10} {'seconds':>10}")
+    for n in sizes:
+        env = make_points(n, rng, with_values=True)
+        edu = make_points(n, rng, with_values=False)
+        
+        start = time.perf_counter()
+        df = analyzer.prepare_data(env, edu)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>10} {n:>10} {elapsed:>10.3f}")
+        
+        # Kiểm tra kết quả với brute force trên một mẫu nhỏ
+        sample = rng.choice(len(df), size=min(50, len(df)), replace=False)
+        env_lat = np.array([e['latitude'] for e in env])
+        env_lon = np.array([e['longitude'] for e in env])
+        for i in sample:
+            brute = haversine_km(df['latitude'].iat[i], df['longitude'].iat[i], env_lat, env_lon).min()
+            assert np.isclose(brute, df['distance_km'].iat[i], atol=1e-6), "nearest station mismatch"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.sizes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Benchmark suite: thời gian + peak memory từng stage của các ML models
+(spatial join / regularize, feature prep, fit, predict, assign) trên dữ liệu giả lập
+có seed, giữ sẵn trong bộ nhớ: không đo thời gian đọc từ database.
+Kết quả ghi ra JSON; so với baseline để phát hiện regression.
+
+Chạy từ thư mục ai-service:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 1000 10000 --models clustering --output report.json
+    python -m benchmarks.suite --sizes 1000 10000 --baseline report.json --tolerance 0.25
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from app.consumers.clustering_consumer import merge_schools_with_aqi
+from app.models.clustering import EnvironmentClustering, GeoDensityClustering
+from app.models.correlation import CorrelationAnalysis
+from app.models.prediction import AQIPrediction, BatchAQIPrediction
+from app.utils.timeseries import regularize_buckets
+from benchmarks.synthetic import generate_aqi_series, generate_stations, make_dataset
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# Stage nhận context dict (dữ liệu + output của stage trước) và ghi kết quả vào đó
+Stage = Tuple[str, Callable[[Dict[str, Any]], None]]
+
+
+def clustering_stages() -> List[Stage]:
+    """EnvironmentClustering: spatial join -> features -> KMeans -> centroids -> zones"""
+    def join(ctx):
+        ctx['merged'] = merge_schools_with_aqi(ctx['schools'], ctx['readings'])
+    
+    def prep(ctx):
+        ctx['model'] = EnvironmentClustering(n_clusters=3)
+        ctx['X'] = ctx['model'].prepare_data(ctx['merged'])
+    
+    def fit(ctx):
+        ctx['model'].fit(ctx['X'])
+    
+    def predict(ctx):
+        ctx['labels'] = ctx['model'].predict(ctx['X'])
+    
+    def assign(ctx):
+        ctx['model'].assign_zones(ctx['merged'], ctx['labels'])
+    
+    return [('join', join), ('prep', prep), ('fit', fit), ('predict', predict), ('assign', assign)]
+
+
+def dbscan_stages() -> List[Stage]:
+    """GeoDensityClustering (DBSCAN haversine): spatial join -> clusters -> hulls"""
+    def join(ctx):
+        ctx['merged'] = merge_schools_with_aqi(ctx['schools'], ctx['readings'])
+    
+    def fit(ctx):
+        ctx['model'] = GeoDensityClustering(method='dbscan', eps_km=2.0, min_samples=5)
+        ctx['results'] = ctx['model'].fit_predict(ctx['merged'])
+    
+    def hulls(ctx):
+        ctx['model'].cluster_hulls(ctx['results'])
+    
+    return [('join', join), ('fit', fit), ('hulls', hulls)]
+
+
+def prediction_stages() -> List[Stage]:
+    """AQIPrediction trên một chuỗi hourly dài n dòng"""
+    def regularize(ctx):
+        ctx['series'] = regularize_buckets(ctx['single_series'], bucket='hour')
+    
+    def prep(ctx):
+        ctx['model'] = AQIPrediction(forecast_days=7)
+        ctx['model'].create_features(ctx['model'].prepare_time_series(ctx['series']))
+    
+    def fit(ctx):
+        ctx['model'].fit(ctx['series'])
+    
+    def predict(ctx):
+        ctx['model'].predict_future()
+    
+    return [('regularize', regularize), ('prep', prep), ('fit', fit), ('predict', predict)]
+
+
+def batch_prediction_stages() -> List[Stage]:
+    """BatchAQIPrediction trên ~n daily bucket của nhiều trạm"""
+    def regularize(ctx):
+        ctx['batch_series'] = regularize_buckets(ctx['series'], bucket='day')
+    
+    def prep(ctx):
+        ctx['model'] = BatchAQIPrediction(forecast_days=7)
+        ctx['model'].create_batch_features(ctx['model'].prepare_batch_frame(ctx['batch_series']))
+    
+    def fit(ctx):
+        ctx['model'].fit_batch(ctx['batch_series'])
+    
+    def predict(ctx):
+        ctx['model'].predict_future_batch()
+    
+    return [('regularize', regularize), ('prep', prep), ('fit', fit), ('predict', predict)]
+
+
+def correlation_stages() -> List[Stage]:
+    """CorrelationAnalysis: spatial join -> cặp cố định -> matrix mode"""
+    def join(ctx):
+        ctx['analyzer'] = CorrelationAnalysis()
+        ctx['analyzer'].prepare_data(ctx['readings'], ctx['schools'])
+    
+    def fit(ctx):
+        ctx['analyzer'].analyze(ctx['readings'], ctx['schools'], method='pearson')
+    
+    def matrix(ctx):
+        ctx['analyzer'].analyze_matrix(ctx['readings'], ctx['schools'], n_bootstrap=200, random_state=0)
+    
+    return [('join', join), ('fit', fit), ('matrix', matrix)]
+
+
+MODELS: Dict[str, Callable[[], List[Stage]]] = {
+    'clustering': clustering_stages,
+    'clustering_dbscan': dbscan_stages,
+    'prediction': prediction_stages,
+    'prediction_batch': batch_prediction_stages,
+    'correlation': correlation_stages,
+}
+
+
+def build_context(n_rows: int, seed: int) -> Dict[str, Any]:
+    """Dữ liệu đầu vào cho mọi model ở quy mô n_rows"""
+    data = make_dataset(n_rows, seed=seed)
+    data['single_series'] = generate_aqi_series(
+        generate_stations(1, seed), n_rows, freq='h', seed=seed, missing_rate=0.02
+    )
+    return data
+
+
+def run_stages(stages: List[Stage], ctx: Dict[str, Any], trace_memory: bool) -> Dict[str, Dict[str, float]]:
+    """Chạy tuần tự các stage, đo thời gian (và peak memory nếu trace_memory)"""
+    measurements = {}
+    for name, stage in stages:
+        gc.collect()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        stage(ctx)
+        elapsed = time.perf_counter() - start
+        entry = {'seconds': elapsed}
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            entry['peak_mb'] = peak / 2**20
+        measurements[name] = entry
+    return measurements
+
+
+def run(
+    sizes: List[int],
+    models: List[str],
+    seed: int = 42,
+    repeat: int = 1,
+    memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Chạy benchmark cho mọi (model, size)
+    
+    Thời gian lấy min của các lần repeat (không bật tracemalloc);
+    peak memory đo ở một lần chạy riêng có tracemalloc vì tracemalloc làm chậm.
+    """
+    results = []
+    for n_rows in sizes:
+        base = build_context(n_rows, seed)
+        for model in models:
+            timings = []
+            for _ in range(repeat):
+                timings.append(run_stages(MODELS[model](), dict(base), trace_memory=False))
+            peaks = run_stages(MODELS[model](), dict(base), trace_memory=True) if memory else {}
+            
+            for stage, _ in MODELS[model]():
+                entry = {
+                    'model': model,
+                    'size': n_rows,
+                    'stage': stage,
+                    'seconds': round(min(t[stage]['seconds'] for t in timings), 6),
+                    'peak_mb': round(peaks[stage]['peak_mb'], 3) if memory else None
+                }
+                results.append(entry)
+                peak = f"{entry['peak_mb']:>10.1f}" if memory else f"{'-':>10}"
+                print(f"{model:>17} {n_rows:>9} {stage:>10} {entry['seconds']:>10.4f} {peak}", flush=True)
+        del base
+    
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'data': 'synthetic, in-memory (no database I/O)',
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit_learn': sklearn.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """So sánh thời gian với baseline; trả về các stage chậm hơn quá tolerance"""
+    previous = {
+        (r['model'], r['size'], r['stage']): r for r in baseline.get('results', [])
+    }
+    regressions = []
+    for r in report['results']:
+        old = previous.get((r['model'], r['size'], r['stage']))
+        if old is None or old['seconds'] <= 0:
+            continue
+        ratio = r['seconds'] / old['seconds']
+        if ratio > 1.0 + tolerance:
+            regressions.append(
+                f"{r['model']}/{r['size']}/{r['stage']}: {old['seconds']:.4f}s -> {r['seconds']:.4f}s (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=list(MODELS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=1, help="Số lần đo thời gian (lấy min)")
+    parser.add_argument('--no-memory', action='store_true', help="Bỏ qua lần chạy đo peak memory")
+    parser.add_argument('--output', default='benchmark-report.json')
+    parser.add_argument('--baseline', help="Report cũ để so sánh")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Ngưỡng chậm hơn baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+    
+    print(f"{'model':>17} {'rows':>9} {'stage':>10} {'seconds':>10} {'peak_mb':>10}")
+    report = run(args.sizes, args.models, seed=args.seed, repeat=args.repeat, memory=not args.no_memory)
+    
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Synthetic Data - Sinh dữ liệu giả lập (có seed) cho benchmarks
+Trường học, trạm đo và chuỗi AQI quanh các đô thị lớn của Việt Nam,
+cùng cột với các loader trong app.utils.data_loader
+"""
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from app.utils.spatial import StationIndex
+
+# Khung tọa độ Việt Nam
+LAT_RANGE = (8.5, 23.4)
+LON_RANGE = (102.1, 109.5)
+
+# (tên, lat, lon, tỉ trọng điểm, AQI nền)
+CITIES = [
+    ("Ha Noi", 21.0285, 105.8542, 0.25, 120.0),
+    ("Ho Chi Minh", 10.8231, 106.6297, 0.30, 95.0),
+    ("Da Nang", 16.0544, 108.2022, 0.08, 60.0),
+    ("Hai Phong", 20.8449, 106.6881, 0.08, 100.0),
+    ("Can Tho", 10.0452, 105.7469, 0.07, 70.0),
+    ("Hue", 16.4637, 107.5909, 0.05, 55.0),
+    ("Nha Trang", 12.2388, 109.1967, 0.05, 50.0),
+    ("Vinh", 18.6796, 105.6813, 0.06, 85.0),
+    ("Buon Ma Thuot", 12.6667, 108.0500, 0.06, 55.0),
+]
+
+# Độ phân tán quanh trung tâm đô thị (độ, ~15 km)
+CITY_SPREAD_DEG = 0.15
+
+Seed = Union[int, np.random.Generator, None]
+
+
+def _rng(seed: Seed) -> np.random.Generator:
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+
+def _city_points(n: int, rng: np.random.Generator):
+    """Điểm quanh các đô thị: (city index, lat, lon)"""
+    weights = np.array([city[3] for city in CITIES])
+    city = rng.choice(len(CITIES), size=n, p=weights / weights.sum())
+    centers = np.array([[c[1], c[2]] for c in CITIES])[city]
+    offsets = rng.normal(0.0, CITY_SPREAD_DEG, size=(n, 2))
+    lat = np.clip(centers[:, 0] + offsets[:, 0], *LAT_RANGE)
+    lon = np.clip(centers[:, 1] + offsets[:, 1], *LON_RANGE)
+    return city, lat, lon
+
+
+def generate_stations(n: int, seed: Seed = 42) -> pd.DataFrame:
+    """
+    Sinh n trạm đo
+    
+    Returns:
+        DataFrame: station_id, station_name, city, latitude, longitude, base_aqi
+    """
+    rng = _rng(seed)
+    city, lat, lon = _city_points(n, rng)
+    base = np.array([c[4] for c in CITIES])[city] * rng.lognormal(0.0, 0.2, n)
+    return pd.DataFrame({
+        'station_id': [f"station_{i:07d}" for i in range(n)],
+        'station_name': [f"{CITIES[c][0]} #{i}" for i, c in enumerate(city)],
+        'city': [CITIES[c][0] for c in city],
+        'latitude': lat,
+        'longitude': lon,
+        'base_aqi': base
+    })
+
+
+def generate_readings(n: int, seed: Seed = 42, stations: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Sinh n bản ghi air_quality (một thời điểm), cùng cột với load_air_quality_frame
+    
+    Args:
+        n: Số bản ghi
+        seed: Seed hoặc Generator
+        stations: Trạm đo (mặc định: mỗi bản ghi một trạm)
+    """
+    rng = _rng(seed)
+    if stations is None:
+        stations = generate_stations(n, rng)
+    idx = rng.integers(0, len(stations), n) if len(stations) != n else np.arange(n)
+    st = stations.iloc[idx]
+    
+    aqi = np.clip(st['base_aqi'].to_numpy() * rng.lognormal(0.0, 0.25, n), 5, 500)
+    pm25 = aqi * rng.uniform(0.3, 0.5, n)
+    return pd.DataFrame({
+        'id': [f"aq_{i:08d}" for i in range(n)],
+        'station_id': st['station_id'].to_numpy(),
+        'latitude': st['latitude'].to_numpy(),
+        'longitude': st['longitude'].to_numpy(),
+        'aqi': aqi,
+        'pm25': pm25,
+        'pm10': pm25 * rng.uniform(1.3, 1.9, n),
+        'co': rng.gamma(2.0, 300.0, n),
+        'no2': aqi * rng.uniform(0.1, 0.3, n),
+        'o3': rng.gamma(3.0, 15.0, n),
+        'so2': rng.gamma(2.0, 5.0, n),
+        'station_name': st['station_name'].to_numpy(),
+        'measured_at': pd.Timestamp('2025-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 86400 * 30, n), unit='s')
+    })
+
+
+def generate_schools(n: int, seed: Seed = 42, stations: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Sinh n trường học, cùng cột với load_schools_frame
+    
+    Green score tương quan nghịch với AQI nền của trạm gần nhất (nếu có stations).
+    """
+    rng = _rng(seed)
+    city, lat, lon = _city_points(n, rng)
+    local_aqi = np.array([c[4] for c in CITIES])[city]
+    if stations is not None and len(stations):
+        nearest, _ = StationIndex(stations['latitude'], stations['longitude']).query(lat, lon)
+        local_aqi = stations['base_aqi'].to_numpy()[nearest]
+    
+    green_score = np.clip(90.0 - 0.3 * local_aqi + rng.normal(0.0, 12.0, n), 0, 100)
+    students = rng.integers(200, 2500, n)
+    return pd.DataFrame({
+        'id': [f"school_{i:07d}" for i in range(n)],
+        'name': [f"School {i}" for i in range(n)],
+        'code': [f"SC{i:07d}" for i in range(n)],
+        'latitude': lat,
+        'longitude': lon,
+        'green_score': green_score,
+        'total_students': students.astype(np.float64),
+        'total_teachers': np.maximum(students // rng.integers(15, 30, n), 5).astype(np.float64),
+        'type': rng.choice(['primary', 'secondary', 'high_school'], n)
+    })
+
+
+def generate_aqi_series(
+    stations: pd.DataFrame,
+    periods: int,
+    freq: str = 'D',
+    start: str = '2025-01-01',
+    seed: Seed = 42,
+    missing_rate: float = 0.0
+) -> pd.DataFrame:
+    """
+    Sinh chuỗi AQI cho mỗi trạm: AQI nền × (chu kỳ ngày + tuần) + nhiễu AR(1)
+    
+    Args:
+        stations: Trạm đo (generate_stations)
+        periods: Số bucket mỗi trạm
+        freq: Tần suất ('h' hoặc 'D')
+        start: Thời điểm bắt đầu
+        seed: Seed hoặc Generator
+        missing_rate: Tỉ lệ bucket bị bỏ (tạo khoảng trống)
+    
+    Returns:
+        DataFrame: station_id, station_name, measured_at, aqi, samples (cùng cột với load_bucketed_history)
+    """
+    rng = _rng(seed)
+    n_stations = len(stations)
+    times = pd.date_range(start, periods=periods, freq=freq, tz='UTC')
+    
+    hours = times.hour.to_numpy() + times.dayofweek.to_numpy() * 24
+    seasonal = (
+        1.0
+        + 0.15 * np.sin(2 * np.pi * (times.hour.to_numpy() - 8) / 24)
+        + 0.10 * np.cos(2 * np.pi * hours / (24 * 7))
+    )
+    
+    # Nhiễu AR(1) theo trục thời gian, tính cho mọi trạm cùng lúc
+    shocks = rng.normal(0.0, 0.08, size=(n_stations, periods))
+    noise = lfilter([1.0], [1.0, -0.8], shocks, axis=1)
+    
+    aqi = stations['base_aqi'].to_numpy()[:, None] * seasonal[None, :] * np.exp(noise)
+    
+    frame = pd.DataFrame({
+        'station_id': np.repeat(stations['station_id'].to_numpy(), periods),
+        'station_name': np.repeat(stations['station_name'].to_numpy(), periods),
+        'measured_at': np.tile(times, n_stations),
+        'aqi': np.clip(aqi, 5, 500).ravel(),
+        'samples': rng.integers(1, 13, n_stations * periods).astype(np.float64)
+    })
+    
+    if missing_rate > 0:
+        frame = frame[rng.random(len(frame)) >= missing_rate].reset_index(drop=True)
+    return frame
+
+
+def make_dataset(n_rows: int, seed: int = 42, series_periods: int = 365) -> Dict[str, pd.DataFrame]:
+    """
+    Bộ dữ liệu cho benchmark ở quy mô n_rows
+    
+    Returns:
+        {'stations', 'readings' (mỗi trạm một bản ghi mới nhất), 'schools' (n_rows),
+         'series' (~n_rows daily bucket)}
+    """
+    rng = np.random.default_rng(seed)
+    stations = generate_stations(max(10, n_rows // 100), rng)
+    
+    # Chuỗi daily: số trạm sao cho tổng số bucket ~ n_rows
+    periods = min(series_periods, max(30, n_rows // 10))
+    series_stations = generate_stations(max(1, n_rows // periods), rng)
+    
+    return {
+        'stations': stations,
+        'readings': generate_readings(len(stations), rng, stations),
+        'schools': generate_schools(n_rows, rng, stations),
+        'series': generate_aqi_series(series_stations, periods, seed=rng, missing_rate=0.05)
+    }
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for incremental environment clustering."""
+import numpy as np
+
+from app.models.clustering import EnvironmentClustering
+
+
+def _points(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([40.0, 100.0, 170.0])
+    aqi = centers[rng.integers(0, 3, n)] + rng.normal(0, 5, n)
+    return [
+        {'id': i, 'aqi': float(aqi[i]), 'green_score': float(rng.uniform(40, 90)),
+         'latitude': 16.0 + rng.normal(0, 0.05), 'longitude': 108.2 + rng.normal(0, 0.05)}
+        for i in range(n)
+    ]
+
+
+def test_changed_points_replace_their_old_rows():
+    data = _points()
+    clustering = EnvironmentClustering(n_clusters=3, drift_threshold=10.0)
+    clustering.fit_predict(data)
+    
+    updated = [dict(item) for item in data]
+    for item in updated[:50]:
+        item['aqi'] += 3.0
+    updated.append({'id': 500, 'aqi': 45.0, 'green_score': 60.0, 'latitude': 16.0, 'longitude': 108.2})
+    clustering.fit_predict_incremental(updated)
+    
+    assert clustering.last_update_mode == "incremental"
+    assert clustering.counts_.sum() == 501
+    
+    clustering.fit_predict_incremental(updated)
+    assert clustering.last_update_mode == "cached"
+    assert clustering.counts_.sum() == 501
+
+
+def test_incremental_state_follows_the_current_points():
+    data = _points()
+    clustering = EnvironmentClustering(n_clusters=3, drift_threshold=10.0)
+    clustering.fit_predict(data)
+    before = clustering.centroids_.copy()
+    
+    shifted = [dict(item, aqi=item['aqi'] + 10.0) for item in data]
+    for _ in range(3):
+        for item in shifted:
+            item['green_score'] += 0.1
+        clustering.fit_predict_incremental(shifted)
+    
+    X = clustering._extract_features(shifted)
+    assert clustering.counts_.sum() == len(shifted)
+    np.testing.assert_allclose(clustering.scaler.mean_, X.mean(axis=0))
+    np.testing.assert_allclose(clustering.centroids_[:, 0] - before[:, 0], 10.0, atol=2.0)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the clustering data preparation."""
+import numpy as np
+import pandas as pd
+
+from app.consumers.clustering_consumer import merge_schools_with_aqi
+
+
+def _frames():
+    schools = pd.DataFrame({
+        'id': ['a', 'b', 'c', 'd'],
+        'name': ['A', 'B', 'C', 'D'],
+        'latitude': [16.00, 16.01, np.nan, 16.02],
+        'longitude': [108.0, 108.0, 108.0, 108.0],
+        'green_score': [70.0, np.nan, 50.0, 0.0],
+    })
+    stations = pd.DataFrame({
+        'latitude': [16.00, 16.30],
+        'longitude': [108.0, 108.0],
+        'aqi': [np.nan, 80.0],
+        'pm25': [12.0, np.nan],
+    })
+    return schools, stations
+
+
+def test_missing_values_are_not_clustered_as_zeros():
+    schools, stations = _frames()
+    
+    merged = merge_schools_with_aqi(schools, stations)
+    
+    # b: no green_score, c: no coordinates; the station without AQI is never matched
+    assert [row['id'] for row in merged] == ['a', 'd']
+    assert [row['aqi'] for row in merged] == [80.0, 80.0]
+    assert merged[1]['green_score'] == 0.0
+    assert not any(np.isnan(row[key]) for row in merged for key in ('aqi', 'green_score', 'latitude'))
+
+
+def test_frames_and_records_give_the_same_merge():
+    schools, stations = _frames()
+    records = merge_schools_with_aqi(
+        schools.astype(object).where(schools.notna(), None).to_dict('records'),
+        stations.astype(object).where(stations.notna(), None).to_dict('records')
+    )
+    
+    assert records == merge_schools_with_aqi(schools, stations)
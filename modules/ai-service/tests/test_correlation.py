@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the correlation matrix."""
+import numpy as np
+import pytest
+from scipy import stats
+
+from app.models.correlation import CorrelationAnalysis, pairwise_spearman
+
+
+def _dataset(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = 16.0 + np.arange(n) * 0.01
+    lon = np.full(n, 108.0)
+    aqi = rng.uniform(20, 200, n)
+    pm25 = aqi / 3 + rng.normal(0, 0.5, n)
+    pm25[::2] = np.nan
+    environment = [
+        {'latitude': lat[i], 'longitude': lon[i], 'aqi': aqi[i], 'pm25': pm25[i]}
+        for i in range(n)
+    ]
+    education = [
+        {'id': i, 'name': f'School {i}', 'latitude': lat[i], 'longitude': lon[i],
+         'green_score': rng.uniform(0, 100), 'total_students': int(rng.integers(100, 2000))}
+        for i in range(n)
+    ]
+    return environment, education
+
+
+def _pair(result, x, y):
+    return next(p for p in result['pairs'] if {p['x'], p['y']} == {x, y})
+
+
+def test_matrix_uses_pairwise_deletion_for_missing_values():
+    environment, education = _dataset()
+    result = CorrelationAnalysis().analyze_matrix(
+        environment, education, n_bootstrap=50, random_state=0
+    )
+    
+    pair = _pair(result, 'aqi', 'pm25')
+    assert pair['n'] == 100
+    assert pair['pearson']['correlation'] > 0.99
+    assert pair['spearman']['correlation'] > 0.99
+    assert pair['pearson']['significant']
+    assert pair['spearman']['ci'][0] > 0.95
+
+
+def test_spearman_reranks_each_pair_after_dropping_missing_rows():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(60, 3))
+    X[rng.random(60) < 0.3, 1] = np.nan
+    X[rng.random(60) < 0.3, 2] = np.nan
+    
+    r, n = pairwise_spearman(X)
+    
+    for i, j in [(0, 1), (0, 2), (1, 2)]:
+        complete = ~np.isnan(X[:, i]) & ~np.isnan(X[:, j])
+        expected = stats.spearmanr(X[complete, i], X[complete, j])[0]
+        assert r[i, j] == pytest.approx(expected)
+        assert n[i, j] == complete.sum()
+
+
+def test_legacy_analysis_treats_missing_values_as_zero():
+    environment, education = _dataset(n=20)
+    result = CorrelationAnalysis().analyze(environment, education)
+    
+    assert result['n_samples'] == 20
+    assert result['correlations']['pm25_vs_green_score']['correlation'] is not None
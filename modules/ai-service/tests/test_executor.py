@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the task executor queue limits."""
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executor import TaskExecutor, TaskTimeoutError
+
+
+@pytest.mark.asyncio
+async def test_timed_out_task_keeps_its_queue_slot():
+    executor = TaskExecutor(process_workers=1, thread_workers=2, default_timeout=5)
+    executor.register_queue("clustering", max_in_flight=1)
+    finish_first = threading.Event()
+    second_started = threading.Event()
+    
+    try:
+        with pytest.raises(TaskTimeoutError):
+            await executor.run_light("clustering", finish_first.wait, 5, timeout=0.05)
+        
+        second = asyncio.create_task(executor.run_light("clustering", second_started.set))
+        await asyncio.sleep(0.2)
+        # Task quá hạn vẫn đang chạy nên task sau phải chờ
+        assert not second_started.is_set()
+        assert executor.stats()["in_flight"]["clustering"] == 1
+        
+        finish_first.set()
+        await asyncio.wait_for(second, timeout=2)
+        assert second_started.is_set()
+        assert executor.stats()["in_flight"]["clustering"] == 0
+    finally:
+        finish_first.set()
+        executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_queued_task_cancelled_on_timeout_frees_slot():
+    executor = TaskExecutor(process_workers=1, thread_workers=1, default_timeout=5)
+    executor.register_queue("prediction", max_in_flight=2)
+    release_worker = threading.Event()
+    
+    try:
+        blocker = asyncio.create_task(executor.run_light("prediction", release_worker.wait, 5))
+        await asyncio.sleep(0.05)
+        # Pool chỉ có 1 thread nên task này chưa bắt đầu và bị hủy ngay
+        with pytest.raises(TaskTimeoutError):
+            await executor.run_light("prediction", lambda: None, timeout=0.05)
+        await asyncio.sleep(0)
+        assert executor.stats()["in_flight"]["prediction"] == 1
+        
+        release_worker.set()
+        await blocker
+        assert executor.stats()["in_flight"]["prediction"] == 0
+    finally:
+        release_worker.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for single-station and batched AQI forecasts."""
+import numpy as np
+import pandas as pd
+
+from app.models.prediction import AQIPrediction, BatchAQIPrediction
+
+
+def _station_series(station_id, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2025-03-01', periods=days * 3, freq='8h') + pd.Timedelta(hours=6)
+    trend = np.linspace(60, 90, len(times))
+    aqi = trend + 10 * np.sin(np.arange(len(times)) / 3) + rng.normal(0, 4, len(times))
+    return [
+        {'station_id': station_id, 'measured_at': t.isoformat(), 'aqi': float(a)}
+        for t, a in zip(times, aqi)
+    ]
+
+
+def test_batch_forecast_matches_single_station_forecast():
+    series = {
+        'DN-01': _station_series('DN-01', seed=1),
+        'DN-02': _station_series('DN-02', days=20, seed=2)[5:],
+    }
+    
+    batch = BatchAQIPrediction(forecast_days=7).fit_batch(series['DN-01'] + series['DN-02'])
+    forecasts = batch.predict_future_batch()
+    
+    for station_id, rows in series.items():
+        single = AQIPrediction(forecast_days=7).fit(rows).predict_future()
+        
+        assert [p['date'] for p in forecasts[station_id]] == [p['date'] for p in single]
+        np.testing.assert_allclose(
+            [p['predicted_aqi'] for p in forecasts[station_id]],
+            [p['predicted_aqi'] for p in single],
+            atol=0.05
+        )
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the AI task result store."""
+import json
+
+import numpy as np
+import pytest
+
+from app.utils.task_store import STATUS_COMPLETED, finish_task
+
+
+class _Session:
+    """AsyncSession giả, chỉ ghi lại tham số của câu lệnh"""
+    
+    def __init__(self):
+        self.params = []
+    
+    async def execute(self, statement, params=None):
+        self.params.append(params)
+    
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_non_finite_values_are_stored_as_null():
+    db = _Session()
+    result = {
+        "correlation": float("nan"),
+        "p_value": np.float64("inf"),
+        "scores": [1.5, float("-inf"), np.float32("nan")],
+        "matrix": np.array([[1.0, np.nan], [np.nan, 1.0]]),
+        "count": np.int64(3),
+    }
+    
+    await finish_task(db, "task-1", STATUS_COMPLETED, duration_ms=5, result=result)
+    
+    stored = json.loads(db.params[0]["result"], parse_constant=lambda c: pytest.fail(f"{c} in JSON"))
+    assert stored == {
+        "correlation": None,
+        "p_value": None,
+        "scores": [1.5, None, None],
+        "matrix": [[1.0, None], [None, 1.0]],
+        "count": 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_finite_result_is_unchanged():
+    db = _Session()
+    result = {"clusters": [{"id": 0, "aqi": 42.5, "ok": np.bool_(True)}]}
+    
+    await finish_task(db, "task-2", STATUS_COMPLETED, duration_ms=5, result=result)
+    
+    stored = json.loads(db.params[0]["result"])
+    assert stored == {"clusters": [{"id": 0, "aqi": 42.5, "ok": True}]}
@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Response cache for API Gateway
+Per-route TTL, bounded LRU (byte-size accounting), stale-while-revalidate,
+precompressed gzip/brotli variants
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .compression import (
+    compress,
+    is_compressible,
+    negotiate_encoding,
+    strip_variant,
+    supported_encodings,
+    variant_etag,
+)
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Response headers that must not be replayed from the cache
+UNCACHED_HEADERS = {b"set-cookie", b"age", b"x-cache", b"date"}
+# Headers kept on a 304 Not Modified
+NOT_MODIFIED_HEADERS = {b"etag", b"cache-control", b"content-location", b"expires", b"vary", b"last-modified", b"age", b"x-cache"}
+ENTRY_OVERHEAD_BYTES = 256
+
+
+@dataclass
+class CacheEntry:
+    """Cached upstream response (identity body + precompressed variants by encoding)"""
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    stored_at: float
+    ttl: float
+    stale_ttl: float
+    variants: Dict[str, bytes] = field(default_factory=dict)
+    size: int = field(init=False)
+    
+    def __post_init__(self):
+        self.size = (
+            len(self.body)
+            + sum(len(variant) for variant in self.variants.values())
+            + sum(len(k) + len(v) for k, v in self.headers)
+            + ENTRY_OVERHEAD_BYTES
+        )
+    
+    def age(self, now: float) -> float:
+        return now - self.stored_at
+    
+    def state(self, now: float) -> Optional[str]:
+        """fresh, stale (servable while revalidating) or None (expired)"""
+        age = self.age(now)
+        if age <= self.ttl:
+            return "fresh"
+        if age <= self.ttl + self.stale_ttl:
+            return "stale"
+        return None
+
+
+class ResponseCache:
+    """LRU of CacheEntry bounded by total bytes and entry count"""
+    
+    def __init__(self, max_bytes: int, max_entries: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "not_modified": 0,
+            "compressed_hits": 0,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def lookup(self, key: str, now: Optional[float] = None) -> Tuple[Optional[CacheEntry], Optional[str]]:
+        """
+        Find an entry and its freshness
+        
+        Returns:
+            (entry, "fresh" | "stale") or (None, None) on miss
+        """
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, None
+        
+        state = entry.state(now)
+        if state is None:
+            self._remove(key)
+            self.stats["misses"] += 1
+            return None, None
+        
+        self._entries.move_to_end(key)
+        self.stats["hits" if state == "fresh" else "stale_hits"] += 1
+        return entry, state
+    
+    def store(self, key: str, entry: CacheEntry) -> bool:
+        """Insert/replace an entry, evicting least recently used ones to fit"""
+        if entry.size > self.max_entry_bytes:
+            return False
+        
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self.stats["stores"] += 1
+        
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+        return True
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+    
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage"""
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round((self.stats["hits"] + self.stats["stale_hits"]) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def route_ttl(path: str) -> Optional[float]:
+    """TTL of the longest configured path prefix matching the request path"""
+    best = None
+    for prefix, ttl in settings.CACHE_ROUTE_TTLS.items():
+        if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+            if best is None or len(prefix) > len(best[0]):
+                best = (prefix, ttl)
+    return best[1] if best else None
+
+
+def _normalize_value(key: str, value: str) -> str:
+    """Canonical form of a numeric param (16.0 == 16.00); other values are kept as sent"""
+    if key not in settings.CACHE_NUMERIC_PARAMS:
+        return value
+    try:
+        return repr(float(value))
+    except ValueError:
+        return value
+
+
+def cache_key(scope: Scope) -> str:
+    """
+    Cache key: path + normalized query string
+    
+    Params are sorted and empty/ignored params dropped. Names and string values are
+    kept exactly as sent, since upstreams match them case-sensitively; only the
+    numeric params in CACHE_NUMERIC_PARAMS are canonicalized, so
+    ?lon=108.20&lat=16.0 and ?lat=16&lon=108.2 share one entry.
+    """
+    query = scope.get("query_string", b"").decode("latin-1")
+    params = sorted(
+        (key, _normalize_value(key, value))
+        for key, value in parse_qsl(query, keep_blank_values=False)
+        if key not in settings.CACHE_IGNORED_PARAMS and key != settings.CACHE_BYPASS_PARAM
+    )
+    return f"{scope['path'].rstrip('/') or '/'}?{urlencode(params)}"
+
+
+def _request_directives(scope: Scope, headers: Headers) -> Set[str]:
+    """Cache-Control directives of the request (?nocache=1 counts as no-cache)"""
+    value = headers.get("cache-control", "")
+    directives = {part.strip().lower() for part in value.split(",") if part.strip()}
+    query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    if query.get(settings.CACHE_BYPASS_PARAM, "").lower() in ("1", "true", "yes"):
+        directives.add("no-cache")
+    return directives
+
+
+def _response_cacheable(status: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+    if status != 200:
+        return False
+    for name, value in headers:
+        if name.lower() == b"set-cookie":
+            return False
+        if name.lower() == b"cache-control" and any(
+            directive in value.lower() for directive in (b"no-store", b"private")
+        ):
+            return False
+    return True
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison; encoded variants match their identity ETag)"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = strip_variant(etag)
+    return any(strip_variant(candidate) == opaque for candidate in if_none_match.split(","))
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _upstream_scope(scope: Scope) -> Scope:
+    """
+    Copy of the scope the route sees: no If-None-Match and no Accept-Encoding,
+    so it returns a storable, identity-encoded 200 (variants are made by the cache)
+    """
+    return {
+        **scope,
+        "headers": [
+            (k, v) for k, v in scope.get("headers", [])
+            if k.lower() not in (b"if-none-match", b"accept-encoding")
+        ],
+    }
+
+
+def _replace_header(headers: List[Tuple[bytes, bytes]], name: bytes, value: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(k, v) for k, v in headers if k.lower() != name] + [(name, value)]
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from the body hash (used when the upstream sent none)"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _not_modified_start(headers: List[Tuple[bytes, bytes]]) -> Message:
+    return {
+        "type": "http.response.start",
+        "status": 304,
+        "headers": [(k, v) for k, v in headers if k.lower() in NOT_MODIFIED_HEADERS],
+    }
+
+
+async def _empty_receive() -> Message:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware caching GET responses of the routes in CACHE_ROUTE_TTLS
+    
+    - fresh entry: served directly (X-Cache: HIT)
+    - stale entry (within CACHE_STALE_SECONDS after TTL): served (X-Cache: STALE)
+      while one background request refreshes it
+    - miss: forwarded and streamed to the client while being recorded (X-Cache: MISS)
+    
+    Every stored entry has an ETag (the upstream one, or a body hash); a request whose
+    If-None-Match matches gets 304 Not Modified without a body, on hits and misses.
+    
+    Compressible entries of at least COMPRESSION_MIN_BYTES are compressed once per
+    supported encoding at store time; hits are served the variant negotiated from
+    Accept-Encoding (Content-Encoding, Vary and a per-variant ETag set accordingly).
+    
+    Requests with Authorization are never cached. Clients can bypass the cache with
+    `Cache-Control: no-cache` or `?nocache=1` (fetch fresh, then store) or
+    `Cache-Control: no-store` (fetch, don't store).
+    """
+    
+    def __init__(self, app: ASGIApp, cache: "ResponseCache"):
+        self.app = app
+        self.cache = cache
+        self._refreshing: Dict[str, asyncio.Task] = {}
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not settings.CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        ttl = route_ttl(scope["path"])
+        headers = Headers(scope=scope)
+        if ttl is None or "authorization" in headers:
+            await self.app(scope, receive, send)
+            return
+        
+        key = cache_key(scope)
+        directives = _request_directives(scope, headers)
+        if_none_match = headers.get("if-none-match")
+        if "no-cache" in directives or "no-store" in directives:
+            self.cache.stats["bypasses"] += 1
+            await self._forward(
+                scope, receive, send, key, ttl, "BYPASS",
+                store="no-store" not in directives, if_none_match=if_none_match
+            )
+            return
+        
+        entry, state = self.cache.lookup(key)
+        if entry is None:
+            await self._forward(scope, receive, send, key, ttl, "MISS", store=True, if_none_match=if_none_match)
+            return
+        
+        if state == "stale" and key not in self._refreshing:
+            self._refreshing[key] = asyncio.create_task(self._refresh(_upstream_scope(scope), key, ttl))
+        
+        await self._send_entry(
+            send, entry, "HIT" if state == "fresh" else "STALE",
+            if_none_match, headers.get("accept-encoding", "")
+        )
+    
+    async def _send_entry(
+        self,
+        send: Send,
+        entry: CacheEntry,
+        status: str,
+        if_none_match: Optional[str] = None,
+        accept_encoding: str = ""
+    ):
+        headers = list(entry.headers)
+        body = entry.body
+        etag = _header(headers, b"etag")
+        
+        if entry.variants:
+            vary = _header(headers, b"vary")
+            if not vary:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif "accept-encoding" not in vary.lower():
+                headers = _replace_header(headers, b"vary", f"{vary}, Accept-Encoding".encode())
+            encoding = negotiate_encoding(accept_encoding, entry.variants)
+            if encoding is not None:
+                body = entry.variants[encoding]
+                self.cache.stats["compressed_hits"] += 1
+                headers = _replace_header(headers, b"content-encoding", encoding.encode())
+                headers = _replace_header(headers, b"content-length", str(len(body)).encode())
+                if etag:
+                    etag = variant_etag(etag, encoding)
+                    headers = _replace_header(headers, b"etag", etag.encode())
+        
+        headers.append((b"age", str(int(entry.age(time.monotonic()))).encode()))
+        headers.append((b"x-cache", status.encode()))
+        
+        if if_none_match and etag and etag_matches(if_none_match, etag):
+            self.cache.stats["not_modified"] += 1
+            await send(_not_modified_start(headers))
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+    
+    def _entry_from(self, start: Message, chunks: List[bytes], ttl: float) -> Optional[CacheEntry]:
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in UNCACHED_HEADERS]
+        if not _response_cacheable(start["status"], headers):
+            return None
+        body = b"".join(chunks)
+        if _header(headers, b"etag") is None:
+            headers.append((b"etag", body_etag(body).encode()))
+        
+        variants = {}
+        if (
+            settings.COMPRESSION_ENABLED
+            and len(body) >= settings.COMPRESSION_MIN_BYTES
+            and _header(headers, b"content-encoding") is None
+            and is_compressible(_header(headers, b"content-type"))
+        ):
+            for encoding in supported_encodings():
+                variants[encoding] = compress(body, encoding)
+        
+        return CacheEntry(
+            status=start["status"],
+            headers=headers,
+            body=body,
+            variants=variants,
+            stored_at=time.monotonic(),
+            ttl=ttl,
+            stale_ttl=settings.CACHE_STALE_SECONDS,
+        )
+    
+    async def _forward(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        key: str,
+        ttl: float,
+        status: str,
+        store: bool,
+        if_none_match: Optional[str] = None
+    ):
+        """
+        Call the route, stream the response to the client and record it
+        
+        The route always sees an unconditional request. If the upstream ETag matches
+        the client's If-None-Match, the client gets a 304 while the body is still recorded.
+        A 200 without an ETag is held until the body is complete (up to
+        max_entry_bytes), so the client gets the same body-hash ETag as the stored
+        entry and can poll conditionally right away.
+        """
+        start: Dict[str, Any] = {}
+        held: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        size = 0
+        mode = "pass"  # pass | hold (until the ETag is known) | drop (body of a 304)
+        
+        async def send_start(headers: List[Tuple[bytes, bytes]]):
+            nonlocal mode
+            etag = _header(headers, b"etag")
+            if start["status"] == 200 and if_none_match and etag and etag_matches(if_none_match, etag):
+                mode = "drop"
+                self.cache.stats["not_modified"] += 1
+                await send(_not_modified_start(headers))
+            else:
+                await send({**start, "headers": headers})
+        
+        async def send_wrapper(message: Message):
+            nonlocal store, size, mode
+            if message["type"] == "http.response.start":
+                start.update(message)
+                headers = list(message.get("headers", [])) + [(b"x-cache", status.encode())]
+                if message["status"] == 200 and _header(headers, b"etag") is None:
+                    held.extend(headers)
+                    mode = "hold"
+                    return
+                await send_start(headers)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if store or mode == "hold":
+                size += len(body)
+                if size > self.cache.max_entry_bytes:
+                    store = False
+                    if mode == "hold":
+                        # Too large to tag or store: stream it untagged
+                        mode = "pass"
+                        await send({**start, "headers": held})
+                        await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+            
+            if mode == "hold":
+                if more_body:
+                    return
+                body = b"".join(chunks)
+                if store:
+                    entry = self._entry_from(start, chunks, ttl)
+                    if entry is not None:
+                        self.cache.store(key, entry)
+                await send_start(held + [(b"etag", body_etag(body).encode())])
+                message = {"type": "http.response.body", "body": body, "more_body": False}
+            elif store and not more_body:
+                entry = self._entry_from(start, chunks, ttl)
+                if entry is not None:
+                    self.cache.store(key, entry)
+            
+            if mode == "drop":
+                if more_body:
+                    return
+                message = {"type": "http.response.body", "body": b"", "more_body": False}
+            await send(message)
+        
+        await self.app(_upstream_scope(scope), receive, send_wrapper)
+    
+    async def _refresh(self, scope: Scope, key: str, ttl: float):
+        """Re-run the request in the background and replace the stale entry"""
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        
+        async def capture(message: Message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+        
+        try:
+            await self.app(scope, _empty_receive, capture)
+            entry = self._entry_from(start, chunks, ttl) if start else None
+            if entry is not None:
+                self.cache.store(key, entry)
+                self.cache.stats["refreshes"] += 1
+            else:
+                self.cache.stats["refresh_errors"] += 1
+        except Exception as e:
+            self.cache.stats["refresh_errors"] += 1
+            logger.warning(f"Background cache refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+
+# Global response cache
+response_cache = ResponseCache(
+    max_bytes=settings.CACHE_MAX_BYTES,
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    max_entry_bytes=settings.CACHE_MAX_ENTRY_BYTES,
+)
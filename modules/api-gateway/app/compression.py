@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Response compression for API Gateway
+gzip/brotli negotiation (Accept-Encoding) with a size threshold
+"""
+import gzip
+import logging
+import zlib
+from typing import Iterable, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+def supported_encodings() -> List[str]:
+    """Encodings the gateway can produce, in server preference order"""
+    return (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str, available: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Pick the response encoding for an Accept-Encoding header
+    
+    Highest q-value wins, ties broken by server preference (br before gzip).
+    Returns None for identity.
+    """
+    available = list(available) if available is not None else supported_encodings()
+    if not accept_encoding or not available:
+        return None
+    
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        if coding not in available:
+            continue
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """JSON/GeoJSON/text-like content types worth compressing"""
+    if not content_type:
+        return False
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "text/event-stream":
+        return False
+    return media_type.startswith("text/") or media_type in settings.COMPRESSION_MEDIA_TYPES
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag of an encoded variant ("abc" -> "abc-gzip"), strong ETags must differ per encoding"""
+    etag = etag.strip()
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def strip_variant(etag: str) -> str:
+    """Opaque tag without W/ prefix and encoding suffix (for If-None-Match)"""
+    etag = etag.strip().removeprefix("W/")
+    for encoding in ("br", "gzip"):
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+            self._process = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = self._compressor.compress
+            self._finish = self._compressor.flush
+    
+    def process(self, data: bytes) -> bytes:
+        return self._process(data)
+    
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses on the fly when the client accepts gzip/br
+    
+    Only compressible content types of at least COMPRESSION_MIN_BYTES are encoded.
+    Responses that already have a Content-Encoding (cached precompressed variants,
+    upstream-encoded streams) are passed through untouched.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start: Optional[Message] = None
+        pending: List[bytes] = []
+        pending_size = 0
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+        
+        async def begin_compressed():
+            nonlocal compressor
+            compressor = _StreamCompressor(encoding)
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["content-encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            if "etag" in headers:
+                headers["etag"] = variant_etag(headers["etag"], encoding)
+            await send({**start, "headers": headers.raw})
+        
+        async def send_wrapper(message: Message):
+            nonlocal start, pending_size, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type"))
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            
+            if compressor is None:
+                pending.append(body)
+                pending_size += len(body)
+                if pending_size < settings.COMPRESSION_MIN_BYTES:
+                    if more_body:
+                        return
+                    # Too small to be worth it
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(pending), "more_body": False})
+                    return
+                await begin_compressed()
+                body = b"".join(pending)
+                pending.clear()
+            
+            data = compressor.process(body)
+            if not more_body:
+                data += compressor.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+        
+        await self.app(scope, receive, send_wrapper)
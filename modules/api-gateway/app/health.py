@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Background health prober
+Probes backend services concurrently on an interval; /health answers from the snapshot
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+
+from .config import settings
+from .upstream import upstream
+
+logger = logging.getLogger(__name__)
+
+
+# Services probed by the gateway (name -> health path on that service)
+PROBED_SERVICES = {
+    "environment": "/health",
+    "auth": "/health",
+    "education": "/health",
+    "resource": "/health",
+}
+
+
+class HealthProber:
+    """
+    Periodic concurrent health checks with latency/status history
+    
+    Status strings match the old inline check: "healthy", "unhealthy" (non-200)
+    or "unreachable: <error>".
+    """
+    
+    def __init__(self, interval: float = 15.0, timeout: float = 3.0, history_size: int = 20):
+        self.interval = interval
+        self.timeout = timeout
+        self.history: Dict[str, Deque[Dict[str, Any]]] = {
+            service: deque(maxlen=history_size) for service in PROBED_SERVICES
+        }
+        self.last_probe_at: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _probe(self, service: str, path: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            response = await upstream.get(service).get(path, timeout=self.timeout)
+            status = "healthy" if response.status_code == 200 else "unhealthy"
+        except Exception as e:
+            status = f"unreachable: {str(e)}"
+            logger.warning(f"Service {service} unreachable: {e}")
+        
+        return {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+        }
+    
+    async def probe_all(self) -> Dict[str, Dict[str, Any]]:
+        """Probe all services concurrently and record the results"""
+        results = await asyncio.gather(*(
+            self._probe(service, path) for service, path in PROBED_SERVICES.items()
+        ))
+        probes = dict(zip(PROBED_SERVICES, results))
+        for service, result in probes.items():
+            self.history[service].append(result)
+        self.last_probe_at = datetime.now(timezone.utc).isoformat()
+        return probes
+    
+    async def _loop(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {e}")
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """Start the background probe loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Health prober started (every {self.interval}s)")
+    
+    async def stop(self):
+        """Stop the background probe loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Latest probe per service plus history summary"""
+        services = {}
+        for service, history in self.history.items():
+            if not history:
+                services[service] = {"status": "unknown", "latency_ms": None, "checked_at": None}
+                continue
+            latencies = [entry["latency_ms"] for entry in history]
+            healthy = sum(1 for entry in history if entry["status"] == "healthy")
+            services[service] = {
+                **history[-1],
+                "availability": round(healthy / len(history), 3),
+                "avg_latency_ms": round(sum(latencies) / len(latencies), 1),
+                "history": [entry["status"] for entry in history],
+            }
+        return services
+
+
+# Global health prober
+health_prober = HealthProber(
+    interval=settings.HEALTH_PROBE_INTERVAL,
+    timeout=settings.HEALTH_PROBE_TIMEOUT,
+    history_size=settings.HEALTH_HISTORY_SIZE,
+)
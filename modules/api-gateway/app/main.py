@@ -21,19 +21,26 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 API Gateway - Main Application
 """
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from typing import Optional
 import logging
 
 from .config import settings
+from .upstream import upstream
+from .cache import ResponseCacheMiddleware, response_cache
+from .compression import CompressionMiddleware
+from .ratelimit import RateLimitMiddleware, rate_limiter
+from .security import user_status
+from .health import health_prober
 from .routes.public import router as public_router
 from .routes.resources import router as resources_router, router_v1 as resources_v1_router
 from .routes.education import router as education_router, opendata_router as education_opendata_router
 from .routes.auth import router as auth_router
 from .routes.environment import router as environment_router
 from .routes.user_data import router as user_data_router
+from .routes.map import router as map_router
 
 # Configure logging
 logging.basicConfig(
@@ -53,11 +60,22 @@ async def lifespan(app: FastAPI):
     logger.info(f"Auth Service: {settings.AUTH_SERVICE_URL}")
     logger.info(f"Education Service: {settings.EDUCATION_SERVICE_URL}")
     
+    # Pooled upstream HTTP clients (keep-alive per service)
+    await upstream.start()
+    
+    # Rate limit backend (memory or Redis)
+    rate_limiter.start()
+    
+    # Background health probes (first round runs immediately)
+    health_prober.start()
+    
     # Connect to RabbitMQ
     from .messaging import task_publisher
     rabbitmq_connected = await task_publisher.connect()
     if rabbitmq_connected:
         logger.info("RabbitMQ task publisher ready")
+        # Evict cached user status on user.updated / user.deleted
+        await task_publisher.subscribe("auth.events", user_status.handle_event)
     else:
         logger.warning("RabbitMQ not available - async tasks will not work")
     
@@ -65,7 +83,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down API Gateway")
+    await health_prober.stop()
+    await rate_limiter.close()
     await task_publisher.close()
+    await upstream.close()
 
 
 # Create FastAPI app
@@ -79,6 +100,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Response cache (inside CORS so cached responses still get CORS headers)
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
+# gzip/br negotiation for responses not served precompressed from the cache
+app.add_middleware(CompressionMiddleware)
+
+# Per API key / per IP token buckets (cache hits count too)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -97,6 +127,7 @@ app.include_router(education_opendata_router)
 app.include_router(auth_router)
 app.include_router(environment_router)
 app.include_router(user_data_router)
+app.include_router(map_router)
 
 
 @app.get("/")
@@ -121,34 +152,20 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(
+    deep: bool = Query(False, description="Run a live concurrent probe instead of using the cached snapshot")
+):
     """
     Health check endpoint - aggregates health from all services
+    
+    Answers from the background prober's last round; `?deep=true` probes all services now.
     """
-    import httpx
     from .messaging import task_publisher
     
-    services_health = {}
-    
-    # Check each service
-    services = {
-        "environment": f"{settings.ENVIRONMENT_SERVICE_URL}/health",
-        "auth": f"{settings.AUTH_SERVICE_URL}/health",
-        "education": f"{settings.EDUCATION_SERVICE_URL}/health",
-        "resource": f"{settings.RESOURCE_SERVICE_URL}/health",
-    }
-    
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        for service_name, url in services.items():
-            try:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    services_health[service_name] = "healthy"
-                else:
-                    services_health[service_name] = "unhealthy"
-            except Exception as e:
-                services_health[service_name] = f"unreachable: {str(e)}"
-                logger.warning(f"Service {service_name} unreachable: {e}")
+    if deep:
+        await health_prober.probe_all()
+    probes = health_prober.snapshot()
+    services_health = {service: probe["status"] for service, probe in probes.items()}
     
     all_healthy = all(status == "healthy" for status in services_health.values())
     
@@ -156,6 +173,13 @@ async def health_check():
         "status": "healthy" if all_healthy else "degraded",
         "gateway": "healthy",
         "services": services_health,
+        "probes": probes,
+        "last_probe_at": health_prober.last_probe_at,
+        "cache": response_cache.metrics(),
+        "single_flight": upstream.single_flight.metrics(),
+        "upstreams": upstream.metrics(),
+        "rate_limit": rate_limiter.metrics(),
+        "user_status": user_status.metrics(),
         "messaging": {
             "rabbitmq": "connected" if task_publisher.is_connected else "disconnected"
         }
@@ -170,15 +194,32 @@ async def health_check():
 async def queue_clustering_task(
     data_type: str = "environment",
     n_clusters: int = 3,
-    method: str = "kmeans"
+    method: str = "kmeans",
+    eps_km: Optional[float] = None,
+    min_samples: Optional[int] = None,
+    min_cluster_size: Optional[int] = None,
+    min_aqi: Optional[float] = None
 ):
-    """Queue AI clustering task"""
+    """Queue AI clustering task (method: kmeans, dbscan or hdbscan)"""
     from .messaging import task_publisher
     
+    # Density (hot-spot) options; omitted ones fall back to ai-service settings
+    options = {
+        key: value
+        for key, value in {
+            "eps_km": eps_km,
+            "min_samples": min_samples,
+            "min_cluster_size": min_cluster_size,
+            "min_aqi": min_aqi,
+        }.items()
+        if value is not None
+    }
+    
     task_id = await task_publisher.queue_clustering_task(
         data_type=data_type,
         n_clusters=n_clusters,
-        method=method
+        method=method,
+        **options
     )
     
     if task_id:
@@ -206,15 +247,25 @@ async def queue_prediction_task(
 
 @app.post("/api/v1/tasks/ai/correlation")
 async def queue_correlation_task(
-    analysis_type: str = "pearson"
+    analysis_type: str = "pearson",
+    p_adjust: Optional[str] = None,
+    n_bootstrap: Optional[int] = None
 ):
-    """Queue AI correlation analysis task"""
+    """Queue AI correlation analysis task (analysis_type: pearson, spearman or matrix)"""
     from .messaging import task_publisher
     
+    # Matrix mode options; omitted ones fall back to ai-service settings
+    options = {
+        key: value
+        for key, value in {"p_adjust": p_adjust, "n_bootstrap": n_bootstrap}.items()
+        if value is not None
+    }
+    
     task_id = await task_publisher.queue_correlation_task(
         environment_ids=[],
         education_ids=[],
-        analysis_type=analysis_type
+        analysis_type=analysis_type,
+        **options
     )
     
     if task_id:
@@ -222,6 +273,23 @@ async def queue_correlation_task(
     return {"status": "failed", "error": "RabbitMQ not available"}
 
 
+@app.get("/api/v1/tasks/{task_id}")
+async def get_task_status(task_id: str):
+    """Get status and result of an async AI task (Proxy to ai-service)"""
+    from fastapi import HTTPException, Response
+    
+    try:
+        response = await upstream.get_shared("ai", f"{settings.AI_SERVICE_URL}/api/v1/tasks/{task_id}")
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
+    except Exception as e:
+        logger.error(f"Error proxying to AI service: {e}")
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
 @app.post("/api/v1/tasks/export")
 async def queue_export_task(
     data_type: str = "schools",
@@ -19,11 +19,11 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 """
 Messaging module for API Gateway
-Handles RabbitMQ publishing for async tasks
+Handles RabbitMQ publishing for async tasks and subscriptions to service events
 """
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable
 from datetime import datetime
 import uuid
 
@@ -170,7 +170,8 @@ class TaskPublisher:
         self,
         environment_ids: list,
         education_ids: list,
-        analysis_type: str = "pearson"
+        analysis_type: str = "pearson",
+        **kwargs
     ) -> Optional[str]:
         """Queue AI correlation analysis task"""
         return await self._publish(
@@ -180,7 +181,8 @@ class TaskPublisher:
                 "task_type": "correlation",
                 "environment_data_ids": environment_ids,
                 "education_data_ids": education_ids,
-                "analysis_type": analysis_type
+                "analysis_type": analysis_type,
+                "parameters": kwargs
             }
         )
     
@@ -234,6 +236,42 @@ class TaskPublisher:
             }
         )
 
+    # ================================
+    # Event Subscriptions
+    # ================================
+    
+    async def subscribe(
+        self,
+        exchange: str,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]]
+    ) -> bool:
+        """
+        Consume a fanout event exchange with a private, auto-deleted queue
+        
+        Every gateway instance gets every event (used for cache invalidation).
+        """
+        if not self._connected:
+            return False
+        
+        try:
+            ex = await self.channel.declare_exchange(exchange, ExchangeType.FANOUT, durable=True)
+            queue = await self.channel.declare_queue(exclusive=True, auto_delete=True)
+            await queue.bind(ex)
+            
+            async def on_message(message: aio_pika.IncomingMessage):
+                async with message.process():
+                    try:
+                        await handler(json.loads(message.body))
+                    except Exception as e:
+                        logger.error(f"Error handling {exchange} event: {e}")
+            
+            await queue.consume(on_message)
+            logger.info(f"Subscribed to {exchange}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to subscribe to {exchange}: {e}")
+            return False
+
 
 # Global instance
 task_publisher = TaskPublisher()
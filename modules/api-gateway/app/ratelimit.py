@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Rate limiting for API Gateway
+Token buckets per API key (APIKey.rate_limit, requests/hour) or per client IP,
+in memory or shared through Redis
+"""
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .upstream import upstream
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one bucket check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # seconds until the bucket is full again
+    retry_after: int  # seconds until the next request would be allowed (0 if allowed)
+    window: int
+
+
+def _result(allowed: bool, tokens: float, capacity: int, window: float) -> RateLimitResult:
+    rate = capacity / window
+    return RateLimitResult(
+        allowed=allowed,
+        limit=capacity,
+        remaining=max(0, math.floor(tokens)),
+        reset=math.ceil((capacity - tokens) / rate),
+        retry_after=0 if allowed else max(1, math.ceil((1 - tokens) / rate)),
+        window=int(window),
+    )
+
+
+class MemoryBackend:
+    """
+    In-process token buckets: O(1) refill-and-take per request
+    
+    Buckets live in an LRU bounded by max_keys; an evicted bucket simply starts
+    full again. State is per worker process.
+    """
+    
+    name = "memory"
+    
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated]
+    
+    async def consume(self, key: str, capacity: int, window: float) -> RateLimitResult:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(capacity), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / window)
+            bucket[1] = now
+        
+        allowed = bucket[0] >= 1
+        if allowed:
+            bucket[0] -= 1
+        return _result(allowed, bucket[0], capacity, window)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {"keys": len(self._buckets), "max_keys": self.max_keys}
+    
+    async def close(self):
+        self._buckets.clear()
+
+
+# Atomic refill-and-take; Redis TIME keeps all workers on one clock
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / window)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(window) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Token buckets shared by all gateway workers (one Lua call per request)"""
+    
+    name = "redis"
+    
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        self.errors = 0
+    
+    async def consume(self, key: str, capacity: int, window: float) -> RateLimitResult:
+        try:
+            allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, window])
+            return _result(bool(int(allowed)), float(tokens), capacity, window)
+        except Exception as e:
+            # Fail open: throttling must not take the gateway down with Redis
+            self.errors += 1
+            logger.warning(f"Rate limit backend error, allowing request: {e}")
+            return _result(True, capacity, capacity, window)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {"errors": self.errors}
+    
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_backend():
+    """Backend from RATE_LIMIT_BACKEND ("memory" or "redis")"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        if REDIS_AVAILABLE:
+            return RedisBackend(settings.REDIS_URL)
+        logger.warning("RATE_LIMIT_BACKEND=redis but 'redis' is not installed, using in-memory buckets")
+    return MemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+
+class APIKeyResolver:
+    """
+    API key -> key info (id, rate_limit, ...) via auth-service, cached with a TTL
+    
+    Keys are cached by SHA-256 digest (plain keys are never kept). Unknown keys are
+    cached for a shorter time; concurrent lookups of one key share a single call.
+    """
+    
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 60.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "lookups": 0, "errors": 0}
+    
+    async def _lookup(self, api_key: str) -> Optional[Dict[str, Any]]:
+        response = await upstream.get("auth").post(
+            "/api/v1/api-keys/validate",
+            json={"api_key": api_key},
+            headers={"X-Service-Token": settings.INTERNAL_SERVICE_TOKEN},
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data if data.get("valid") else None
+    
+    def cached(self, api_key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(found, key info) from the cache only, without calling auth-service"""
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        cached = self._cache.get(digest)
+        if cached is None or cached[0] <= time.monotonic():
+            return False, None
+        self._cache.move_to_end(digest)
+        self.stats["hits"] += 1
+        return True, cached[1]
+    
+    async def resolve(self, api_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Key info for a valid key, None for an invalid one
+        
+        Raises:
+            httpx.HTTPError: auth-service could not be reached
+        """
+        found, info = self.cached(api_key)
+        if found:
+            return info
+        
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        self.stats["lookups"] += 1
+        try:
+            info = await upstream.single_flight.do(f"api-key:{digest}", lambda: self._lookup(api_key))
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        
+        ttl = self.ttl if info is not None else self.negative_ttl
+        self._cache[digest] = (time.monotonic() + ttl, info)
+        self._cache.move_to_end(digest)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return info
+    
+    def invalidate(self, api_key: Optional[str] = None):
+        """Drop one cached key (or all)"""
+        if api_key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(hashlib.sha256(api_key.encode()).hexdigest(), None)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "cached": len(self._cache)}
+
+
+def client_ip(scope: Scope) -> str:
+    """Client address (first X-Forwarded-For hop when RATE_LIMIT_TRUST_FORWARDED)"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _ratelimit_headers(result: RateLimitResult) -> List[Tuple[bytes, bytes]]:
+    headers = [
+        (b"ratelimit-limit", str(result.limit).encode()),
+        (b"ratelimit-remaining", str(result.remaining).encode()),
+        (b"ratelimit-reset", str(result.reset).encode()),
+        (b"ratelimit-policy", f"{result.limit};w={result.window}".encode()),
+    ]
+    if not result.allowed:
+        headers.append((b"retry-after", str(result.retry_after).encode()))
+    return headers
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing per-key / per-IP token buckets
+    
+    - Requests with an API key (RATE_LIMIT_API_KEY_HEADER or ?api_key=) use the
+      key's own rate_limit per hour; unknown keys get 401.
+    - Keys not in the resolver cache are charged to the client IP bucket before
+      auth-service is asked, and invalid keys keep being charged to it, so random
+      keys can't bypass the limit (or flood auth-service) with one lookup each.
+    - Anonymous requests (and keyed ones while auth-service is unreachable) get
+      RATE_LIMIT_PER_MINUTE per client IP.
+    - Every limited response carries RateLimit-Limit/-Remaining/-Reset/-Policy;
+      rejected requests get 429 with Retry-After.
+    """
+    
+    def __init__(self, app: ASGIApp, limiter: "RateLimiter"):
+        self.app = app
+        self.limiter = limiter
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not settings.RATE_LIMIT_ENABLED
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in settings.RATE_LIMIT_EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        api_key = (
+            Headers(scope=scope).get(settings.RATE_LIMIT_API_KEY_HEADER)
+            or QueryParams(scope.get("query_string", b"")).get("api_key")
+        )
+        bucket, capacity, window = f"ip:{client_ip(scope)}", settings.RATE_LIMIT_PER_MINUTE, 60.0
+        result = None
+        if api_key:
+            found, info = self.limiter.resolver.cached(api_key)
+            if not found:
+                result = await self.limiter.backend.consume(bucket, capacity, window)
+                if result.allowed:
+                    try:
+                        info = await self.limiter.resolver.resolve(api_key)
+                        found = True
+                    except Exception as e:
+                        logger.warning(f"API key lookup failed, limiting by IP: {e}")
+            if info is not None:
+                bucket = f"key:{info['key_id']}"
+                capacity, window = int(info.get("rate_limit") or settings.RATE_LIMIT_DEFAULT_KEY_LIMIT), 3600.0
+                result = None
+            elif found:
+                if result is None:
+                    result = await self.limiter.backend.consume(bucket, capacity, window)
+                if result.allowed:
+                    response = JSONResponse({"detail": "Invalid API key"}, status_code=401)
+                    response.raw_headers.extend(_ratelimit_headers(result))
+                    await response(scope, receive, send)
+                    return
+        
+        if result is None:
+            result = await self.limiter.backend.consume(bucket, capacity, window)
+        headers = _ratelimit_headers(result)
+        if not result.allowed:
+            self.limiter.stats["limited"] += 1
+            response = JSONResponse({"detail": "Rate limit exceeded"}, status_code=429)
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+        
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+        
+        await self.app(scope, receive, send_wrapper)
+
+
+class RateLimiter:
+    """Backend + API key resolver shared by the middleware and /health"""
+    
+    def __init__(self):
+        self.backend = MemoryBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+        self.resolver = APIKeyResolver(
+            ttl=settings.RATE_LIMIT_KEY_CACHE_TTL,
+            negative_ttl=settings.RATE_LIMIT_KEY_NEGATIVE_TTL,
+        )
+        self.stats: Dict[str, int] = {"limited": 0}
+    
+    def start(self):
+        """Switch to the configured backend (called in lifespan)"""
+        self.backend = create_backend()
+        logger.info(f"Rate limiter using {self.backend.name} backend")
+    
+    async def close(self):
+        await self.backend.close()
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            **self.stats,
+            **self.backend.metrics(),
+            "api_keys": self.resolver.metrics(),
+        }
+
+
+# Global rate limiter
+rate_limiter = RateLimiter()
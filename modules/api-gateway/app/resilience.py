@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Upstream resilience: per-service circuit breaker and bulkhead
+Wired into each service pool as an httpx transport, so every proxy call is covered
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Call rejected by the gateway before reaching the upstream (routes map it to 503)"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Circuit breaker is open for the service"""
+
+
+class BulkheadFullError(UpstreamUnavailable):
+    """Service concurrency limit reached and the wait queue is full or timed out"""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker
+    
+    closed: calls pass; outcomes are kept for `window` seconds. Once at least
+        `min_calls` are in the window and the failure rate reaches `failure_rate`,
+        the circuit opens. Errors, 5xx responses and calls slower than
+        `slow_call_seconds` count as failures.
+    open: calls fail fast for `open_seconds`, then the circuit goes half-open.
+    half_open: up to `half_open_calls` probes pass. All succeeding closes the
+        circuit, any failure re-opens it.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        window: float = 30.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        open_seconds: float = 15.0,
+        half_open_calls: int = 2,
+        slow_call_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.slow_call_seconds = slow_call_seconds
+        self._clock = clock
+        
+        self.state = self.CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (timestamp, failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_inflight = 0
+        self._probe_successes = 0
+        self.stats: Dict[str, int] = {"rejected": 0, "opened": 0}
+    
+    def _prune(self, now: float):
+        horizon = now - self.window
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+    
+    def _open(self, now: float):
+        if self.state != self.OPEN:
+            self.stats["opened"] += 1
+            logger.warning(f"Circuit for {self.name} opened")
+        self.state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self._probes_inflight = 0
+        self._probe_successes = 0
+    
+    def allow(self) -> bool:
+        """Admit a call (reserves a probe slot while half-open)"""
+        now = self._clock()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.open_seconds:
+                self.stats["rejected"] += 1
+                return False
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        
+        if self.state == self.HALF_OPEN:
+            if self._probes_inflight >= self.half_open_calls:
+                self.stats["rejected"] += 1
+                return False
+            self._probes_inflight += 1
+        return True
+    
+    def cancel(self):
+        """Give back an admitted call that never produced an upstream outcome"""
+        if self.state == self.HALF_OPEN:
+            self._probes_inflight = max(0, self._probes_inflight - 1)
+    
+    def record(self, failed: bool, duration: float = 0.0):
+        """Record the outcome of an admitted call"""
+        if self.slow_call_seconds is not None and duration >= self.slow_call_seconds:
+            failed = True
+        now = self._clock()
+        
+        if self.state == self.HALF_OPEN:
+            self._probes_inflight = max(0, self._probes_inflight - 1)
+            if failed:
+                self._open(now)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self.state = self.CLOSED
+                self._probe_successes = 0
+                logger.info(f"Circuit for {self.name} closed")
+            return
+        
+        if self.state == self.OPEN:
+            return  # late result of a call admitted before the circuit opened
+        
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        self._prune(now)
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+            self._open(now)
+    
+    def metrics(self) -> Dict[str, Any]:
+        self._prune(self._clock())
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+            **self.stats,
+        }
+
+
+class Bulkhead:
+    """
+    Per-service concurrency cap with a small bounded wait queue
+    
+    At most `max_concurrent` calls run at once. Up to `max_queue` further callers
+    wait at most `queue_timeout` seconds for a slot; anything beyond is rejected
+    immediately, so one slow backend cannot absorb all gateway workers.
+    """
+    
+    def __init__(self, name: str, max_concurrent: int = 50, max_queue: int = 20, queue_timeout: float = 2.0):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.stats: Dict[str, int] = {"rejected": 0, "timed_out": 0}
+    
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise BulkheadFullError(f"{self.name}: concurrency limit reached")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["timed_out"] += 1
+                raise BulkheadFullError(f"{self.name}: no upstream slot within {self.queue_timeout}s")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+    
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            **self.stats,
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees the bulkhead slot once the body is closed"""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+    
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport guarding one upstream with a circuit breaker and a bulkhead
+    
+    The bulkhead slot is held until the response body is closed, so streamed
+    responses count against the service limit for their whole duration.
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport, breaker: Optional[CircuitBreaker], bulkhead: Optional[Bulkhead]):
+        self._transport = transport
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(f"{self.breaker.name}: circuit open", request=request)
+        
+        if self.bulkhead is not None:
+            try:
+                await self.bulkhead.acquire()
+            except BulkheadFullError as e:
+                if self.breaker is not None:
+                    self.breaker.cancel()
+                raise BulkheadFullError(str(e), request=request) from None
+        
+        started = time.monotonic()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            if self.bulkhead is not None:
+                self.bulkhead.release()
+            if self.breaker is not None:
+                if isinstance(e, asyncio.CancelledError):
+                    self.breaker.cancel()
+                else:
+                    self.breaker.record(failed=True, duration=time.monotonic() - started)
+            raise
+        
+        if self.breaker is not None:
+            self.breaker.record(failed=response.status_code >= 500, duration=time.monotonic() - started)
+        if self.bulkhead is None:
+            return response
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self.bulkhead.release),
+            extensions=response.extensions,
+        )
+    
+    async def aclose(self):
+        await self._transport.aclose()
@@ -23,6 +23,9 @@ from fastapi.responses import JSONResponse
 import httpx
 from typing import Optional
 
+from ..upstream import upstream
+from ..security import auth_headers, local_verification_enabled, validate_token_locally
+
 router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
 
 AUTH_SERVICE_URL = "http://auth-service:8001"
@@ -30,18 +33,18 @@ AUTH_SERVICE_URL = "http://auth-service:8001"
 @router.get("/health")
 async def health_check():
     """Health check proxy to auth service"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"{AUTH_SERVICE_URL}/health", timeout=5.0)
-            return JSONResponse(
-                content=response.json() if response.status_code == 200 else {"status": "error"},
-                status_code=response.status_code
-            )
-        except httpx.RequestError:
-            return JSONResponse(
-                content={"status": "unavailable"},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.get(f"{AUTH_SERVICE_URL}/health", timeout=5.0)
+        return JSONResponse(
+            content=response.json() if response.status_code == 200 else {"status": "error"},
+            status_code=response.status_code
+        )
+    except httpx.RequestError:
+        return JSONResponse(
+            content={"status": "unavailable"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
@@ -53,22 +56,21 @@ async def register(request: Request):
     """
     body = await request.json()
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/register",
-                json=body,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/register",
+            json=body,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.post("/login")
@@ -80,22 +82,21 @@ async def login(request: Request):
     """
     body = await request.json()
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/login",
-                json=body,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/login",
+            json=body,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.post("/refresh")
@@ -107,22 +108,21 @@ async def refresh_token(request: Request):
     """
     body = await request.json()
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/refresh",
-                json=body,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/refresh",
+            json=body,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.get("/me")
@@ -134,26 +134,23 @@ async def get_current_user(request: Request):
     Requires: Authorization Bearer token
     """
     # Forward auth header
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/me",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/me",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.patch("/profile")
@@ -165,28 +162,25 @@ async def update_profile(request: Request):
     Requires: Authorization Bearer token
     """
     body = await request.json()
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            # Update profile directly using auth/profile endpoint
-            response = await client.patch(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/profile",
-                json=body,
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json() if response.status_code != 204 else {"message": "Profile updated"},
-                status_code=response.status_code if response.status_code != 204 else 200,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        # Update profile directly using auth/profile endpoint
+        response = await client.patch(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/profile",
+            json=body,
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json() if response.status_code != 204 else {"message": "Profile updated"},
+            status_code=response.status_code if response.status_code != 204 else 200,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.get("/validate-token")
@@ -194,29 +188,41 @@ async def validate_token(request: Request):
     """
     Validate if access token is still valid.
     
-    Proxies to auth-service: GET /api/v1/auth/validate-token
+    Verified at the gateway (JWT signature/expiry + cached user status) when
+    AUTH_LOCAL_VERIFY is on; otherwise proxies to auth-service: GET /api/v1/auth/validate-token
     Requires: Authorization Bearer token
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
-    
-    async with httpx.AsyncClient() as client:
+    if local_verification_enabled():
         try:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/v1/auth/validate-token",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
+            status_code, payload = await validate_token_locally(request)
         except httpx.RequestError as e:
             return JSONResponse(
                 content={"error": "Auth service unavailable", "detail": str(e)},
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             )
+        return JSONResponse(
+            content=payload,
+            status_code=status_code,
+            headers={"WWW-Authenticate": "Bearer"} if status_code == 401 else None,
+        )
+    
+    headers = auth_headers(request)
+    
+    client = upstream.get("auth")
+    try:
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/v1/auth/validate-token",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 # ================================
@@ -232,27 +238,24 @@ async def register_fcm_token(request: Request):
     Requires: Authorization Bearer token
     """
     body = await request.json()
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
-                json=body,
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
+            json=body,
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.post("/update-fcm-token", status_code=status.HTTP_201_CREATED)
@@ -264,27 +267,24 @@ async def update_fcm_token(request: Request):
     Requires: Authorization Bearer token
     """
     body = await request.json()
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
-                json=body,
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
+            json=body,
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.get("/fcm-tokens")
@@ -295,26 +295,23 @@ async def list_fcm_tokens(request: Request):
     Proxies to auth-service: GET /api/v1/fcm-tokens
     Requires: Authorization Bearer token
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.delete("/fcm-tokens/{token_id}")
@@ -325,26 +322,23 @@ async def delete_fcm_token(request: Request, token_id: str):
     Proxies to auth-service: DELETE /api/v1/fcm-tokens/{token_id}
     Requires: Authorization Bearer token
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.delete(
-                f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens/{token_id}",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json() if response.status_code != 204 else {"message": "Token deleted"},
-                status_code=response.status_code if response.status_code != 204 else 200,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.delete(
+            f"{AUTH_SERVICE_URL}/api/v1/fcm-tokens/{token_id}",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json() if response.status_code != 204 else {"message": "Token deleted"},
+            status_code=response.status_code if response.status_code != 204 else 200,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 # ================================
@@ -360,27 +354,24 @@ async def send_notification(request: Request):
     Requires: Authorization Bearer token
     """
     body = await request.json()
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/notifications/send",
-                json=body,
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/notifications/send",
+            json=body,
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 # ================================
@@ -395,27 +386,24 @@ async def list_users(request: Request):
     Proxies to auth-service: GET /api/v1/users
     Requires: Authorization Bearer token (Admin)
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/v1/users",
-                params=dict(request.query_params),
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/v1/users",
+            params=dict(request.query_params),
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.get("/users/{user_id}")
@@ -426,26 +414,23 @@ async def get_user(request: Request, user_id: str):
     Proxies to auth-service: GET /api/v1/users/{user_id}
     Requires: Authorization Bearer token
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/v1/users/{user_id}",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/v1/users/{user_id}",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @router.delete("/users/{user_id}")
@@ -456,26 +441,23 @@ async def delete_user(request: Request, user_id: str):
     Proxies to auth-service: DELETE /api/v1/users/{user_id}
     Requires: Authorization Bearer token (Admin)
     """
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.delete(
-                f"{AUTH_SERVICE_URL}/api/v1/users/{user_id}",
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json() if response.status_code != 204 else {"message": "User deleted"},
-                status_code=response.status_code if response.status_code != 204 else 200,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.delete(
+            f"{AUTH_SERVICE_URL}/api/v1/users/{user_id}",
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json() if response.status_code != 204 else {"message": "User deleted"},
+            status_code=response.status_code if response.status_code != 204 else 200,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 # ================================
@@ -491,25 +473,22 @@ async def create_api_key(request: Request):
     Requires: Authorization Bearer token (Developer/Admin)
     """
     body = await request.json()
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/v1/api-keys",
-                json=body,
-                headers=headers,
-                timeout=10.0,
-            )
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
-            return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
+    client = upstream.get("auth")
+    try:
+        response = await client.post(
+            f"{AUTH_SERVICE_URL}/api/v1/api-keys",
+            json=body,
+            headers=headers,
+        )
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
@@ -21,10 +21,10 @@ import logging
 from typing import Optional
 from uuid import UUID
 
-import httpx
 from fastapi import APIRouter, HTTPException, Query, Request, Response
 
 from ..config import settings
+from ..upstream import upstream
 
 logger = logging.getLogger(__name__)
 
@@ -49,15 +49,11 @@ async def list_schools(
 ):
     """List schools (Proxy)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools"
+        params = dict(request.query_params)
+        return await upstream.stream(
+            "education", url, params=params, follow_redirects=True, request=request
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -72,15 +68,14 @@ async def get_nearby_schools(
 ):
     """Get nearby schools (Proxy)"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools/nearby"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools/nearby"
+        params = dict(request.query_params)
+        response = await upstream.get_shared("education", url, params=params)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -90,14 +85,13 @@ async def get_nearby_schools(
 async def get_school(school_id: UUID):
     """Get school details (Proxy)"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools/{school_id}"
-            response = await client.get(url, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools/{school_id}"
+        response = await upstream.get_shared("education", url)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -112,15 +106,11 @@ async def list_green_courses(
 ):
     """List green courses (Proxy)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/green-courses"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/green-courses"
+        params = dict(request.query_params)
+        return await upstream.stream(
+            "education", url, params=params, follow_redirects=True, request=request
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -144,16 +134,12 @@ async def get_opendata_schools(
     - geojson: GeoJSON FeatureCollection
     """
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            # For now just return json, geojson to be implemented later
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools"
-
-            response = await client.get(url, params={"limit": limit}, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        # For now just return json, geojson to be implemented later
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools"
+
+        return await upstream.stream(
+            "education", url, params={"limit": limit}, follow_redirects=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -172,15 +158,11 @@ async def get_opendata_green_courses(
     - geojson: GeoJSON FeatureCollection
     """
     try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/green-courses"
-            
-            response = await client.get(url, params={"limit": limit}, timeout=30.0)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{settings.EDUCATION_SERVICE_URL}/api/v1/green-courses"
+        
+        return await upstream.stream(
+            "education", url, params={"limit": limit}, follow_redirects=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to education service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -20,13 +20,16 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 Environment Service proxy routes
 Air Quality + Weather endpoints
+AQI surface endpoints (proxy to ai-service)
 """
 from fastapi import APIRouter, Request, Response, Query, HTTPException
 from fastapi.responses import JSONResponse
-import httpx
 import logging
 from typing import Optional
 
+from ..config import settings
+from ..upstream import upstream
+
 router = APIRouter(prefix="/api/v1", tags=["Environment"])
 
 ENVIRONMENT_SERVICE_URL = "http://environment-service:8007"
@@ -46,15 +49,11 @@ async def list_air_quality(
     List air quality data (Proxy to environment-service)
     """
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/"
+        params = dict(request.query_params)
+        return await upstream.stream(
+            "environment", url, params=params, follow_redirects=True, request=request
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -64,15 +63,11 @@ async def list_air_quality(
 async def get_latest_air_quality(request: Request):
     """Get latest air quality readings"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/latest/"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/latest/"
+        params = dict(request.query_params)
+        return await upstream.stream(
+            "environment", url, params=params, follow_redirects=True, request=request
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -82,19 +77,76 @@ async def get_latest_air_quality(request: Request):
 async def get_air_quality(item_id: str):
     """Get specific air quality reading"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/{item_id}/"
-            response = await client.get(url)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/{item_id}/"
+        response = await upstream.get_shared("environment", url, follow_redirects=True)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
 
 
+# ========== AQI Surface Endpoints ==========
+
+@router.get("/aqi-grid")
+async def get_aqi_grid_info():
+    """Metadata of the interpolated AQI grid (Proxy to ai-service)"""
+    try:
+        url = f"{settings.AI_SERVICE_URL}/api/v1/aqi-grid"
+        response = await upstream.get_shared("ai", url)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
+    except Exception as e:
+        logger.error(f"Error proxying to AI service: {e}")
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
+@router.get("/aqi-grid/point")
+async def get_aqi_at_point(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180)
+):
+    """Interpolated AQI at an arbitrary point"""
+    try:
+        url = f"{settings.AI_SERVICE_URL}/api/v1/aqi-grid/point"
+        params = {"lat": lat, "lon": lon}
+        response = await upstream.get_shared("ai", url, params=params)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
+    except Exception as e:
+        logger.error(f"Error proxying to AI service: {e}")
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
+@router.get("/aqi-grid/tiles/{z}/{x}/{y}")
+async def get_aqi_tile(
+    z: int,
+    x: int,
+    y: int,
+    size: int = Query(256, ge=16, le=512),
+    format: str = Query("json", pattern="^(json|f32)$")
+):
+    """XYZ tile of the AQI grid (json or raw float32)"""
+    try:
+        url = f"{settings.AI_SERVICE_URL}/api/v1/aqi-grid/tiles/{z}/{x}/{y}"
+        params = {"size": size, "format": format}
+        return await upstream.stream(
+            "ai", url, params=params, forward_headers=("x-tile-size", "x-grid-version")
+        )
+    except Exception as e:
+        logger.error(f"Error proxying to AI service: {e}")
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+
 # ========== Weather Endpoints ==========
 
 @router.get("/weather")
@@ -107,15 +159,11 @@ async def list_weather(
     List weather data (Proxy to environment-service)
     """
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/"
+        params = dict(request.query_params)
+        return await upstream.stream(
+            "environment", url, params=params, follow_redirects=True, request=request
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -125,15 +173,14 @@ async def list_weather(
 async def get_current_weather(request: Request):
     """Get current weather"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/current/"
-            params = dict(request.query_params)
-            response = await client.get(url, params=params)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/current/"
+        params = dict(request.query_params)
+        response = await upstream.get_shared("environment", url, params=params, follow_redirects=True)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -146,15 +193,14 @@ async def get_weather_forecast(
 ):
     """Get weather forecast from environment service"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/forecast"
-            params = {"lat": lat, "lon": lon}
-            response = await client.get(url, params=params)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/forecast"
+        params = {"lat": lat, "lon": lon}
+        response = await upstream.get_shared("environment", url, params=params)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -164,14 +210,13 @@ async def get_weather_forecast(
 async def get_weather(item_id: str):
     """Get specific weather observation"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/{item_id}/"
-            response = await client.get(url)
-            return Response(
-                content=response.content,
-                status_code=response.status_code,
-                media_type=response.headers.get("content-type"),
-            )
+        url = f"{ENVIRONMENT_SERVICE_URL}/api/v1/weather/{item_id}/"
+        response = await upstream.get_shared("environment", url, follow_redirects=True)
+        return Response(
+            content=response.content,
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
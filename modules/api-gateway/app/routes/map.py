@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Map viewport composite endpoint
+One request fans out to environment, education, resource and AI services concurrently
+"""
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import JSONResponse
+import asyncio
+import httpx
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..upstream import upstream
+
+router = APIRouter(prefix="/api/v1/map", tags=["Map"])
+
+logger = logging.getLogger(__name__)
+
+
+def _viewport_parts(lat: float, lon: float, radius_km: float) -> Dict[str, tuple]:
+    """Part name -> (service, url, params), all nearby/point lookups around the viewport center"""
+    return {
+        "air_quality": (
+            "environment",
+            f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/location",
+            {"lat": lat, "lon": lon, "radius": max(1, round(radius_km))},
+        ),
+        "weather": (
+            "environment",
+            f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/weather/current",
+            {"lat": lat, "lon": lon, "fetch_new": "true"},
+        ),
+        "schools": (
+            "education",
+            f"{settings.EDUCATION_SERVICE_URL}/api/v1/schools/nearby",
+            {"latitude": lat, "longitude": lon, "radius_km": radius_km},
+        ),
+        "green_zones": (
+            "resource",
+            f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/nearby",
+            {"lat": lat, "lon": lon, "radius_km": radius_km},
+        ),
+        "centers": (
+            "resource",
+            f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers/nearby",
+            {"latitude": lat, "longitude": lon, "radius_km": radius_km},
+        ),
+        "aqi_surface": (
+            "ai",
+            f"{settings.AI_SERVICE_URL}/api/v1/aqi-grid/point",
+            {"lat": lat, "lon": lon},
+        ),
+    }
+
+
+async def _fetch_part(name: str, service: str, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch one part with its own deadline; failures become an error entry, never an exception"""
+    timeout = settings.MAP_PART_TIMEOUTS.get(name, settings.MAP_PART_TIMEOUT)
+    started = time.perf_counter()
+    try:
+        response = await asyncio.wait_for(
+            upstream.get_shared(service, url, params=params, follow_redirects=True),
+            timeout
+        )
+        response.raise_for_status()
+        result = {"status": "ok", "data": response.json()}
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"Map part {name} failed: upstream returned {e.response.status_code}")
+        result = {"status": "error", "error": f"Upstream returned {e.response.status_code}"}
+    except asyncio.TimeoutError:
+        logger.warning(f"Map part {name} timed out after {timeout}s")
+        result = {"status": "timeout", "error": f"No response within {timeout}s"}
+    except Exception as e:
+        logger.warning(f"Map part {name} failed: {e}")
+        result = {"status": "error", "error": str(e) or type(e).__name__}
+    
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+@router.get("/viewport")
+async def get_map_viewport(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, ge=0.1, le=100),
+    include: Optional[List[str]] = Query(
+        None,
+        description="Parts to load (default: all except aqi_surface)"
+    )
+):
+    """
+    Everything the map page needs for one viewport in a single response
+    
+    Parts are fetched concurrently, each with its own timeout (MAP_PART_TIMEOUTS).
+    Failed parts are reported with status "error"/"timeout" and the rest is still
+    returned; 503 only when every part failed. Partial answers are not cached.
+    """
+    parts = _viewport_parts(lat, lon, radius_km)
+    names = include or settings.MAP_DEFAULT_PARTS
+    unknown = [name for name in names if name not in parts]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown parts: {', '.join(unknown)}. Available: {', '.join(parts)}"
+        )
+    names = list(dict.fromkeys(names))
+    
+    results = await asyncio.gather(*(_fetch_part(name, *parts[name]) for name in names))
+    data = dict(zip(names, results))
+    failed = [name for name, result in data.items() if result["status"] != "ok"]
+    
+    return JSONResponse(
+        status_code=503 if len(failed) == len(names) else 200,
+        headers={"Cache-Control": "no-store"} if failed else None,
+        content={
+            "viewport": {"lat": lat, "lon": lon, "radius_km": radius_km},
+            "partial": bool(failed),
+            "failed": failed,
+            "parts": data,
+        }
+    )
@@ -26,6 +26,7 @@ import httpx
 import logging
 
 from ..config import settings
+from ..upstream import upstream
 
 router = APIRouter(prefix="/api/open-data", tags=["OpenData"])
 logger = logging.getLogger(__name__)
@@ -39,11 +40,10 @@ logger = logging.getLogger(__name__)
 async def get_public_air_quality(limit: int = Query(100, ge=1, le=1000)):
     """Get public air quality data"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/latest"
-            response = await client.get(url, params={"limit": limit}, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/latest"
+        return await upstream.stream(
+            "environment", url, params={"limit": limit}, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to environment service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -57,12 +57,11 @@ async def get_air_quality_by_location(
 ):
     """Get air quality near a location"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/location"
-            params = {"lat": lat, "lon": lon, "radius": radius}
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/air-quality/location"
+        params = {"lat": lat, "lon": lon, "radius": radius}
+        response = await upstream.get_shared("environment", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error fetching air quality: {e}")
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -83,27 +82,27 @@ async def get_public_current_weather(
 ):
     """Get current weather (public) - accepts either city or lat/lon"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/weather/current"
-            params = {}
-            
-            # If lat/lon provided, use them with fetch_new
-            if lat is not None and lon is not None:
-                params["lat"] = lat
-                params["lon"] = lon
-                params["fetch_new"] = "true"
-            elif city:
-                # For city, we need to geocode first or use a default location
-                # For now, use Da Nang coordinates
-                params["lat"] = 16.0678
-                params["lon"] = 108.2208
-                params["fetch_new"] = "true"
-            else:
-                raise HTTPException(status_code=400, detail="Either city or lat/lon required")
-                
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/weather/current"
+        params = {}
+        
+        # If lat/lon provided, use them with fetch_new
+        if lat is not None and lon is not None:
+            params["lat"] = lat
+            params["lon"] = lon
+            params["fetch_new"] = "true"
+        elif city:
+            # For city, we need to geocode first or use a default location
+            # For now, use Da Nang coordinates
+            params["lat"] = 16.0678
+            params["lon"] = 108.2208
+            params["fetch_new"] = "true"
+        else:
+            raise HTTPException(status_code=400, detail="Either city or lat/lon required")
+        
+        # fetch_new hits OpenWeather: concurrent identical requests share one upstream call
+        response = await upstream.get_shared("environment", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error fetching weather: {e}")
         raise HTTPException(status_code=e.response.status_code, detail=str(e))
@@ -120,35 +119,34 @@ async def get_public_weather_forecast(
 ):
     """Get weather forecast (public) - accepts either city or lat/lon"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/weather/forecast"
-            params = {}
-            
-            # Use provided lat/lon or default to Da Nang
-            if lat is not None and lon is not None:
-                params["lat"] = lat
-                params["lon"] = lon
-            elif city:
-                # Default coordinates for common cities
-                city_coords = {
-                    "đà nẵng": (16.0678, 108.2208),
-                    "da nang": (16.0678, 108.2208),
-                    "hồ chí minh": (10.7769, 106.7009),
-                    "ho chi minh": (10.7769, 106.7009),
-                    "hà nội": (21.0285, 105.8542),
-                    "ha noi": (21.0285, 105.8542),
-                }
-                coords = city_coords.get(city.lower(), (16.0678, 108.2208))
-                params["lat"] = coords[0]
-                params["lon"] = coords[1]
-            else:
-                # Default to Da Nang
-                params["lat"] = 16.0678
-                params["lon"] = 108.2208
-            
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.ENVIRONMENT_SERVICE_URL}/api/v1/weather/forecast"
+        params = {}
+        
+        # Use provided lat/lon or default to Da Nang
+        if lat is not None and lon is not None:
+            params["lat"] = lat
+            params["lon"] = lon
+        elif city:
+            # Default coordinates for common cities
+            city_coords = {
+                "đà nẵng": (16.0678, 108.2208),
+                "da nang": (16.0678, 108.2208),
+                "hồ chí minh": (10.7769, 106.7009),
+                "ho chi minh": (10.7769, 106.7009),
+                "hà nội": (21.0285, 105.8542),
+                "ha noi": (21.0285, 105.8542),
+            }
+            coords = city_coords.get(city.lower(), (16.0678, 108.2208))
+            params["lat"] = coords[0]
+            params["lon"] = coords[1]
+        else:
+            # Default to Da Nang
+            params["lat"] = 16.0678
+            params["lon"] = 108.2208
+        
+        response = await upstream.get_shared("environment", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         logger.error(f"Error fetching forecast: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -210,12 +208,9 @@ async def get_public_centers(
 ):
     """Get public rescue centers"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers/"
-            params = {"skip": skip, "limit": limit}
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers/"
+        params = {"skip": skip, "limit": limit}
+        return await upstream.stream("resource", url, params=params, raise_for_status=True)
     except httpx.HTTPError as e:
         logger.error(f"Error fetching centers: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -229,16 +224,15 @@ async def get_nearby_centers(
 ):
     """Get rescue centers near a location"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers/nearby"
-            params = {
-                "latitude": latitude,
-                "longitude": longitude,
-                "radius_km": radius_km
-            }
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers/nearby"
+        params = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "radius_km": radius_km
+        }
+        response = await upstream.get_shared("resource", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPError as e:
         logger.error(f"Error fetching nearby centers: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -18,11 +18,11 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
 from fastapi import APIRouter, Query, HTTPException
-import httpx
 import logging
 from typing import Optional
 
 from ..config import settings
+from ..upstream import upstream
 
 router = APIRouter(prefix="/api/open-data", tags=["OpenData - Resources"])
 router_v1 = APIRouter(prefix="/api/v1", tags=["Resources"])
@@ -35,11 +35,11 @@ async def get_public_green_zones(
 ):
     """Get public green zones"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/"
-            response = await client.get(url, params={"skip": skip, "limit": limit})
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/"
+        return await upstream.stream(
+            "resource", url, params={"skip": skip, "limit": limit},
+            follow_redirects=True, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -52,12 +52,11 @@ async def get_nearby_green_zones(
 ):
     """Find green zones nearby"""
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/nearby"
-            params = {"lat": lat, "lon": lon, "radius_km": radius}
-            response = await client.get(url, params=params, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/nearby"
+        params = {"lat": lat, "lon": lon, "radius_km": radius}
+        response = await upstream.get_shared("resource", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         logger.error(f"Error fetching nearby green zones: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -69,11 +68,11 @@ async def get_public_green_resources(
 ):
     """Get public green resources"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/"
-            response = await client.get(url, params={"skip": skip, "limit": limit})
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/"
+        return await upstream.stream(
+            "resource", url, params={"skip": skip, "limit": limit},
+            follow_redirects=True, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -88,11 +87,11 @@ async def list_green_zones_v1(
 ):
     """List green zones (v1 API)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/"
-            response = await client.get(url, params={"skip": skip, "limit": limit})
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/"
+        return await upstream.stream(
+            "resource", url, params={"skip": skip, "limit": limit},
+            follow_redirects=True, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -106,12 +105,11 @@ async def get_nearby_green_zones_v1(
 ):
     """Find nearby green zones (v1 API)"""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/nearby"
-            params = {"lat": latitude, "lon": longitude, "radius_km": radius_km}
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/nearby"
+        params = {"lat": latitude, "lon": longitude, "radius_km": radius_km}
+        response = await upstream.get_shared("resource", url, params=params)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         logger.error(f"Error fetching nearby green zones: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -121,11 +119,10 @@ async def get_nearby_green_zones_v1(
 async def get_green_zone_v1(zone_id: str):
     """Get specific green zone (v1 API)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/{zone_id}/"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-zones/{zone_id}/"
+        response = await upstream.get_shared("resource", url, follow_redirects=True)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -138,11 +135,11 @@ async def list_green_resources_v1(
 ):
     """List green resources (v1 API)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/"
-            response = await client.get(url, params={"skip": skip, "limit": limit})
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/"
+        return await upstream.stream(
+            "resource", url, params={"skip": skip, "limit": limit},
+            follow_redirects=True, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -152,11 +149,10 @@ async def list_green_resources_v1(
 async def get_green_resource_v1(resource_id: str):
     """Get specific green resource (v1 API)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/{resource_id}/"
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/green-resources/{resource_id}/"
+        response = await upstream.get_shared("resource", url, follow_redirects=True)
+        response.raise_for_status()
+        return response.json()
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
@@ -169,11 +165,11 @@ async def list_centers_v1(
 ):
     """List recycling centers (v1 API)"""
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers"
-            response = await client.get(url, params={"skip": skip, "limit": limit})
-            response.raise_for_status()
-            return response.json()
+        url = f"{settings.RESOURCE_SERVICE_URL}/api/v1/centers"
+        return await upstream.stream(
+            "resource", url, params={"skip": skip, "limit": limit},
+            follow_redirects=True, raise_for_status=True
+        )
     except Exception as e:
         logger.error(f"Error proxying to resource service: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
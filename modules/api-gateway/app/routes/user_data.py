@@ -9,6 +9,9 @@ from fastapi.responses import JSONResponse
 import httpx
 from typing import Optional
 
+from ..upstream import upstream
+from ..security import auth_headers
+
 router = APIRouter(prefix="/api/v1/user-data", tags=["User Data"])
 
 AUTH_SERVICE_URL = "http://auth-service:8001"
@@ -22,42 +25,40 @@ async def proxy_to_auth(
     params: Optional[dict] = None,
 ):
     """Generic proxy function to auth service."""
-    headers = {}
-    if "authorization" in request.headers:
-        headers["Authorization"] = request.headers["authorization"]
+    headers = auth_headers(request)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            url = f"{AUTH_SERVICE_URL}/api/v1/user-data{endpoint}"
-            
-            if method == "GET":
-                response = await client.get(url, headers=headers, params=params, timeout=10.0)
-            elif method == "POST":
-                response = await client.post(url, json=body, headers=headers, timeout=10.0)
-            elif method == "PUT":
-                response = await client.put(url, json=body, headers=headers, timeout=10.0)
-            elif method == "PATCH":
-                response = await client.patch(url, json=body, headers=headers, timeout=10.0)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers, timeout=10.0)
-            else:
-                return JSONResponse(
-                    content={"error": "Unsupported method"},
-                    status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
-                )
-            
-            if response.status_code == 204:
-                return JSONResponse(content={"message": "Success"}, status_code=200)
-            
-            return JSONResponse(
-                content=response.json(),
-                status_code=response.status_code,
-            )
-        except httpx.RequestError as e:
+    client = upstream.get("auth")
+    try:
+        url = f"{AUTH_SERVICE_URL}/api/v1/user-data{endpoint}"
+        
+        if method == "GET":
+            response = await client.get(url, headers=headers, params=params)
+        elif method == "POST":
+            response = await client.post(url, json=body, headers=headers)
+        elif method == "PUT":
+            response = await client.put(url, json=body, headers=headers)
+        elif method == "PATCH":
+            response = await client.patch(url, json=body, headers=headers)
+        elif method == "DELETE":
+            response = await client.delete(url, headers=headers)
+        else:
             return JSONResponse(
-                content={"error": "Auth service unavailable", "detail": str(e)},
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"error": "Unsupported method"},
+                status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
             )
+        
+        if response.status_code == 204:
+            return JSONResponse(content={"message": "Success"}, status_code=200)
+        
+        return JSONResponse(
+            content=response.json(),
+            status_code=response.status_code,
+        )
+    except httpx.RequestError as e:
+        return JSONResponse(
+            content={"error": "Auth service unavailable", "detail": str(e)},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 # ================================
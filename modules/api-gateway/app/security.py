@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Local access token verification for API Gateway
+JWTs are verified with the secret shared with auth-service; user active/role status
+is cached briefly and invalidated by auth.events (user.updated / user.deleted)
+"""
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.requests import Request
+
+from .config import settings
+from .upstream import upstream
+
+logger = logging.getLogger(__name__)
+
+try:
+    from jose import JWTError, jwt
+    JOSE_AVAILABLE = True
+except ImportError:
+    JOSE_AVAILABLE = False
+
+
+def local_verification_enabled() -> bool:
+    return settings.AUTH_LOCAL_VERIFY and JOSE_AVAILABLE
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    """Token from `Authorization: Bearer <token>`"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+def decode_access_token(token: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Verify signature, expiry and type of an access token
+    
+    Returns:
+        Claims (sub, email, role, exp, ...) or None if the token is invalid
+    """
+    if not token or not JOSE_AVAILABLE:
+        return None
+    try:
+        claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        return None
+    if claims.get("type") != "access" or not claims.get("sub"):
+        return None
+    return claims
+
+
+def auth_headers(request: Request) -> Dict[str, str]:
+    """
+    Headers for proxying an authenticated call upstream
+    
+    Authorization is forwarded as-is; when the token verifies locally its claims are
+    attached as X-User-Id / X-User-Email / X-User-Role (client-sent X-User-* headers
+    are never forwarded).
+    """
+    headers = {}
+    if "authorization" in request.headers:
+        headers["Authorization"] = request.headers["authorization"]
+    
+    claims = decode_access_token(bearer_token(request)) if local_verification_enabled() else None
+    if claims:
+        headers["X-User-Id"] = str(claims["sub"])
+        if claims.get("email"):
+            headers["X-User-Email"] = str(claims["email"])
+        if claims.get("role"):
+            headers["X-User-Role"] = str(claims["role"])
+    return headers
+
+
+class UserStatusCache:
+    """
+    Short TTL cache of auth-service's validate-token answer per user
+    
+    Holds the status code and payload (user_id, username, role, is_active, ...), so a
+    valid token costs one cache lookup instead of two hops and a DB query. 200, 403
+    (deactivated) and 404 (deleted) answers are cached; user events evict entries.
+    """
+    
+    CACHEABLE_STATUS = (200, 403, 404)
+    
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+    
+    async def _fetch(self, authorization: str) -> Tuple[int, Dict[str, Any]]:
+        response = await upstream.get("auth").get(
+            f"{settings.AUTH_SERVICE_URL}/api/v1/auth/validate-token",
+            headers={"Authorization": authorization},
+        )
+        return response.status_code, response.json()
+    
+    async def get(self, user_id: str, authorization: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        (status_code, payload) of validate-token for this user
+        
+        Raises:
+            httpx.RequestError: auth-service unreachable on a cache miss
+        """
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[1], entry[2]
+        
+        self.stats["misses"] += 1
+        status_code, payload = await upstream.single_flight.do(
+            f"user-status:{user_id}", lambda: self._fetch(authorization)
+        )
+        if status_code in self.CACHEABLE_STATUS:
+            self._entries[user_id] = (time.monotonic() + self.ttl, status_code, payload)
+            self._entries.move_to_end(user_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return status_code, payload
+    
+    def invalidate(self, user_id: str):
+        if self._entries.pop(str(user_id), None) is not None:
+            self.stats["invalidations"] += 1
+    
+    async def handle_event(self, event: Dict[str, Any]):
+        """auth.events consumer: drop the user's entry on user.updated / user.deleted"""
+        if event.get("event_type") in ("user.updated", "user.deleted"):
+            user_id = (event.get("data") or {}).get("user_id")
+            if user_id:
+                self.invalidate(user_id)
+    
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "cached": len(self._entries), "ttl": self.ttl}
+
+
+async def validate_token_locally(request: Request) -> Tuple[int, Dict[str, Any]]:
+    """
+    validate-token answered at the gateway
+    
+    Invalid/expired tokens are rejected without any upstream call; valid ones are
+    checked against the cached user status.
+    
+    Raises:
+        httpx.RequestError: auth-service unreachable on a status cache miss
+    """
+    claims = decode_access_token(bearer_token(request))
+    if claims is None:
+        return 401, {"detail": "Invalid access token"}
+    
+    status_code, payload = await user_status.get(str(claims["sub"]), request.headers["authorization"])
+    if status_code == 200:
+        payload = {**payload, "checked_at": datetime.utcnow().isoformat()}
+    return status_code, payload
+
+
+# Global user status cache
+user_status = UserStatusCache(
+    ttl=settings.USER_STATUS_CACHE_TTL,
+    max_entries=settings.USER_STATUS_CACHE_MAX_ENTRIES,
+)
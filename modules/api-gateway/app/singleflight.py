@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Single-flight request coalescing
+Concurrent callers with the same key share one in-flight call
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent identical calls
+    
+    The first caller for a key starts the call as a task; callers arriving while it
+    is in flight await the same task. The task is shielded, so one caller
+    disconnecting does not cancel the call for the others. The key is forgotten as
+    soon as the call finishes - results are not cached.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "shared": 0, "errors": 0}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once for all concurrent callers with this key
+        
+        Args:
+            key: Identity of the call (must include everything that changes the result)
+            fn: Zero-argument coroutine factory
+        
+        Returns:
+            The shared result (exceptions are raised to every waiter)
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(task)
+    
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+    
+    def metrics(self) -> Dict[str, int]:
+        return {**self.stats, "inflight": len(self._inflight)}
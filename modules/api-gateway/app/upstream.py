@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+"""
+Upstream HTTP clients for API Gateway
+One pooled httpx.AsyncClient per backend service, created in lifespan
+"""
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from .config import settings
+from .resilience import Bulkhead, CircuitBreaker, ResilientTransport
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Upstream response headers forwarded by streaming proxies
+PASSTHROUGH_HEADERS = (
+    "content-type",
+    "content-encoding",
+    "content-disposition",
+    "content-length",
+    "etag",
+    "last-modified",
+    "cache-control",
+)
+
+
+def service_urls() -> Dict[str, str]:
+    """Backend service name -> base URL"""
+    return {
+        "auth": settings.AUTH_SERVICE_URL,
+        "environment": settings.ENVIRONMENT_SERVICE_URL,
+        "education": settings.EDUCATION_SERVICE_URL,
+        "resource": settings.RESOURCE_SERVICE_URL,
+        "ai": settings.AI_SERVICE_URL,
+    }
+
+
+class UpstreamClients:
+    """Per-service connection pools (keep-alive, tunable limits/timeouts, optional HTTP/2)"""
+    
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self.single_flight = SingleFlight()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.bulkheads: Dict[str, Bulkhead] = {}
+    
+    def _guards(self, service: str):
+        """Breaker/bulkhead for a service (kept across client re-creation)"""
+        if settings.UPSTREAM_BREAKER_ENABLED and service not in self.breakers:
+            self.breakers[service] = CircuitBreaker(
+                service,
+                window=settings.UPSTREAM_BREAKER_WINDOW,
+                min_calls=settings.UPSTREAM_BREAKER_MIN_CALLS,
+                failure_rate=settings.UPSTREAM_BREAKER_FAILURE_RATE,
+                open_seconds=settings.UPSTREAM_BREAKER_OPEN_SECONDS,
+                half_open_calls=settings.UPSTREAM_BREAKER_HALF_OPEN_CALLS,
+                slow_call_seconds=settings.UPSTREAM_BREAKER_SLOW_CALL_SECONDS,
+            )
+        if settings.UPSTREAM_BULKHEAD_ENABLED and service not in self.bulkheads:
+            self.bulkheads[service] = Bulkhead(
+                service,
+                max_concurrent=settings.UPSTREAM_BULKHEAD_LIMITS.get(
+                    service, settings.UPSTREAM_BULKHEAD_MAX_CONCURRENT
+                ),
+                max_queue=settings.UPSTREAM_BULKHEAD_MAX_QUEUE,
+                queue_timeout=settings.UPSTREAM_BULKHEAD_QUEUE_TIMEOUT,
+            )
+        return self.breakers.get(service), self.bulkheads.get(service)
+    
+    def _create_client(self, service: str) -> httpx.AsyncClient:
+        http2 = settings.UPSTREAM_HTTP2 and HTTP2_AVAILABLE
+        timeout = settings.UPSTREAM_SERVICE_TIMEOUTS.get(service, settings.UPSTREAM_TIMEOUT)
+        
+        transport = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+        )
+        breaker, bulkhead = self._guards(service)
+        
+        return httpx.AsyncClient(
+            base_url=service_urls().get(service, ""),
+            transport=ResilientTransport(transport, breaker, bulkhead),
+            timeout=httpx.Timeout(timeout, connect=settings.UPSTREAM_CONNECT_TIMEOUT),
+        )
+    
+    async def start(self):
+        """Create one client per configured service"""
+        if settings.UPSTREAM_HTTP2 and not HTTP2_AVAILABLE:
+            logger.warning("UPSTREAM_HTTP2 enabled but 'h2' is not installed, using HTTP/1.1")
+        
+        for service in service_urls():
+            if service not in self._clients:
+                self._clients[service] = self._create_client(service)
+        
+        logger.info(f"Upstream clients ready: {', '.join(self._clients)}")
+    
+    def get(self, service: str) -> httpx.AsyncClient:
+        """
+        Shared client for a backend service
+        
+        Created on first use if lifespan has not started the pools (e.g. scripts/tests).
+        """
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            client = self._clients[service] = self._create_client(service)
+        return client
+    
+    async def get_shared(
+        self,
+        service: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        GET through the service pool, coalescing concurrent identical requests
+        
+        Callers asking for the same service/url/params/headers while a request is in
+        flight get the same (fully read) httpx.Response instead of a new upstream call.
+        """
+        client = self.get(service)
+        if not settings.UPSTREAM_SINGLE_FLIGHT:
+            return await client.get(url, params=params, headers=headers, **kwargs)
+        
+        key = repr((
+            service,
+            url,
+            sorted((str(k), str(v)) for k, v in (params or {}).items()),
+            sorted((k.lower(), v) for k, v in (headers or {}).items()),
+            sorted(kwargs.items()),
+        ))
+        return await self.single_flight.do(
+            key, lambda: client.get(url, params=params, headers=headers, **kwargs)
+        )
+    
+    async def stream(
+        self,
+        service: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        request: Optional[Request] = None,
+        forward_headers: Sequence[str] = (),
+        raise_for_status: bool = False,
+        follow_redirects: bool = False
+    ) -> StreamingResponse:
+        """
+        Proxy a GET by piping upstream bytes straight to the client
+        
+        The body is never buffered or decoded: chunks are forwarded as they arrive
+        (content-encoding included), so memory stays flat for large lists/exports.
+        
+        Args:
+            service: Upstream service name
+            url: Upstream URL
+            params: Query params
+            headers: Extra request headers
+            request: Incoming request; its Accept-Encoding is forwarded so compressed
+                upstream bodies can pass through untouched (default: identity),
+                and its If-None-Match so unchanged resources come back as 304
+            forward_headers: Response headers to forward besides PASSTHROUGH_HEADERS
+            raise_for_status: Raise httpx.HTTPStatusError on 4xx/5xx before streaming
+            follow_redirects: Follow upstream redirects
+        
+        Returns:
+            StreamingResponse with upstream status and forwarded headers
+        """
+        client = self.get(service)
+        request_headers = {
+            "Accept-Encoding": request.headers.get("accept-encoding", "identity") if request else "identity",
+            **(headers or {}),
+        }
+        if request is not None and "if-none-match" in request.headers:
+            # Conditional GET: an unchanged upstream answers 304, which is passed through
+            request_headers["If-None-Match"] = request.headers["if-none-match"]
+        upstream_request = client.build_request("GET", url, params=params, headers=request_headers)
+        response = await client.send(upstream_request, stream=True, follow_redirects=follow_redirects)
+        
+        if raise_for_status and response.is_error:
+            await response.aclose()
+            response.raise_for_status()
+        
+        allowed = set(PASSTHROUGH_HEADERS) | {name.lower() for name in forward_headers}
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() in allowed},
+            background=BackgroundTask(response.aclose),
+        )
+    
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker / bulkhead state per service"""
+        return {
+            service: {
+                "circuit": self.breakers[service].metrics() if service in self.breakers else None,
+                "bulkhead": self.bulkheads[service].metrics() if service in self.bulkheads else None,
+            }
+            for service in service_urls()
+        }
+    
+    async def close(self):
+        """Close all pools (waits for in-flight connections to be released)"""
+        for service, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing upstream client {service}: {e}")
+        self._clients.clear()
+        logger.info("Upstream clients closed")
+
+
+# Global upstream clients
+upstream = UpstreamClients()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the gateway response cache."""
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.cache import ResponseCache, ResponseCacheMiddleware, cache_key
+from app.config import settings
+
+
+def _key(query: str, path: str = "/api/v1/schools") -> str:
+    return cache_key({"path": path, "query_string": query.encode()})
+
+
+def test_cache_key_sorts_params_and_drops_ignored_ones():
+    assert _key("b=2&a=1&_=123&nocache=1&empty=") == _key("a=1&b=2")
+
+
+def test_cache_key_canonicalizes_numeric_params():
+    assert _key("lat=16.0&lon=108.20&radius_km=5") == _key("lon=108.2&lat=16&radius_km=5.0")
+
+
+def test_cache_key_keeps_name_case():
+    assert _key("City=Hue") != _key("city=Hue")
+
+
+def test_cache_key_keeps_string_values():
+    assert _key("name=1.50") != _key("name=1.5")
+    assert _key("city=Hue") != _key("city=hue")
+
+
+@pytest.fixture
+def cached_app(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_ROUTE_TTLS", {"/api/open-data/items": 60.0})
+    monkeypatch.setattr(settings, "CACHE_STALE_SECONDS", 60.0)
+    
+    app = FastAPI()
+    app.state.calls = 0
+    
+    @app.get("/api/open-data/items")
+    async def items(lat: float = 0.0):
+        app.state.calls += 1
+        return {"call": app.state.calls, "lat": lat}
+    
+    cache = ResponseCache(max_bytes=1024 * 1024, max_entries=100, max_entry_bytes=64 * 1024)
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    app.state.cache = cache
+    return app
+
+
+def test_second_request_is_a_hit(cached_app):
+    with TestClient(cached_app) as client:
+        first = client.get("/api/open-data/items?lat=16.0")
+        second = client.get("/api/open-data/items?lat=16")
+    
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert cached_app.state.calls == 1
+
+
+def test_bypass_fetches_fresh_and_stores(cached_app):
+    with TestClient(cached_app) as client:
+        client.get("/api/open-data/items")
+        bypass = client.get("/api/open-data/items?nocache=1")
+        header_bypass = client.get("/api/open-data/items", headers={"Cache-Control": "no-cache"})
+        hit = client.get("/api/open-data/items")
+    
+    assert bypass.headers["x-cache"] == "BYPASS"
+    assert header_bypass.headers["x-cache"] == "BYPASS"
+    assert hit.headers["x-cache"] == "HIT"
+    assert hit.json()["call"] == 3
+    assert cached_app.state.calls == 3
+
+
+def test_authorized_requests_are_not_cached(cached_app):
+    with TestClient(cached_app) as client:
+        client.get("/api/open-data/items", headers={"Authorization": "Bearer token"})
+        response = client.get("/api/open-data/items", headers={"Authorization": "Bearer token"})
+    
+    assert "x-cache" not in response.headers
+    assert cached_app.state.calls == 2
+
+
+def test_stale_entry_served_while_refreshed(cached_app):
+    cache = cached_app.state.cache
+    with TestClient(cached_app) as client:
+        client.get("/api/open-data/items")
+        entry, _ = cache.lookup(_key("", "/api/open-data/items"))
+        entry.stored_at -= 61.0
+        
+        stale = client.get("/api/open-data/items")
+        for _ in range(100):
+            if cache.stats["refreshes"]:
+                break
+            time.sleep(0.01)
+        hit = client.get("/api/open-data/items")
+    
+    assert stale.headers["x-cache"] == "STALE"
+    assert stale.json()["call"] == 1
+    assert hit.headers["x-cache"] == "HIT"
+    assert hit.json()["call"] == 2
+
+
+def test_expired_entry_is_a_miss(cached_app):
+    with TestClient(cached_app) as client:
+        client.get("/api/open-data/items")
+        entry, _ = cached_app.state.cache.lookup(_key("", "/api/open-data/items"))
+        entry.stored_at -= 121.0
+        response = client.get("/api/open-data/items")
+    
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["call"] == 2
+
+
+def test_miss_carries_the_stored_etag(cached_app):
+    with TestClient(cached_app) as client:
+        miss = client.get("/api/open-data/items")
+        hit = client.get("/api/open-data/items")
+        not_modified = client.get("/api/open-data/items", headers={"If-None-Match": miss.headers["etag"]})
+    
+    assert miss.headers["x-cache"] == "MISS"
+    assert miss.headers["etag"] == hit.headers["etag"]
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_conditional_miss_gets_304(cached_app):
+    with TestClient(cached_app) as client:
+        etag = client.get("/api/open-data/items").headers["etag"]
+        cached_app.state.cache.clear()
+        cached_app.state.calls = 0
+        response = client.get("/api/open-data/items", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 304
+    assert response.headers["x-cache"] == "MISS"
+    assert response.headers["etag"] == etag
+    assert len(cached_app.state.cache) == 1
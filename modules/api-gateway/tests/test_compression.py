@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for content negotiation and variant ETags."""
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, negotiate_encoding, strip_variant, variant_etag
+from app.config import settings
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", True)
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0.1, gzip;q=0", "br"),
+    ("GZIP;q=0.8", "gzip"),
+    ("gzip;q=oops, br", "br"),
+])
+def test_negotiate_encoding(with_brotli, accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_negotiate_encoding_without_brotli(without_brotli):
+    assert negotiate_encoding("br, gzip") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+def test_negotiate_encoding_limited_to_available_variants(with_brotli):
+    assert negotiate_encoding("br, gzip", available=["gzip"]) == "gzip"
+    assert negotiate_encoding("br", available=["gzip"]) is None
+    assert negotiate_encoding("gzip", available=[]) is None
+
+
+def test_variant_etag_round_trip():
+    assert variant_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert variant_etag('W/"abc"', "br") == 'W/"abc-br"'
+    assert strip_variant('"abc-gzip"') == '"abc"'
+    assert strip_variant('W/"abc-br"') == '"abc"'
+    assert strip_variant('"abc"') == '"abc"'
+
+
+def test_middleware_compresses_and_tags_the_variant(without_brotli, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_ENABLED", True)
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_BYTES", 100)
+    app = FastAPI()
+    
+    @app.get("/items")
+    async def items():
+        return JSONResponse([{"name": "school"}] * 50, headers={"ETag": '"abc"'})
+    
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+    
+    app.add_middleware(CompressionMiddleware)
+    with TestClient(app) as client:
+        response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+        raw = client.get("/items", headers={"Accept-Encoding": "identity"})
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"abc-gzip"'
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.json() == raw.json()
+    assert response.num_bytes_downloaded < raw.num_bytes_downloaded
+    assert "content-encoding" not in raw.headers
+    assert raw.headers["etag"] == '"abc"'
+    assert "content-encoding" not in small.headers
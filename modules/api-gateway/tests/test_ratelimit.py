@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the rate limit middleware."""
+import uuid
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+
+from app.config import settings
+from app.ratelimit import APIKeyResolver, RateLimiter, RateLimitMiddleware
+from app.upstream import upstream
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 3)
+    limiter = RateLimiter()
+    limiter.lookups = []
+    
+    async def lookup(api_key):
+        limiter.lookups.append(api_key)
+        if api_key == "good":
+            return {"valid": True, "key_id": "k1", "rate_limit": 5}
+        return None
+    
+    limiter.resolver._lookup = lookup
+    return limiter
+
+
+@pytest.fixture
+def client(limiter):
+    app = RateLimitMiddleware(PlainTextResponse("ok"), limiter)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway")
+
+
+@pytest.mark.asyncio
+async def test_anonymous_requests_limited_per_ip(client):
+    statuses = [(await client.get("/api/v1/air-quality")).status_code for _ in range(4)]
+    
+    assert statuses == [200, 200, 200, 429]
+
+
+@pytest.mark.asyncio
+async def test_valid_key_uses_its_own_bucket(client, limiter):
+    responses = [await client.get("/api/v1/air-quality", headers={"X-API-Key": "good"}) for _ in range(6)]
+    
+    assert [r.status_code for r in responses] == [200] * 5 + [429]
+    assert responses[0].headers["ratelimit-policy"] == "5;w=3600"
+    assert limiter.lookups == ["good"]
+
+
+@pytest.mark.asyncio
+async def test_random_invalid_keys_are_charged_to_the_ip(client, limiter):
+    statuses = [
+        (await client.get("/api/v1/air-quality", headers={"X-API-Key": uuid.uuid4().hex})).status_code
+        for _ in range(5)
+    ]
+    
+    assert statuses == [401, 401, 401, 429, 429]
+    # Once the IP bucket is empty auth-service is no longer asked
+    assert len(limiter.lookups) == 3
+
+
+@pytest.mark.asyncio
+async def test_repeated_invalid_key_is_charged_to_the_ip(client, limiter):
+    statuses = [
+        (await client.get("/api/v1/air-quality", params={"api_key": "bad"})).status_code
+        for _ in range(4)
+    ]
+    
+    assert statuses == [401, 401, 401, 429]
+    assert limiter.lookups == ["bad"]
+
+
+@pytest.mark.asyncio
+async def test_resolver_sends_the_service_token(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_SERVICE_TOKEN", "shared-secret")
+    seen = []
+    
+    def handler(request):
+        seen.append(request.headers.get("x-service-token"))
+        return httpx.Response(200, json={"valid": True, "key_id": "k1", "rate_limit": 5})
+    
+    auth = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://auth")
+    monkeypatch.setattr(upstream, "get", lambda service: auth)
+    
+    info = await APIKeyResolver().resolve("good")
+    
+    assert info["key_id"] == "k1"
+    assert seen == ["shared-secret"]
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the upstream circuit breaker, bulkhead and resilient transport."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.resilience import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientTransport,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _breaker(clock, **kwargs):
+    options = dict(window=30.0, min_calls=4, failure_rate=0.5, open_seconds=15.0, half_open_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker("svc", clock=clock, **options)
+
+
+def _trip(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(failed=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_needs_min_calls_before_opening(clock):
+    breaker = _breaker(clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(failed=True)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(failed=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats == {"rejected": 1, "opened": 1}
+
+
+def test_breaker_stays_closed_below_failure_rate(clock):
+    breaker = _breaker(clock)
+    for failed in (False, True, False, False, True, False):
+        breaker.record(failed=failed)
+    
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.metrics()["failure_rate"] == pytest.approx(0.333)
+
+
+def test_breaker_forgets_outcomes_outside_the_window(clock):
+    breaker = _breaker(clock)
+    for _ in range(3):
+        breaker.record(failed=True)
+    clock.advance(31.0)
+    
+    assert breaker.metrics()["window_calls"] == 0
+    breaker.record(failed=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = _breaker(clock, slow_call_seconds=1.0)
+    for _ in range(4):
+        breaker.record(failed=False, duration=2.0)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_half_open_probes_close_the_circuit(clock):
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.advance(15.0)
+    
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # only half_open_calls probes at once
+    
+    breaker.record(failed=False)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens(clock):
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.advance(15.0)
+    
+    assert breaker.allow()
+    breaker.record(failed=True)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats["opened"] == 2
+    assert not breaker.allow()
+    clock.advance(15.0)
+    assert breaker.allow()
+
+
+def test_cancel_returns_the_probe_slot(clock):
+    breaker = _breaker(clock, half_open_calls=1)
+    _trip(breaker)
+    clock.advance(15.0)
+    
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()
+
+
+def test_late_result_while_open_is_ignored(clock):
+    breaker = _breaker(clock)
+    _trip(breaker)
+    
+    breaker.record(failed=False)
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.metrics()["window_calls"] == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queues_then_rejects():
+    bulkhead = Bulkhead("svc", max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    await bulkhead.acquire()
+    
+    waiter = asyncio.ensure_future(bulkhead.acquire())
+    await asyncio.sleep(0)
+    assert bulkhead.waiting == 1
+    
+    with pytest.raises(BulkheadFullError):
+        await bulkhead.acquire()
+    assert bulkhead.stats["rejected"] == 1
+    
+    bulkhead.release()
+    await waiter
+    assert bulkhead.metrics()["active"] == 1
+    assert bulkhead.waiting == 0
+    bulkhead.release()
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queue_deadline():
+    bulkhead = Bulkhead("svc", max_concurrent=1, max_queue=5, queue_timeout=0.01)
+    await bulkhead.acquire()
+    
+    with pytest.raises(BulkheadFullError):
+        await bulkhead.acquire()
+    
+    assert bulkhead.stats["timed_out"] == 1
+    assert bulkhead.waiting == 0
+    assert bulkhead.active == 1
+
+
+def _client(handler, breaker=None, bulkhead=None):
+    transport = ResilientTransport(httpx.MockTransport(handler), breaker, bulkhead)
+    return httpx.AsyncClient(transport=transport, base_url="http://upstream")
+
+
+@pytest.mark.asyncio
+async def test_transport_records_5xx_and_fails_fast_when_open(clock):
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+    
+    breaker = _breaker(clock)
+    async with _client(handler, breaker=breaker) as client:
+        for _ in range(4):
+            assert (await client.get("/items")).status_code == 503
+        with pytest.raises(CircuitOpenError):
+            await client.get("/items")
+    
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_transport_records_transport_errors(clock):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+    
+    breaker = _breaker(clock, min_calls=1)
+    async with _client(handler, breaker=breaker) as client:
+        with pytest.raises(httpx.ConnectError):
+            await client.get("/items")
+    
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_transport_holds_bulkhead_slot_until_body_is_closed():
+    bulkhead = Bulkhead("svc", max_concurrent=1, max_queue=0)
+    
+    def handler(request):
+        return httpx.Response(200, stream=httpx.ByteStream(b"[1,2,3]"))
+    
+    async with _client(handler, bulkhead=bulkhead) as client:
+        async with client.stream("GET", "/items") as response:
+            assert bulkhead.active == 1
+            with pytest.raises(BulkheadFullError):
+                await client.get("/items")
+            assert await response.aread() == b"[1,2,3]"
+        assert bulkhead.active == 0
+        assert (await client.get("/items")).status_code == 200
+    
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejection_gives_back_the_probe(clock):
+    breaker = _breaker(clock, half_open_calls=1)
+    bulkhead = Bulkhead("svc", max_concurrent=1, max_queue=0)
+    _trip(breaker)
+    clock.advance(15.0)
+    await bulkhead.acquire()
+    
+    async with _client(lambda request: httpx.Response(200), breaker, bulkhead) as client:
+        with pytest.raises(BulkheadFullError):
+            await client.get("/items")
+        bulkhead.release()
+        assert (await client.get("/items")).status_code == 200
+    
+    assert breaker.state == CircuitBreaker.CLOSED
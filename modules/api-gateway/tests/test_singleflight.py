@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for single-flight request coalescing."""
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await release.wait()
+        return {"id": 1}
+    
+    waiters = [asyncio.ensure_future(flight.do("school:1", fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flight.metrics()["inflight"] == 1
+    release.set()
+    
+    assert await asyncio.gather(*waiters) == [{"id": 1}] * 5
+    assert len(calls) == 1
+    assert flight.metrics() == {"calls": 1, "shared": 4, "errors": 0, "inflight": 0}
+
+
+@pytest.mark.asyncio
+async def test_key_is_forgotten_after_the_call():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+    
+    assert await flight.do("k", fetch) == 1
+    assert await flight.do("k", fetch) == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    
+    async def fetch(value):
+        await asyncio.sleep(0)
+        return value
+    
+    results = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+    
+    assert results == ["a", "b"]
+    assert flight.stats["calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    
+    async def fetch():
+        await release.wait()
+        raise RuntimeError("upstream down")
+    
+    waiters = [asyncio.ensure_future(flight.do("k", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.metrics()["errors"] == 1
+    assert flight.metrics()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    
+    async def fetch():
+        await release.wait()
+        return "done"
+    
+    first = asyncio.ensure_future(flight.do("k", fetch))
+    second = asyncio.ensure_future(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    
+    assert await second == "done"
+    assert first.cancelled()
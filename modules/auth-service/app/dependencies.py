@@ -18,11 +18,13 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 """
 
 """Dependencies for FastAPI dependency injection."""
-from typing import Annotated
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import Annotated, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.services.auth import AuthService
 from app.services.user import UserService
@@ -121,3 +123,16 @@ def require_any_role(*roles: str):
             )
         return current_user
     return role_checker
+
+
+async def require_service_token(
+    x_service_token: Annotated[Optional[str], Header()] = None
+) -> None:
+    """Allow only internal callers (API Gateway) sending the shared service token."""
+    if not x_service_token or not secrets.compare_digest(
+        x_service_token.encode(), settings.INTERNAL_SERVICE_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Internal service token required"
+        )
@@ -29,6 +29,7 @@ from app.dependencies import (
     get_user_service,
     get_current_active_user,
     require_role,
+    require_service_token,
 )
 from app.schemas import (
     UserCreate,
@@ -40,6 +41,8 @@ from app.schemas import (
     MessageResponse,
     APIKeyCreate,
     APIKeyResponse,
+    APIKeyValidateRequest,
+    APIKeyValidation,
     UserInDB,
     FCMTokenCreate,
     FCMTokenResponse,
@@ -52,6 +55,7 @@ from app.services.user import UserService
 from app.services.fcm import FCMService
 from app.models import User
 from app.core.firebase import init_firebase
+from app.messaging import user_event_publisher
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -61,8 +65,10 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     init_firebase()  # Initialize Firebase on startup
+    await user_event_publisher.connect()  # user.updated / user.deleted for gateway caches
     yield
     # Shutdown
+    await user_event_publisher.close()
     await close_db()
 
 
@@ -324,6 +330,37 @@ async def create_api_key(
     )
 
 
+@app.post(
+    "/api/v1/api-keys/validate",
+    response_model=APIKeyValidation,
+    tags=["API Keys"],
+    dependencies=[Depends(require_service_token)],
+)
+async def validate_api_key(
+    key_data: APIKeyValidateRequest,
+    auth_service: Annotated[AuthService, Depends(get_auth_service)],
+):
+    """
+    Validate an API key.
+    
+    Used by the API Gateway to resolve keys and their rate limits
+    (results are cached there). Internal only: requires the
+    X-Service-Token header matching INTERNAL_SERVICE_TOKEN.
+    """
+    api_key = await auth_service.validate_api_key(key_data.api_key)
+    if api_key is None:
+        return APIKeyValidation(valid=False)
+    
+    return APIKeyValidation(
+        valid=True,
+        key_id=api_key.id,
+        user_id=api_key.user_id,
+        scopes=api_key.scopes,
+        rate_limit=api_key.rate_limit,
+        expires_at=api_key.expires_at,
+    )
+
+
 # ================================
 # FCM Token Management
 # ================================
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""RabbitMQ publisher for user lifecycle events (consumed by the API Gateway)."""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+try:
+    import aio_pika
+    from aio_pika import ExchangeType, Message, DeliveryMode
+    RABBITMQ_AVAILABLE = True
+except ImportError:
+    RABBITMQ_AVAILABLE = False
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+AUTH_EVENTS_EXCHANGE = "auth.events"
+
+
+class UserEventPublisher:
+    """Publish user.updated / user.deleted so caches of user status can be invalidated."""
+    
+    def __init__(self):
+        self.connection: Optional["aio_pika.RobustConnection"] = None
+        self.channel: Optional["aio_pika.Channel"] = None
+        self.exchange: Optional["aio_pika.Exchange"] = None
+    
+    async def connect(self) -> bool:
+        """Connect to RabbitMQ (events are skipped if unavailable)."""
+        if not RABBITMQ_AVAILABLE:
+            logger.warning("aio-pika not installed. User events disabled.")
+            return False
+        
+        try:
+            self.connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
+            self.channel = await self.connection.channel()
+            self.exchange = await self.channel.declare_exchange(
+                AUTH_EVENTS_EXCHANGE, ExchangeType.FANOUT, durable=True
+            )
+            logger.info("Connected to RabbitMQ for user events")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to connect to RabbitMQ: {e}")
+            return False
+    
+    async def close(self):
+        """Close connection."""
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+            self.exchange = None
+    
+    async def publish(self, event_type: str, data: Dict[str, Any]):
+        """Publish a user event (never raises)."""
+        if not self.exchange:
+            return
+        
+        try:
+            message_body = {
+                "event_type": event_type,
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "source": "auth-service",
+                "data": data,
+            }
+            await self.exchange.publish(
+                Message(
+                    json.dumps(message_body, default=str).encode(),
+                    delivery_mode=DeliveryMode.PERSISTENT,
+                    content_type="application/json",
+                ),
+                routing_key=event_type,
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish {event_type}: {e}")
+    
+    async def user_updated(self, user):
+        """Publish user.updated with the fields gateways cache."""
+        await self.publish("user.updated", {
+            "user_id": str(user.id),
+            "role": user.role,
+            "is_active": user.is_active,
+        })
+    
+    async def user_deleted(self, user_id):
+        """Publish user.deleted."""
+        await self.publish("user.deleted", {"user_id": str(user_id)})
+
+
+# Global publisher
+user_event_publisher = UserEventPublisher()
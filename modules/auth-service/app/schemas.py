@@ -167,6 +167,21 @@ class APIKeyInfo(BaseModel):
         from_attributes = True
 
 
+class APIKeyValidateRequest(BaseModel):
+    """API key validation request (used by the gateway)."""
+    api_key: str
+
+
+class APIKeyValidation(BaseModel):
+    """API key validation result."""
+    valid: bool
+    key_id: Optional[UUID4] = None
+    user_id: Optional[UUID4] = None
+    scopes: Optional[str] = None
+    rate_limit: Optional[int] = None  # Requests per hour
+    expires_at: Optional[datetime] = None
+
+
 # ================================
 # FCM Token Schemas
 # ================================
@@ -34,6 +34,7 @@ from app.core.security import (
     decode_token,
     generate_api_key,
     hash_api_key,
+    verify_api_key,
 )
 from app.core.config import settings
 
@@ -259,6 +260,23 @@ class AuthService:
         
         return api_key, plain_key  # Return plain key only once!
     
+    async def validate_api_key(self, plain_key: str) -> Optional[APIKey]:
+        """Find the active, unexpired API key matching a plain key."""
+        result = await self.db.execute(
+            select(APIKey).where(
+                APIKey.key_prefix == plain_key[:8],
+                APIKey.is_active == True
+            )
+        )
+        
+        for api_key in result.scalars().all():
+            if api_key.expires_at and api_key.expires_at < datetime.utcnow():
+                continue
+            if verify_api_key(plain_key, api_key.key_hash):
+                return api_key
+        
+        return None
+    
     async def revoke_refresh_token(self, user_id: str, token_id: str):
         """Revoke a refresh token."""
         result = await self.db.execute(
@@ -26,6 +26,7 @@ from fastapi import HTTPException, status
 
 from app.models import User
 from app.schemas import UserUpdate
+from app.messaging import user_event_publisher
 
 
 class UserService:
@@ -94,6 +95,8 @@ class UserService:
         await self.db.commit()
         await self.db.refresh(user)
         
+        await user_event_publisher.user_updated(user)
+        
         return user
     
     async def delete_user(self, user_id: UUID):
@@ -108,6 +111,8 @@ class UserService:
         
         user.is_active = False
         await self.db.commit()
+        
+        await user_event_publisher.user_deleted(user.id)
     
     async def verify_user(self, user_id: UUID):
         """Verify user account."""
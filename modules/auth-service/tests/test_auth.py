@@ -21,6 +21,8 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 import pytest
 from httpx import AsyncClient
 
+from app.core.config import settings
+
 
 @pytest.mark.asyncio
 async def test_register_user(client: AsyncClient):
@@ -156,3 +158,80 @@ async def test_get_current_user(client: AsyncClient):
     data = response.json()
     assert data["email"] == "current@example.com"
     assert data["username"] == "currentuser"
+
+
+@pytest.mark.asyncio
+async def test_validate_api_key(client: AsyncClient):
+    """Test API key validation (used by the gateway rate limiter)."""
+    # Register developer and login
+    await client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": "dev@example.com",
+            "username": "devuser",
+            "password": "testpass123",
+            "role": "developer"
+        }
+    )
+    
+    login_response = await client.post(
+        "/api/v1/auth/login",
+        json={
+            "email": "dev@example.com",
+            "password": "testpass123"
+        }
+    )
+    
+    token = login_response.json()["access_token"]
+    
+    # Create API key
+    key_response = await client.post(
+        "/api/v1/api-keys",
+        json={"name": "scraper", "rate_limit": 500},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    plain_key = key_response.json()["api_key"]
+    
+    service_headers = {"X-Service-Token": settings.INTERNAL_SERVICE_TOKEN}
+    
+    # Validate it
+    response = await client.post(
+        "/api/v1/api-keys/validate",
+        json={"api_key": plain_key},
+        headers=service_headers
+    )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["valid"] is True
+    assert data["rate_limit"] == 500
+    assert data["key_id"] == key_response.json()["id"]
+    
+    # Unknown key
+    response = await client.post(
+        "/api/v1/api-keys/validate",
+        json={"api_key": plain_key[:-1] + ("x" if plain_key[-1] != "x" else "y")},
+        headers=service_headers
+    )
+    
+    assert response.status_code == 200
+    assert response.json()["valid"] is False
+
+
+@pytest.mark.asyncio
+async def test_validate_api_key_requires_service_token(client: AsyncClient):
+    """Test API key validation is closed to callers without the service token."""
+    response = await client.post(
+        "/api/v1/api-keys/validate",
+        json={"api_key": "gemap_unknown"}
+    )
+    
+    assert response.status_code == 403
+    
+    response = await client.post(
+        "/api/v1/api-keys/validate",
+        json={"api_key": "gemap_unknown"},
+        headers={"X-Service-Token": "wrong-token"}
+    )
+    
+    assert response.status_code == 403
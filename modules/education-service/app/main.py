@@ -19,6 +19,7 @@ along with this program. If not, see <https://www.gnu.org/licenses/>.
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from shared.middleware import ETagMiddleware
 from app.core.config import settings
 from app.api import schools_router
 from app.api.courses import router as courses_router
@@ -28,6 +29,9 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json"
 )
 
+# Strong ETags / If-None-Match -> 304 for polling clients
+app.add_middleware(ETagMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Streaming anomaly detection for sensor readings
+Per-sensor EWMA mean/variance kept in flat typed arrays, O(1) per reading
+"""
+
+import math
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+
+
+class SensorAnomalyDetector:
+    """
+    Online detector for spikes, stuck sensors and dropouts
+    
+    Each (sensor, metric) series owns one slot in a set of parallel arrays
+    (EWMA mean, EWMA variance, last value, reading count, repeat count),
+    each sensor owns one slot for its last-seen time. Nothing is re-scanned:
+    a reading touches only its own slots.
+    
+    Spikes and stuck values are judged per metric: observe() reports which
+    metrics of a message should be discarded, not whether to drop it whole.
+    """
+    
+    def __init__(
+        self,
+        alpha: float = 0.1,
+        spike_z: float = 4.0,
+        min_std: float = 1.0,
+        warmup: int = 10,
+        stuck_readings: int = 12,
+        stuck_epsilon: float = 1e-6,
+        stuck_ignore_zero: bool = True,
+        stuck_ignore_metrics: Iterable[str] = (),
+        dropout_seconds: float = 900.0
+    ):
+        """
+        Args:
+            alpha: EWMA smoothing factor (0-1, higher = faster adaptation)
+            spike_z: Deviation (in EWMA std) above which a reading is a spike
+            min_std: Lower bound on the std, so near-constant series don't flag noise
+            warmup: Readings per series before spikes are checked
+            stuck_readings: Consecutive identical readings that mark a sensor as stuck
+            stuck_epsilon: Max difference for two readings to count as identical
+            stuck_ignore_zero: Don't count exact zeros as stuck (gases below the
+                detection limit legitimately report 0.0 for hours)
+            stuck_ignore_metrics: Metrics never checked for stuck values
+            dropout_seconds: Silence after which a sensor is considered dropped out
+        """
+        self.alpha = alpha
+        self.spike_z = spike_z
+        self.min_std = min_std
+        self.warmup = warmup
+        self.stuck_readings = stuck_readings
+        self.stuck_epsilon = stuck_epsilon
+        self.stuck_ignore_zero = stuck_ignore_zero
+        self.stuck_ignore_metrics = frozenset(stuck_ignore_metrics)
+        self.dropout_seconds = dropout_seconds
+        
+        # Series state: (sensor_id, metric) -> slot
+        self._series: Dict[Tuple[str, str], int] = {}
+        self._mean = array('d')
+        self._var = array('d')
+        self._last = array('d')
+        self._count = array('L')
+        self._repeats = array('L')
+        
+        # Sensor state: sensor_id -> slot
+        self._sensors: Dict[str, int] = {}
+        self._sensor_ids: List[str] = []
+        self._last_seen = array('d')
+        self._dropped = array('B')
+    
+    def __len__(self) -> int:
+        return len(self._sensors)
+    
+    def _sensor_slot(self, sensor_id: str) -> int:
+        slot = self._sensors.get(sensor_id)
+        if slot is None:
+            slot = len(self._sensor_ids)
+            self._sensors[sensor_id] = slot
+            self._sensor_ids.append(sensor_id)
+            self._last_seen.append(0.0)
+            self._dropped.append(0)
+        return slot
+    
+    def _series_slot(self, key: Tuple[str, str]) -> int:
+        slot = self._series.get(key)
+        if slot is None:
+            slot = len(self._mean)
+            self._series[key] = slot
+            self._mean.append(0.0)
+            self._var.append(0.0)
+            self._last.append(math.nan)
+            self._count.append(0)
+            self._repeats.append(0)
+        return slot
+    
+    def observe(
+        self,
+        sensor_id: str,
+        readings: Dict[str, Any],
+        now: Optional[float] = None
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Update state with one message and check it for anomalies
+        
+        Args:
+            sensor_id: Sensor identifier
+            readings: Metric name -> value (non-numeric values are ignored)
+            now: Arrival time (epoch seconds), defaults to time.time()
+            
+        Returns:
+            (rejected, anomalies) - rejected lists the metrics whose value should
+            be discarded (spike or stuck series); anomalies lists newly detected events
+        """
+        now = time.time() if now is None else now
+        anomalies: List[Dict[str, Any]] = []
+        rejected: List[str] = []
+        
+        sensor = self._sensor_slot(sensor_id)
+        last_seen = self._last_seen[sensor]
+        gap = now - last_seen if last_seen else 0.0
+        resumed = gap > self.dropout_seconds
+        if resumed:
+            anomalies.append({
+                'type': 'dropout',
+                'sensor_id': sensor_id,
+                'gap_seconds': round(gap, 1),
+                'recovered': True
+            })
+        self._last_seen[sensor] = now
+        self._dropped[sensor] = 0
+        
+        for metric, raw in readings.items():
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(value):
+                continue
+            
+            slot = self._series_slot((sensor_id, metric))
+            if resumed:
+                # State is stale after a dropout: warm up again
+                self._count[slot] = 0
+                self._repeats[slot] = 0
+            
+            count = self._count[slot]
+            if count == 0:
+                self._mean[slot] = value
+                self._var[slot] = 0.0
+                self._last[slot] = value
+                self._count[slot] = 1
+                continue
+            
+            # Stuck: the same value over and over
+            if self._stuck_candidate(metric, value, self._last[slot]):
+                repeats = self._repeats[slot] + 1
+                self._repeats[slot] = repeats
+                if repeats >= self.stuck_readings:
+                    rejected.append(metric)
+                    if repeats == self.stuck_readings:
+                        anomalies.append({
+                            'type': 'stuck',
+                            'sensor_id': sensor_id,
+                            'metric': metric,
+                            'value': value,
+                            'repeats': repeats
+                        })
+                    continue
+            else:
+                self._repeats[slot] = 0
+            self._last[slot] = value
+            
+            mean = self._mean[slot]
+            std = max(math.sqrt(self._var[slot]), self.min_std)
+            diff = value - mean
+            
+            # Spike: too far from the running mean
+            if count >= self.warmup and abs(diff) > self.spike_z * std:
+                rejected.append(metric)
+                anomalies.append({
+                    'type': 'spike',
+                    'sensor_id': sensor_id,
+                    'metric': metric,
+                    'value': value,
+                    'expected': round(mean, 2),
+                    'z_score': round(diff / std, 2)
+                })
+                # Update with the clipped value so one spike can't drag the baseline,
+                # while a real level shift is still followed over a few readings
+                diff = math.copysign(self.spike_z * std, diff)
+            
+            increment = self.alpha * diff
+            self._mean[slot] = mean + increment
+            self._var[slot] = (1.0 - self.alpha) * (self._var[slot] + diff * increment)
+            self._count[slot] = count + 1
+        
+        return rejected, anomalies
+    
+    def _stuck_candidate(self, metric: str, value: float, last: float) -> bool:
+        """Whether value repeats the previous reading of a series checked for stuck values"""
+        if metric in self.stuck_ignore_metrics:
+            return False
+        if self.stuck_ignore_zero and value == 0.0:
+            return False
+        return abs(value - last) <= self.stuck_epsilon
+    
+    def sweep_dropouts(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Report sensors that went silent (each dropout is reported once)
+        
+        Args:
+            now: Current time (epoch seconds), defaults to time.time()
+            
+        Returns:
+            Dropout anomalies for sensors silent longer than dropout_seconds
+        """
+        now = time.time() if now is None else now
+        anomalies = []
+        for slot, sensor_id in enumerate(self._sensor_ids):
+            last_seen = self._last_seen[slot]
+            if self._dropped[slot] or not last_seen:
+                continue
+            silent = now - last_seen
+            if silent > self.dropout_seconds:
+                self._dropped[slot] = 1
+                anomalies.append({
+                    'type': 'dropout',
+                    'sensor_id': sensor_id,
+                    'silent_seconds': round(silent, 1),
+                    'recovered': False
+                })
+        return anomalies
+    
+    def state(self, sensor_id: str, metric: str) -> Optional[Dict[str, float]]:
+        """Current EWMA state of one series (for debugging/inspection)"""
+        slot = self._series.get((sensor_id, metric))
+        if slot is None:
+            return None
+        return {
+            'mean': self._mean[slot],
+            'std': math.sqrt(self._var[slot]),
+            'count': self._count[slot],
+            'repeats': self._repeats[slot]
+        }
+
+
+def create_detector() -> SensorAnomalyDetector:
+    """Build a detector from settings"""
+    return SensorAnomalyDetector(
+        alpha=settings.ANOMALY_EWMA_ALPHA,
+        spike_z=settings.ANOMALY_SPIKE_Z,
+        min_std=settings.ANOMALY_MIN_STD,
+        warmup=settings.ANOMALY_WARMUP_READINGS,
+        stuck_readings=settings.ANOMALY_STUCK_READINGS,
+        stuck_epsilon=settings.ANOMALY_STUCK_EPSILON,
+        stuck_ignore_zero=settings.ANOMALY_STUCK_IGNORE_ZERO,
+        stuck_ignore_metrics=settings.ANOMALY_STUCK_IGNORE_METRICS,
+        dropout_seconds=settings.ANOMALY_DROPOUT_SECONDS
+    )
@@ -70,6 +70,21 @@ class Settings(BaseSettings):
     AQI_WARNING_THRESHOLD: float = 100.0  # AQI > 100 = unhealthy
     AQI_CRITICAL_THRESHOLD: float = 150.0  # AQI > 150 = very unhealthy
     
+    # Sensor Anomaly Detection (streaming EWMA per sensor/metric)
+    ANOMALY_DETECTION_ENABLED: bool = True
+    ANOMALY_METRICS: List[str] = ["aqi", "pm25", "pm10", "co", "no2", "o3", "so2"]
+    ANOMALY_EWMA_ALPHA: float = 0.1
+    ANOMALY_SPIKE_Z: float = 4.0          # deviation in EWMA std that counts as a spike
+    ANOMALY_MIN_STD: float = 1.0
+    ANOMALY_WARMUP_READINGS: int = 10
+    ANOMALY_STUCK_READINGS: int = 12      # consecutive identical readings
+    ANOMALY_STUCK_EPSILON: float = 1e-6
+    ANOMALY_STUCK_IGNORE_ZERO: bool = True  # 0.0 below the detection limit is not a stuck sensor
+    ANOMALY_STUCK_IGNORE_METRICS: List[str] = []
+    ANOMALY_PRIMARY_METRIC: str = "aqi"     # message is dropped only when this metric is rejected
+    ANOMALY_DROPOUT_SECONDS: float = 900.0  # 15 minutes without data
+    ANOMALY_SWEEP_INTERVAL: int = 60
+    
     # Default locations to fetch (Vietnam cities)
     DEFAULT_LOCATIONS: List[dict] = [
         {"name": "Da Nang", "lat": 16.0544, "lon": 108.2022},
@@ -27,6 +27,8 @@ from contextlib import asynccontextmanager
 import logging
 from datetime import datetime
 
+from shared.middleware import ETagMiddleware
+
 from .config import settings
 from .routes import air_quality_router, weather_router
 
@@ -89,6 +91,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Strong ETags / If-None-Match -> 304 for polling clients
+app.add_middleware(ETagMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
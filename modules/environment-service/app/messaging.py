@@ -37,6 +37,7 @@ except ImportError:
     MQTT_AVAILABLE = False
 
 from .config import settings
+from .anomaly import SensorAnomalyDetector, create_detector
 
 logger = logging.getLogger(__name__)
 
@@ -143,6 +144,15 @@ class RabbitMQPublisher:
         elif aqi >= settings.AQI_WARNING_THRESHOLD:
             await self.publish_alert("warning", "air_quality", data)
     
+    async def publish_sensor_anomaly(self, anomaly: Dict[str, Any]):
+        """Publish sensor anomaly event (spike, stuck sensor, dropout)"""
+        await self.publish_event(
+            "environment.events",
+            f"sensor.anomaly.{anomaly['type']}",
+            "sensor.anomaly_detected",
+            anomaly
+        )
+    
     async def publish_weather_update(self, data: Dict[str, Any]):
         """Publish weather update event"""
         await self.publish_event(
@@ -208,6 +218,10 @@ class MQTTHandler:
         self.rabbitmq = rabbitmq_publisher
         self._running = False
         self._task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        self.detector: Optional[SensorAnomalyDetector] = (
+            create_detector() if settings.ANOMALY_DETECTION_ENABLED else None
+        )
     
     async def start_subscriber(self):
         """Start MQTT subscriber for sensor data"""
@@ -217,17 +231,20 @@ class MQTTHandler:
         
         self._running = True
         self._task = asyncio.create_task(self._subscribe_loop())
+        if self.detector:
+            self._sweep_task = asyncio.create_task(self._dropout_sweep_loop())
         logger.info("MQTT subscriber started")
     
     async def stop_subscriber(self):
         """Stop MQTT subscriber"""
         self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        for task in (self._task, self._sweep_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
         logger.info("MQTT subscriber stopped")
     
     async def _subscribe_loop(self):
@@ -281,10 +298,52 @@ class MQTTHandler:
         elif "energy" in topic:
             await self._handle_energy_sensor(payload)
     
+    async def _dropout_sweep_loop(self):
+        """Periodically report sensors that stopped sending data"""
+        while self._running:
+            await asyncio.sleep(settings.ANOMALY_SWEEP_INTERVAL)
+            for anomaly in self.detector.sweep_dropouts():
+                logger.warning(f"Sensor dropout: {anomaly['sensor_id']} silent for {anomaly['silent_seconds']}s")
+                await self._publish_anomaly(anomaly)
+    
+    async def _publish_anomaly(self, anomaly: Dict[str, Any]):
+        if self.rabbitmq:
+            await self.rabbitmq.publish_sensor_anomaly(anomaly)
+    
+    async def _check_anomalies(self, sensor_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Run the streaming detector on one reading
+        
+        Returns:
+            The reading to forward, without its rejected metrics, or None when the
+            primary metric was rejected and the whole reading is filtered out
+        """
+        readings = {metric: data[metric] for metric in settings.ANOMALY_METRICS if metric in data}
+        rejected, anomalies = self.detector.observe(sensor_id, readings)
+        
+        for anomaly in anomalies:
+            anomaly['location_id'] = data.get('location_id')
+            await self._publish_anomaly(anomaly)
+        
+        if not rejected:
+            return data
+        if settings.ANOMALY_PRIMARY_METRIC in rejected:
+            logger.warning(f"Filtered anomalous reading from {sensor_id} ({', '.join(rejected)})")
+            return None
+        logger.warning(f"Removed anomalous metrics from {sensor_id} reading: {', '.join(rejected)}")
+        return {key: value for key, value in data.items() if key not in rejected}
+    
     async def _handle_air_quality_sensor(self, data: Dict[str, Any]):
         """Process air quality sensor data"""
         logger.info(f"Processing AQI data: {data.get('location_id', 'unknown')}")
         
+        # Drop spikes / stuck readings before they reach clustering and dashboards
+        if self.detector:
+            sensor_id = str(data.get('sensor_id') or data.get('location_id', 'unknown'))
+            data = await self._check_anomalies(sensor_id, data)
+            if data is None:
+                return
+        
         # TODO: Store to database
         
         # Publish to RabbitMQ for other services
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+Copyright (C) 2025 DTU-DZ2 Team
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""Tests for the streaming sensor anomaly detector."""
+from app.anomaly import SensorAnomalyDetector
+
+
+def _detector(**kwargs):
+    options = dict(alpha=0.1, spike_z=4.0, min_std=1.0, warmup=10,
+                   stuck_readings=5, dropout_seconds=900.0)
+    options.update(kwargs)
+    return SensorAnomalyDetector(**options)
+
+
+def _warm_up(detector, sensor_id='s1', start=0.0, n=20):
+    for i in range(n):
+        rejected, anomalies = detector.observe(sensor_id, {'aqi': 50 + i % 3}, now=start + i)
+        assert rejected == [] and anomalies == []
+    return start + n
+
+
+def test_spike_is_rejected_and_does_not_drag_baseline():
+    detector = _detector()
+    now = _warm_up(detector)
+    
+    rejected, anomalies = detector.observe('s1', {'aqi': 400}, now=now)
+    
+    assert rejected == ['aqi']
+    assert [a['type'] for a in anomalies] == ['spike']
+    assert anomalies[0]['metric'] == 'aqi'
+    assert detector.state('s1', 'aqi')['mean'] < 60
+    assert detector.observe('s1', {'aqi': 51}, now=now + 1) == ([], [])
+
+
+def test_spike_waits_for_warmup():
+    detector = _detector()
+    detector.observe('s1', {'aqi': 50}, now=0)
+    
+    assert detector.observe('s1', {'aqi': 400}, now=1) == ([], [])
+
+
+def test_stuck_metric_is_rejected_alone_and_reported_once():
+    detector = _detector()
+    reports = []
+    for i in range(12):
+        rejected, anomalies = detector.observe('s1', {'aqi': 50 + i % 3, 'pm25': 12.5}, now=i)
+        assert 'aqi' not in rejected
+        reports.extend(anomalies)
+    
+    assert rejected == ['pm25']
+    assert [(a['type'], a['metric']) for a in reports] == [('stuck', 'pm25')]
+    
+    rejected, _ = detector.observe('s1', {'aqi': 50, 'pm25': 13.0}, now=12)
+    assert rejected == []
+
+
+def test_constant_zero_is_not_stuck():
+    detector = _detector()
+    filtered = 0
+    for i in range(40):
+        rejected, anomalies = detector.observe('s1', {'aqi': 50 + i % 7, 'so2': 0.0}, now=i)
+        filtered += bool(rejected)
+        assert anomalies == []
+    
+    assert filtered == 0
+
+
+def test_stuck_check_skips_ignored_metrics():
+    detector = _detector(stuck_ignore_metrics=['pm25'])
+    for i in range(12):
+        rejected, anomalies = detector.observe('s1', {'pm25': 12.5}, now=i)
+        assert rejected == [] and anomalies == []
+
+
+def test_dropout_reported_once_and_on_recovery():
+    detector = _detector()
+    now = _warm_up(detector)
+    _warm_up(detector, sensor_id='s2', start=now + 500)
+    
+    assert detector.sweep_dropouts(now=now + 100) == []
+    
+    silent = detector.sweep_dropouts(now=now + 1000)
+    assert [(a['sensor_id'], a['recovered']) for a in silent] == [('s1', False)]
+    assert detector.sweep_dropouts(now=now + 1001) == []
+    
+    rejected, anomalies = detector.observe('s1', {'aqi': 400}, now=now + 2000)
+    assert rejected == []
+    assert [(a['type'], a['recovered']) for a in anomalies] == [('dropout', True)]
+    assert detector.state('s1', 'aqi')['count'] == 1
@@ -22,6 +22,7 @@ Provides NGSI-LD entities, DCAT-AP catalog, and multiple export formats
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from shared.middleware import ETagMiddleware
 from app.core.config import settings
 from app.api import entities, catalog, context, export
 
@@ -55,6 +56,9 @@ app = FastAPI(
     """
 )
 
+# Strong ETags / If-None-Match -> 304 for polling clients
+app.add_middleware(ETagMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +36,7 @@ class EventTypes(str, Enum):
     WEATHER_UPDATED = "weather.updated"
     WEATHER_ALERT = "weather.alert"
     SENSOR_DATA_RECEIVED = "sensor.data_received"
+    SENSOR_ANOMALY_DETECTED = "sensor.anomaly_detected"
     
     # Education Events
     SCHOOL_CREATED = "school.created"
@@ -46,6 +47,10 @@ class EventTypes(str, Enum):
     COURSE_UPDATED = "course.updated"
     ENROLLMENT_CREATED = "enrollment.created"
     
+    # User Events (auth-service)
+    USER_UPDATED = "user.updated"
+    USER_DELETED = "user.deleted"
+    
     # AI Events
     AI_CLUSTERING_REQUESTED = "ai.clustering.requested"
     AI_CLUSTERING_COMPLETED = "ai.clustering.completed"
@@ -184,7 +189,7 @@ class AICorrelationTask:
     task_id: str
     environment_data_ids: list
     education_data_ids: list
-    analysis_type: str  # "pearson", "spearman", "regression"
+    analysis_type: str  # "pearson", "spearman", "matrix", "regression"
     parameters: Optional[Dict[str, Any]] = None
     
     def to_dict(self) -> Dict[str, Any]:
@@ -45,6 +45,7 @@ class QueueConfig:
 class Exchanges:
     ENVIRONMENT_EVENTS = "environment.events"
     EDUCATION_EVENTS = "education.events"
+    AUTH_EVENTS = "auth.events"
     AI_TASKS = "ai.tasks"
     NOTIFICATIONS = "notifications"
     EXPORT_TASKS = "export.tasks"
@@ -0,0 +1,29 @@
+#
+# GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+# Copyright (C) 2025 DTU-DZ2 Team
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Shared ASGI middleware for GreenEduMap services
+"""
+
+from .etag import ETagMiddleware, compute_etag, etag_matches
+
+__all__ = [
+    "ETagMiddleware",
+    "compute_etag",
+    "etag_matches"
+]
@@ -0,0 +1,132 @@
+#
+# GreenEduMap-DTUDZ - Open Data Platform for Green Urban Development
+# Copyright (C) 2025 DTU-DZ2 Team
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Conditional GET support (strong ETags, 304 Not Modified) for the FastAPI services
+"""
+import hashlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Bodies larger than this are streamed through without an ETag
+ETAG_MAX_BODY_BYTES = 8 * 1024 * 1024
+
+# Headers kept on a 304 (RFC 9110 15.4.5)
+NOT_MODIFIED_HEADERS = {b"etag", b"cache-control", b"content-location", b"date", b"expires", b"vary", b"last-modified"}
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag from the response body hash"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as used for GET)"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.strip().removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ETagMiddleware:
+    """
+    Strong ETag on 200 GET responses + 304 Not Modified for matching If-None-Match
+    
+    The body is buffered to hash it (JSON responses are built in memory anyway).
+    Responses that already carry an ETag keep it; bodies over ETAG_MAX_BODY_BYTES
+    are passed through untagged.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        size = 0
+        mode = "buffer"  # buffer | pass | drop (body of a 304)
+        
+        async def send_not_modified(message: Message):
+            headers = [(k, v) for k, v in message.get("headers", []) if k.lower() in NOT_MODIFIED_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+        
+        async def send_wrapper(message: Message):
+            nonlocal start, size, mode
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if message["status"] != 200:
+                    mode = "pass"
+                elif "etag" in headers:
+                    if if_none_match and etag_matches(if_none_match, headers["etag"]):
+                        mode = "drop"
+                        await send_not_modified(message)
+                        return
+                    mode = "pass"
+                else:
+                    start = message
+                    return
+                await send(message)
+                return
+            
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            more_body = message.get("more_body", False)
+            if mode == "pass":
+                await send(message)
+                return
+            if mode == "drop":
+                if not more_body:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            
+            body = message.get("body", b"")
+            chunks.append(body)
+            size += len(body)
+            if more_body:
+                if size > ETAG_MAX_BODY_BYTES:
+                    mode = "pass"
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                    chunks.clear()
+                return
+            
+            body = b"".join(chunks)
+            etag = compute_etag(body)
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            headers["etag"] = etag
+            start = {**start, "headers": headers.raw}
+            if if_none_match and etag_matches(if_none_match, etag):
+                await send_not_modified(start)
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+        
+        await self.app(scope, receive, send_wrapper)